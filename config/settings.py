@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -44,6 +45,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "pa.middleware.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -77,12 +79,47 @@ WSGI_APPLICATION = "config.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+# SQLite by default; PA_DB_ENGINE=postgres selects PostgreSQL, configured by
+# the PA_DB_* variables below. PA_DB_CONN_MAX_AGE keeps connections open
+# between requests (seconds, health-checked before reuse). Django 4.2 has no
+# built-in pool: put PgBouncer in front and set PA_DB_PGBOUNCER=1, which
+# turns off the server-side cursors that transaction pooling cannot keep.
+
+
+def _env_flag(name, default=False):
+    return os.environ.get(name, "1" if default else "0").lower() in ("1", "true", "yes", "on")
+
+
+if os.environ.get("PA_DB_ENGINE", "sqlite") == "postgres":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.environ.get("PA_DB_NAME", "pa"),
+            "USER": os.environ.get("PA_DB_USER", "pa"),
+            "PASSWORD": os.environ.get("PA_DB_PASSWORD", ""),
+            "HOST": os.environ.get("PA_DB_HOST", "localhost"),
+            "PORT": os.environ.get("PA_DB_PORT", "5432"),
+            "CONN_MAX_AGE": int(os.environ.get("PA_DB_CONN_MAX_AGE", "60")),
+            "CONN_HEALTH_CHECKS": True,
+            "DISABLE_SERVER_SIDE_CURSORS": _env_flag("PA_DB_PGBOUNCER"),
+            "OPTIONS": {"connect_timeout": 5},
+        }
     }
-}
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.environ.get("PA_DB_NAME", BASE_DIR / "db.sqlite3"),
+            "CONN_MAX_AGE": int(os.environ.get("PA_DB_CONN_MAX_AGE", "0")),
+            "CONN_HEALTH_CHECKS": True,
+        }
+    }
+
+# Applied to every new SQLite connection (see pa.signals): WAL lets readers
+# run alongside a writer, and writers wait up to the busy timeout for the
+# lock instead of failing with "database is locked".
+PA_SQLITE_WAL = _env_flag("PA_SQLITE_WAL", True)
+PA_SQLITE_BUSY_TIMEOUT = 20
 
 
 # Password validation
@@ -134,3 +171,83 @@ REST_FRAMEWORK = {
         "django_filters.rest_framework.DjangoFilterBackend",
     ],
 }
+
+# Excel write-back: edits are coalesced per workbook and flushed by a
+# background thread after PA_EXCEL_WRITEBACK_DELAY seconds.
+PA_EXCEL_WRITEBACK_ASYNC = True
+PA_EXCEL_WRITEBACK_DELAY = 0.5
+
+# Engine reading workbooks for import, sync and previews: "calamine" (needs
+# python-calamine, several times faster, loads the whole sheet) or "openpyxl"
+# (streams rows in flat memory). None picks calamine when it is installed.
+PA_EXCEL_READ_ENGINE = None
+
+# Parsed-sheet cache: LRU bounded by number of sheets and total cells.
+# Set PA_SHEET_CACHE_HASH to also compare file contents, not only mtime/size.
+PA_SHEET_CACHE_MAX_ENTRIES = 16
+PA_SHEET_CACHE_MAX_CELLS = 2_000_000
+PA_SHEET_CACHE_HASH = False
+
+# Cross-process lock taken around each workbook write (seconds). Lock files
+# live next to the workbook unless PA_EXCEL_LOCK_DIR is set.
+PA_EXCEL_LOCK_TIMEOUT = 10
+PA_EXCEL_LOCK_DIR = None
+
+# act_id → row index of each workbook, rebuilt when the file fingerprint
+# changes. Index files live next to the workbook unless PA_ROW_INDEX_DIR is set.
+PA_ROW_INDEX_DIR = None
+
+# Background jobs are stored in the database and run by "manage.py run_jobs".
+# Set PA_EXCEL_WRITEBACK_BACKEND = "jobs" to hand write-backs to that worker
+# instead of the in-process queue. Workers refresh the heartbeat of their
+# running jobs every PA_JOBS_HEARTBEAT seconds; a running job without one for
+# PA_JOBS_STALE_AFTER seconds is requeued. Jobs that hit a busy workbook run
+# again after PA_JOBS_RETRY_DELAY seconds.
+PA_EXCEL_WRITEBACK_BACKEND = "queue"
+PA_JOBS_THREADS = 4
+PA_JOBS_HEARTBEAT = 30
+PA_JOBS_STALE_AFTER = 300
+PA_JOBS_RETRY_DELAY = 5
+
+# Conditional GET on plans/actions; PA_RESPONSE_CACHE also keeps serialized
+# pages in the Django cache, keyed by ETag (user scope, URL, plan versions).
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+}
+PA_RESPONSE_CACHE = False
+PA_RESPONSE_CACHE_ALIAS = "default"
+PA_RESPONSE_CACHE_TIMEOUT = 300
+
+# Per-user permission context (role, authorized plan ids), cached in the
+# Django cache and invalidated by signals; 0 disables the cache. Signals only
+# reach other workers through a shared backend (Redis, Memcached, database),
+# so the context is not cached when the alias is a local-memory or dummy cache.
+PA_PERMISSION_CACHE_TIMEOUT = 300
+PA_PERMISSION_CACHE_ALIAS = "default"
+
+# Async Excel endpoints (ASGI) read workbooks in a dedicated thread pool, with
+# at most PA_EXCEL_IO_PER_PLAN concurrent reads per plan and a timeout (s).
+PA_EXCEL_IO_THREADS = 8
+PA_EXCEL_IO_PER_PLAN = 2
+PA_EXCEL_IO_TIMEOUT = 30
+
+# Full-text search (?q= on actions): words beyond PA_SEARCH_MAX_TERMS are ignored.
+PA_SEARCH_MAX_TERMS = 8
+
+# Request/SQL histograms and timing spans, served at /api/metrics in the
+# Prometheus text format (open unless PA_METRICS_TOKEN is set). Requests
+# slower than PA_SLOW_REQUEST_MS are logged with their span breakdown.
+PA_METRICS_ENABLED = True
+PA_METRICS_TOKEN = None
+PA_SLOW_REQUEST_MS = None
+
+# Change log behind /api/changes and its SSE stream. A write touching more than
+# PA_CHANGES_MAX_ROWS actions logs one "reset" of its plan instead. Entries
+# older than PA_CHANGES_RETENTION seconds are removed by `prune_changes`.
+PA_CHANGES_MAX_ROWS = 1000
+PA_CHANGES_RETENTION = 7 * 24 * 3600
+PA_CHANGES_POLL_INTERVAL = 1.0
+PA_CHANGES_HEARTBEAT = 15
+PA_CHANGES_STREAM_TIMEOUT = 300
+# Seconds a ?token= from /api/changes/stream/token can open the stream for.
+PA_CHANGES_STREAM_TOKEN_LIFETIME = 60
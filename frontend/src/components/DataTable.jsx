@@ -1,4 +1,17 @@
-export default function DataTable({ columns, rows, page, pageSize, total, onSort, onPageChange }) {
+export default function DataTable({
+  columns,
+  rows,
+  page,
+  pageSize,
+  total,
+  hasNext,
+  hasPrevious,
+  onSort,
+  onPageChange,
+}) {
+  // Cursor-paginated callers pass hasNext/hasPrevious instead of a total.
+  const canPrevious = hasPrevious ?? page > 1
+  const canNext = hasNext ?? page * pageSize < total
   return (
     <div className="overflow-x-auto">
       <table className="min-w-full divide-y divide-gray-200">
@@ -30,17 +43,18 @@ export default function DataTable({ columns, rows, page, pageSize, total, onSort
       <div className="flex justify-between items-center mt-4">
         <button
           onClick={() => onPageChange && onPageChange(page - 1)}
-          disabled={page <= 1}
+          disabled={!canPrevious}
           className="rounded-2xl px-4 py-2 bg-gray-200 disabled:opacity-50"
         >
           Précédent
         </button>
         <span>
-          Page {page} / {Math.ceil(total / pageSize) || 1}
+          Page {page}
+          {total !== undefined && ` / ${Math.ceil(total / pageSize) || 1}`}
         </span>
         <button
           onClick={() => onPageChange && onPageChange(page + 1)}
-          disabled={page * pageSize >= total}
+          disabled={!canNext}
           className="rounded-2xl px-4 py-2 bg-gray-200 disabled:opacity-50"
         >
           Suivant
@@ -1,11 +1,19 @@
+import { useEffect, useState } from 'react'
 import { Link } from 'react-router-dom'
+import api from '../lib/api.js'
 
 export default function Dashboard() {
+  const [stats, setStats] = useState(null)
+
+  useEffect(() => {
+    api.get('/stats/').then(({ data }) => setStats(data.global))
+  }, [])
+
   const cards = [
-    { label: 'Total', value: 0 },
-    { label: 'Clôturées', value: 0 },
-    { label: 'En retard', value: 0 },
-    { label: 'En cours', value: 0 },
+    { label: 'Total', value: stats?.total ?? 0 },
+    { label: 'Clôturées', value: stats?.closed ?? 0 },
+    { label: 'En retard', value: stats?.overdue ?? 0 },
+    { label: 'En cours', value: stats?.in_progress ?? 0 },
   ]
   return (
     <div>
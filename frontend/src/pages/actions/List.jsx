@@ -1,27 +1,50 @@
 import { useEffect, useState } from 'react'
-import { Link } from 'react-router-dom'
+import { Link, useSearchParams } from 'react-router-dom'
 import FilterBar from '../../components/FilterBar.jsx'
 import DataTable from '../../components/DataTable.jsx'
-import actionsData from '../../mocks/actions.json'
+import api from '../../lib/api.js'
+
+const pageSize = 10
+
+const columns = [
+  { key: 'act_id', label: 'ID' },
+  { key: 'titre', label: 'Titre' },
+  { key: 'statut', label: 'Statut' },
+  { key: 'priorite', label: 'Priorité' },
+  { key: 'responsables', label: 'Responsables' },
+  { key: 'date_fin', label: 'Délais' },
+  { key: 'j', label: 'J' },
+]
 
 export default function ActionsList() {
+  const [params] = useSearchParams()
   const [page, setPage] = useState(1)
-  const pageSize = 10
   const [rows, setRows] = useState([])
+  const [url, setUrl] = useState(null)
+  const [links, setLinks] = useState({ next: null, previous: null })
+
+  useEffect(() => {
+    setPage(1)
+    setUrl(null)
+  }, [params])
 
   useEffect(() => {
-    setRows(actionsData)
-  }, [])
+    const query = Object.fromEntries(params)
+    const request = url
+      ? api.get(url)
+      : api.get('/actions/', {
+          params: { ...query, page_size: pageSize, fields: columns.map((c) => c.key).join(',') },
+        })
+    request.then(({ data }) => {
+      setRows(data.results)
+      setLinks({ next: data.next, previous: data.previous })
+    })
+  }, [url, params])
 
-  const columns = [
-    { key: 'act_id', label: 'ID' },
-    { key: 'titre', label: 'Titre' },
-    { key: 'statut', label: 'Statut' },
-    { key: 'priorite', label: 'Priorité' },
-    { key: 'responsables', label: 'Responsables' },
-    { key: 'delais', label: 'Délais' },
-    { key: 'J', label: 'J' },
-  ]
+  const onPageChange = (next) => {
+    setUrl(next > page ? links.next : links.previous)
+    setPage(next)
+  }
 
   return (
     <div>
@@ -33,11 +56,12 @@ export default function ActionsList() {
       </div>
       <DataTable
         columns={columns}
-        rows={rows.slice((page - 1) * pageSize, page * pageSize)}
+        rows={rows}
         page={page}
         pageSize={pageSize}
-        total={rows.length}
-        onPageChange={setPage}
+        hasNext={Boolean(links.next)}
+        hasPrevious={Boolean(links.previous)}
+        onPageChange={onPageChange}
       />
     </div>
   )
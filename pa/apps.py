@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class PaConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "pa"
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .services import tasks  # noqa: F401
@@ -0,0 +1,35 @@
+from asgiref.sync import sync_to_async
+from rest_framework.views import APIView
+
+
+class AsyncAPIView(APIView):
+    """APIView whose handlers are coroutines, for ASGI deployments.
+
+    DRF dispatches synchronously, so authentication, permission checks and
+    throttling (which may hit the database) run in a worker thread through
+    ``sync_to_async``; the handler itself is awaited on the event loop.
+    Under WSGI, Django runs the view with ``async_to_sync``.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            method = request.method.lower()
+            if method in self.http_method_names and hasattr(self, method):
+                response = await getattr(self, method)(request, *args, **kwargs)
+            else:
+                response = self.http_method_not_allowed(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def options(self, request, *args, **kwargs):
+        return super().options(request, *args, **kwargs)
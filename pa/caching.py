@@ -0,0 +1,63 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import get_conditional_response, patch_cache_control
+from rest_framework.response import Response
+
+from .models import Plan
+from .permissions import get_permission_context
+from .services.versions import plans_validator
+
+
+class ConditionalGetMixin:
+    """ETag for ``list`` and ``retrieve``, from plan versions.
+
+    Views return the plans their payload depends on from
+    :meth:`validator_plans`. A matching ``If-None-Match`` gets a 304 before
+    the queryset is serialized. There is no ``Last-Modified``: deleting a
+    plan, or removing it from the user's scope, would not move it forward. With
+    ``PA_RESPONSE_CACHE`` enabled, serialized payloads are also kept in the
+    Django cache under the ETag, which covers the URL, the user's plan scope
+    and the plan versions.
+    """
+
+    def validator_plans(self, request, **kwargs):
+        """Plans the response depends on; by default every plan the user can read."""
+        return get_permission_context(request).scope(Plan.objects.all(), "id")
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional(request, kwargs, super().list, args)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional(request, kwargs, super().retrieve, args)
+
+    def _conditional(self, request, kwargs, render, args):
+        digest = plans_validator(self.validator_plans(request, **kwargs))
+        renderer = getattr(request, "accepted_renderer", None)
+        key = f"{request.build_absolute_uri()}|{getattr(renderer, 'format', '')}|{digest}"
+        etag = f'"{hashlib.sha1(key.encode()).hexdigest()}"'
+
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+
+        cache = None
+        if getattr(settings, "PA_RESPONSE_CACHE", False):
+            cache = caches[getattr(settings, "PA_RESPONSE_CACHE_ALIAS", "default")]
+        data = cache.get(f"pa:response:{etag}") if cache is not None else None
+        if data is not None:
+            response = Response(data)
+        else:
+            response = render(request, *args, **kwargs)
+            if cache is not None and response.status_code == 200:
+                cache.set(
+                    f"pa:response:{etag}",
+                    response.data,
+                    getattr(settings, "PA_RESPONSE_CACHE_TIMEOUT", 300),
+                )
+        if response.status_code == 200:
+            # Let browsers keep the payload but revalidate it on every use.
+            patch_cache_control(response, private=True, no_cache=True)
+            response["ETag"] = etag
+        return response
@@ -1,10 +1,12 @@
 import django_filters
 
 from .models import Action
+from .services.search import search_actions
 
 
 class ActionFilter(django_filters.FilterSet):
     responsable = django_filters.NumberFilter(field_name="responsables__id")
+    q = django_filters.CharFilter(method="search")
 
     class Meta:
         model = Action
@@ -14,3 +16,7 @@ class ActionFilter(django_filters.FilterSet):
             "priorite": ["exact"],
             "j": ["lt", "gt", "exact"],
         }
+
+    def search(self, queryset, name, value):
+        """Full-text search in titre/commentaire; results are ranked, see IdCursorPagination."""
+        return search_actions(queryset, value)
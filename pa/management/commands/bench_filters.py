@@ -0,0 +1,114 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from pa.filters import ActionFilter
+from pa.models import Action, Plan
+
+STATUTS = ["open", "en cours", "closed", "rejected"]
+PRIORITES = ["haute", "moyenne", "basse"]
+BENCH_PLAN = "bench-filters"
+
+
+class Command(BaseCommand):
+    help = (
+        "Time ActionFilter queries on a synthetic plan, optionally comparing "
+        "with the Action indexes dropped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--actions", type=int, default=200_000)
+        parser.add_argument("--plans", type=int, default=10)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument(
+            "--compare",
+            action="store_true",
+            help="Also measure without the Meta.indexes of Action (dropped then restored).",
+        )
+
+    def handle(self, *args, **options):
+        plans = self.seed(options["actions"], options["plans"])
+        scenarios = self.scenarios(plans[0])
+        results = {"indexed": self.measure(scenarios, options["repeat"])}
+        if options["compare"]:
+            indexes = Action._meta.indexes
+            with connection.schema_editor() as editor:
+                for index in indexes:
+                    editor.remove_index(Action, index)
+            try:
+                results["unindexed"] = self.measure(scenarios, options["repeat"])
+            finally:
+                with connection.schema_editor() as editor:
+                    for index in indexes:
+                        editor.add_index(Action, index)
+
+        self.stdout.write(f"{'scenario':<28}" + "".join(f"{k:>14}" for k in results))
+        for name in scenarios:
+            line = "".join(f"{results[k][name]:>12.2f}ms" for k in results)
+            self.stdout.write(f"{name:<28}{line}")
+
+    def seed(self, total, plan_count):
+        plans = list(Plan.objects.filter(nom__startswith=BENCH_PLAN).order_by("id"))
+        for i in range(len(plans), plan_count):
+            plans.append(
+                Plan.objects.create(
+                    nom=f"{BENCH_PLAN}-{i}",
+                    excel_path=f"/tmp/{BENCH_PLAN}-{i}.xlsx",
+                    excel_sheet="plan d’action",
+                    header_row_index=11,
+                )
+            )
+        existing = Action.objects.filter(plan__in=plans).count()
+        rng = random.Random(42)
+        batch = []
+        for n in range(existing, total):
+            plan = plans[n % len(plans)]
+            batch.append(
+                Action(
+                    act_id=f"B{n:08d}",
+                    titre=f"Action {n}",
+                    statut=rng.choice(STATUTS),
+                    priorite=rng.choice(PRIORITES),
+                    j=rng.randint(-60, 120),
+                    plan=plan,
+                    excel_fichier=plan.excel_path,
+                    excel_feuille=plan.excel_sheet,
+                    excel_row_index=12 + n // len(plans),
+                )
+            )
+            if len(batch) == 5000:
+                Action.objects.bulk_create(batch)
+                batch = []
+        Action.objects.bulk_create(batch)
+        if total > existing:
+            self.stdout.write(f"Seeded {total - existing} actions over {len(plans)} plans")
+        return plans
+
+    def scenarios(self, plan):
+        return {
+            "plan+statut": {"plan": plan.pk, "statut": "open"},
+            "plan+priorite": {"plan": plan.pk, "priorite": "haute"},
+            "plan+j__lt": {"plan": plan.pk, "j__lt": 0},
+            "plan+j__gt": {"plan": plan.pk, "j__gt": 100},
+            "plan+statut+priorite": {"plan": plan.pk, "statut": "closed", "priorite": "basse"},
+            "statut__iexact (exclude)": None,
+        }
+
+    def measure(self, scenarios, repeat):
+        timings = {}
+        for name, params in scenarios.items():
+            if params is None:
+                queryset = Action.objects.exclude(statut__iexact="closed")
+            else:
+                queryset = ActionFilter(params, queryset=Action.objects.all()).qs
+            samples = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                list(queryset.order_by("id").values_list("id", flat=True)[:50])
+                queryset.count()
+                samples.append((time.perf_counter() - start) * 1000)
+            timings[name] = statistics.median(samples)
+        return timings
@@ -0,0 +1,78 @@
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from pa.services import excel_io
+from pa.services.actid import format_act_id
+from pa.services.synthetic import HEADER_ROW, SHEET, write_plan_workbook
+
+
+def _engines():
+    return ["openpyxl"] if excel_io.python_calamine is None else ["openpyxl", "calamine"]
+
+
+def _read_rows(path, engine):
+    with override_settings(PA_EXCEL_READ_ENGINE=engine):
+        for _ in excel_io.iter_numbered_rows(path, SHEET, HEADER_ROW):
+            pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare parse time and peak memory of pd.read_excel on the whole sheet "
+        "with the row reader of import and sync, per engine, on generated workbooks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument("--keep", action="store_true", help="Keep generated workbooks.")
+
+    def handle(self, *args, **options):
+        readers = {"read_excel": self.read_excel}
+        for engine in _engines():
+            readers[f"rows/{engine}"] = lambda path, engine=engine: _read_rows(path, engine)
+
+        self.stdout.write(f"{'rows':>8} {'reader':<20}{'median':>12}{'peak mem':>12}")
+        for rows in options["rows"]:
+            path = self.generate(rows)
+            try:
+                for name, reader in readers.items():
+                    seconds, peak = self.measure(reader, path, options["repeat"])
+                    self.stdout.write(
+                        f"{rows:>8} {name:<20}{seconds * 1000:>10.0f}ms{peak / 2**20:>10.1f}MB"
+                    )
+            finally:
+                if not options["keep"]:
+                    os.remove(path)
+
+    def read_excel(self, path):
+        return pd.read_excel(path, sheet_name=SHEET, header=HEADER_ROW - 1)
+
+    def generate(self, rows):
+        fd, path = tempfile.mkstemp(suffix=".xlsx", prefix=f"bench-readers-{rows}-")
+        os.close(fd)
+        write_plan_workbook(path, [format_act_id(n) for n in range(1, rows + 1)], seed=rows)
+        return path
+
+    def measure(self, reader, path, repeat):
+        # tracemalloc slows parsing down several times, so time untraced runs
+        # and measure peak memory on a separate one.
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            reader(path)
+            samples.append(time.perf_counter() - start)
+        tracemalloc.start()
+        try:
+            reader(path)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return statistics.median(samples), peak
@@ -0,0 +1,267 @@
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from pa.models import Action, Profile
+from pa.services.excel_io import iter_numbered_rows, read_plan, write_action
+from pa.services.sheet_cache import sheet_cache
+from pa.services.sync import sync_plan
+from pa.services.synthetic import HEADER_ROW, create_synthetic_plan, create_users
+
+# Compared against a baseline: a scenario regresses when one of these grows
+# by more than --max-regression (queries: by any amount).
+COMPARED = ("p50_ms", "peak_kb")
+
+
+def count_queries(func) -> int:
+    """Run ``func`` and return the number of SQL statements it executed."""
+    count = 0
+
+    def counter(execute, sql, params, many, context):
+        nonlocal count
+        count += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(counter):
+        func()
+    return count
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the main API endpoints and Excel paths on a synthetic plan, in "
+        "a throwaway database. Reports latency (p50/p95), throughput, query count "
+        "and peak memory per scenario, saves them as JSON with --output and fails "
+        "when a scenario regressed against --baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--actions", type=int, default=5000)
+        parser.add_argument("--users", type=int, default=20)
+        parser.add_argument("--extra-columns", type=int, default=6)
+        parser.add_argument("--header-row", type=int, default=HEADER_ROW)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--warmup", type=int, default=2)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--only", nargs="+", help="Run scenarios starting with these names.")
+        parser.add_argument("--output", help="Write the results to this JSON file.")
+        parser.add_argument("--baseline", help="Compare with the JSON of a previous run.")
+        parser.add_argument("--max-regression", type=float, default=0.25)
+        parser.add_argument(
+            "--min-delta-ms",
+            type=float,
+            default=1.0,
+            help="Ignore latency differences smaller than this (noise floor).",
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options["baseline"]:
+            with open(options["baseline"], encoding="utf-8") as fh:
+                baseline = json.load(fh)
+
+        report = self.run_in_test_database(options)
+        self.print_results(report["results"])
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as fh:
+                json.dump(report, fh, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+        if baseline is not None:
+            regressions = self.compare(baseline["results"], report["results"], options)
+            if regressions:
+                raise CommandError(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+            self.stdout.write(self.style.SUCCESS("No regression against the baseline"))
+
+    def run_in_test_database(self, options):
+        old_name = connection.settings_dict["NAME"]
+        workdir = tempfile.mkdtemp(prefix="pa-benchmark-")
+        if connection.vendor == "sqlite":
+            # A file, as in production, rather than the in-memory test database.
+            connection.settings_dict["TEST"]["NAME"] = os.path.join(workdir, "bench.sqlite3")
+        creation = connection.creation
+        creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            with override_settings(
+                ALLOWED_HOSTS=["testserver"],
+                PA_EXCEL_WRITEBACK_BACKEND="jobs",
+                PA_SLOW_REQUEST_MS=None,
+            ):
+                return self.run_scenarios(workdir, options)
+        finally:
+            creation.destroy_test_db(old_name, verbosity=0)
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def run_scenarios(self, workdir, options):
+        users = create_users(options["users"], seed=options["seed"])
+        plan = create_synthetic_plan(
+            "benchmark",
+            os.path.join(workdir, "benchmark.xlsx"),
+            options["actions"],
+            users,
+            header_row=options["header_row"],
+            extra_columns=options["extra_columns"],
+            seed=options["seed"],
+        )
+        sync_plan(plan)
+        admin = get_user_model().objects.create_user("benchmark", password="benchmark")
+        Profile.objects.create(user=admin, role=Profile.Role.SUPER_ADMIN)
+
+        results = {}
+        for name, scenario in self.scenarios(plan, admin, options["seed"]).items():
+            if options["only"] and not name.startswith(tuple(options["only"])):
+                continue
+            results[name] = self.measure(scenario, options["repeat"], options["warmup"])
+        return {
+            "meta": {
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "actions": options["actions"],
+                "users": options["users"],
+                "extra_columns": options["extra_columns"],
+                "header_row": options["header_row"],
+                "repeat": options["repeat"],
+                "seed": options["seed"],
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "database": connection.vendor,
+            },
+            "results": results,
+        }
+
+    def scenarios(self, plan, admin, seed):
+        client = Client(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(admin)}")
+        rng = random.Random(seed)
+        act_ids = list(Action.objects.filter(plan=plan).values_list("act_id", flat=True))
+        action = Action.objects.select_related("plan").get(act_id=act_ids[len(act_ids) // 2])
+        counter = iter(range(1, 10**9))
+
+        def get(url, params=None):
+            def run():
+                resp = client.get(url, params)
+                if resp.status_code != 200:
+                    raise CommandError(f"GET {url} answered {resp.status_code}")
+                if resp.streaming:
+                    for _ in resp.streaming_content:
+                        pass
+
+            return run
+
+        def detail():
+            client.get(f"/api/actions/{rng.choice(act_ids)}/")
+
+        def patch():
+            client.patch(
+                f"/api/actions/{rng.choice(act_ids)}/",
+                {"commentaire": f"bench {next(counter)}"},
+                content_type="application/json",
+            )
+
+        def read_cold():
+            sheet_cache.clear()
+            read_plan(plan, limit=50)
+
+        def read_rows():
+            for _ in iter_numbered_rows(plan.excel_path, plan.excel_sheet, plan.header_row_index):
+                pass
+
+        def edit_and_write():
+            action.commentaire = f"bench {next(counter)}"
+            write_action(action)
+
+        return {
+            "api.plans.list": get("/api/plans/"),
+            "api.actions.list": get("/api/actions/", {"plan": plan.pk, "page_size": 50}),
+            "api.actions.filter": get(
+                "/api/actions/", {"plan": plan.pk, "statut": "open", "priorite": "haute"}
+            ),
+            "api.actions.search": get("/api/actions/", {"plan": plan.pk, "q": "action 12"}),
+            "api.actions.detail": detail,
+            "api.actions.patch": patch,
+            "api.actions.export.csv": get("/api/actions/export/", {"format": "csv"}),
+            "api.stats": get("/api/stats/"),
+            "excel.read_plan.cold": read_cold,
+            "excel.read_plan.cached": lambda: read_plan(plan, limit=50, offset=len(act_ids) // 2),
+            "excel.read_rows": read_rows,
+            "excel.sync.unchanged": lambda: sync_plan(plan),
+            "excel.write_action": edit_and_write,
+        }
+
+    def measure(self, scenario, repeat, warmup):
+        for _ in range(warmup):
+            scenario()
+        # Queries and memory are measured on separate runs: counting SQL and
+        # tracemalloc both slow the timed code down. (CaptureQueriesContext
+        # would see nothing: each request resets the query log.)
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            scenario()
+            samples.append((time.perf_counter() - start) * 1000)
+        queries = count_queries(scenario)
+        tracemalloc.start()
+        try:
+            scenario()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        samples.sort()
+        mean = statistics.fmean(samples)
+        return {
+            "p50_ms": statistics.median(samples),
+            "p95_ms": samples[min(int(len(samples) * 0.95), len(samples) - 1)],
+            "mean_ms": mean,
+            "throughput_per_s": 1000 / mean if mean else 0,
+            "queries": queries,
+            "peak_kb": peak / 1024,
+        }
+
+    def print_results(self, results):
+        self.stdout.write(
+            f"{'scenario':<26}{'p50':>10}{'p95':>10}{'ops/s':>10}{'queries':>9}{'peak':>11}"
+        )
+        for name, r in results.items():
+            self.stdout.write(
+                f"{name:<26}{r['p50_ms']:>8.2f}ms{r['p95_ms']:>8.2f}ms"
+                f"{r['throughput_per_s']:>10.1f}{r['queries']:>9}{r['peak_kb']:>9.0f}KB"
+            )
+
+    def compare(self, baseline, results, options):
+        """Print the change of each scenario and return the names that regressed."""
+        threshold = options["max_regression"]
+        regressions = []
+        self.stdout.write(f"\n{'scenario':<26}{'p50':>12}{'queries':>12}{'peak':>12}")
+        for name, current in results.items():
+            previous = baseline.get(name)
+            if previous is None:
+                continue
+            changes, regressed = [], False
+            for key in COMPARED:
+                ratio = current[key] / previous[key] - 1 if previous[key] else 0
+                changes.append(f"{ratio:>+11.0%}")
+                if ratio > threshold and not (
+                    key == "p50_ms" and current[key] - previous[key] < options["min_delta_ms"]
+                ):
+                    regressed = True
+            query_delta = current["queries"] - previous["queries"]
+            changes.insert(1, f"{query_delta:>+12d}")
+            regressed = regressed or query_delta > 0
+            line = f"{name:<26}{''.join(changes)}"
+            if regressed:
+                regressions.append(name)
+                line = self.style.ERROR(line)
+            self.stdout.write(line)
+        return regressions
@@ -0,0 +1,56 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from pa.services.synthetic import (
+    EXTRA_HEADERS,
+    HEADER_ROW,
+    SHEET,
+    create_synthetic_plan,
+    create_users,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a synthetic plan: a workbook shaped like the real ones (title "
+        "block, header at --header-row, extra unused columns), imported as a "
+        "plan, with --users users given access and assigned as responsables."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--actions", type=int, default=1000)
+        parser.add_argument("--users", type=int, default=20)
+        parser.add_argument("--plans", type=int, default=1)
+        parser.add_argument("--extra-columns", type=int, default=len(EXTRA_HEADERS))
+        parser.add_argument("--header-row", type=int, default=HEADER_ROW)
+        parser.add_argument("--sheet", default=SHEET)
+        parser.add_argument("--dir", default="/tmp", help="Where workbooks are written.")
+        parser.add_argument("--name", default="synthetic")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        if options["header_row"] < 1:
+            raise CommandError("--header-row starts at 1")
+        users = create_users(options["users"], seed=options["seed"])
+        for n in range(options["plans"]):
+            name = f"{options['name']}-{n}"
+            path = os.path.join(options["dir"], f"{name}.xlsx")
+            try:
+                plan = create_synthetic_plan(
+                    name,
+                    path,
+                    options["actions"],
+                    users,
+                    sheet=options["sheet"],
+                    header_row=options["header_row"],
+                    extra_columns=options["extra_columns"],
+                    seed=options["seed"] + n,
+                )
+            except ValueError as exc:
+                raise CommandError(str(exc))
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Plan {plan.pk} ({name}): {options['actions']} actions in {path}"
+                )
+            )
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from pa.models import Plan
+from pa.services.importer import import_plan
+
+
+class Command(BaseCommand):
+    help = "Import the actions of a plan's Excel workbook into the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument("plan_id", type=int)
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            plan = Plan.objects.get(pk=options["plan_id"])
+        except Plan.DoesNotExist:
+            raise CommandError(f"Plan {options['plan_id']} does not exist")
+        try:
+            counts = import_plan(plan, chunk_size=options["chunk_size"])
+        except (OSError, KeyError, ValueError) as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(
+            self.style.SUCCESS(
+                "{inserted} inserted, {updated} updated, "
+                "{unchanged} unchanged, {skipped} skipped".format(**counts)
+            )
+        )
@@ -0,0 +1,189 @@
+import importlib.util
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, close_old_connections, connection
+from django.test import Client, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from pa.models import Action, Plan, Profile
+
+# Environment overrides applied to the child process of each profile.
+PROFILES = {
+    "sqlite": {"PA_DB_ENGINE": "sqlite", "PA_SQLITE_WAL": "0", "PA_DB_CONN_MAX_AGE": "0"},
+    "sqlite-wal": {"PA_DB_ENGINE": "sqlite", "PA_SQLITE_WAL": "1", "PA_DB_CONN_MAX_AGE": "60"},
+    "postgres": {"PA_DB_ENGINE": "postgres", "PA_DB_CONN_MAX_AGE": "0"},
+    "postgres-persistent": {"PA_DB_ENGINE": "postgres", "PA_DB_CONN_MAX_AGE": "60"},
+}
+UNAVAILABLE = 3
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare requests per second of the database profiles under a mixed "
+        "read/write API load. Each profile runs in its own process against a "
+        "throwaway test database; PostgreSQL profiles are skipped when psycopg "
+        "is missing or no server answers at PA_DB_HOST/PA_DB_PORT."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--profiles", nargs="+", choices=list(PROFILES), default=list(PROFILES))
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--duration", type=float, default=10.0)
+        parser.add_argument("--actions", type=int, default=2000)
+        parser.add_argument("--write-ratio", type=float, default=0.2)
+        parser.add_argument("--run", metavar="PROFILE", help="Run one profile in this process.")
+
+    def handle(self, *args, **options):
+        if options["run"]:
+            result = self.run_load(options)
+            result["profile"] = options["run"]
+            self.stdout.write(json.dumps(result))
+            return
+
+        self.stdout.write(
+            f"{'profile':<22}{'req/s':>10}{'p50':>10}{'p95':>10}{'errors':>8}{'locked':>8}"
+        )
+        for profile in options["profiles"]:
+            result = self.run_profile(profile, options)
+            if result is None:
+                self.stdout.write(f"{profile:<22}{'skipped: database unavailable':>46}")
+                continue
+            self.stdout.write(
+                f"{profile:<22}{result['rps']:>10.1f}{result['p50']:>8.1f}ms"
+                f"{result['p95']:>8.1f}ms{result['errors']:>8}{result['locked']:>8}"
+            )
+
+    def run_profile(self, profile, options):
+        env = {**os.environ, **PROFILES[profile]}
+        if env["PA_DB_ENGINE"] == "postgres" and not any(
+            importlib.util.find_spec(driver) for driver in ("psycopg", "psycopg2")
+        ):
+            return None
+        command = [
+            sys.executable,
+            os.path.join(settings.BASE_DIR, "manage.py"),
+            "loadtest",
+            "--run",
+            profile,
+            "--threads",
+            str(options["threads"]),
+            "--duration",
+            str(options["duration"]),
+            "--actions",
+            str(options["actions"]),
+            "--write-ratio",
+            str(options["write_ratio"]),
+        ]
+        proc = subprocess.run(command, env=env, capture_output=True, text=True)
+        if proc.returncode == UNAVAILABLE:
+            return None
+        if proc.returncode != 0:
+            raise CommandError(f"{profile} failed:\n{proc.stderr}")
+        return json.loads(proc.stdout.strip().splitlines()[-1])
+
+    def run_load(self, options):
+        old_name = connection.settings_dict["NAME"]
+        try:
+            if connection.vendor == "sqlite":
+                # A file, not the in-memory test database: locking is what we measure.
+                fd, path = tempfile.mkstemp(suffix=".sqlite3")
+                os.close(fd)
+                connection.settings_dict["TEST"]["NAME"] = path
+            creation = connection.creation
+            creation.create_test_db(verbosity=0, autoclobber=True)
+        except (DatabaseError, ImproperlyConfigured) as exc:
+            self.stderr.write(f"Database unavailable: {exc}")
+            raise SystemExit(UNAVAILABLE)
+        try:
+            with override_settings(ALLOWED_HOSTS=["testserver"], PA_EXCEL_WRITEBACK_BACKEND="jobs"):
+                token, plan, act_ids = self.seed(options["actions"])
+                return self.hammer(token, plan, act_ids, options)
+        finally:
+            creation.destroy_test_db(old_name, verbosity=0)
+
+    def seed(self, count):
+        user = get_user_model().objects.create_user("loadtest", password="loadtest")
+        Profile.objects.create(user=user, role=Profile.Role.SUPER_ADMIN)
+        plan = Plan.objects.create(
+            nom="loadtest",
+            excel_path="/tmp/loadtest.xlsx",
+            excel_sheet="plan d’action",
+            header_row_index=11,
+        )
+        Action.objects.bulk_create(
+            Action(
+                act_id=f"L{n:08d}",
+                titre=f"Action {n}",
+                statut="open",
+                priorite="haute",
+                plan=plan,
+                excel_fichier=plan.excel_path,
+                excel_feuille=plan.excel_sheet,
+                excel_row_index=12 + n,
+            )
+            for n in range(count)
+        )
+        return str(AccessToken.for_user(user)), plan, [f"L{n:08d}" for n in range(count)]
+
+    def hammer(self, token, plan, act_ids, options):
+        deadline = time.monotonic() + options["duration"]
+        latencies, errors, locked = [], [0], [0]
+        lock = threading.Lock()
+
+        def worker(seed):
+            rng = random.Random(seed)
+            client = Client(HTTP_AUTHORIZATION=f"Bearer {token}")
+            samples, failed, busy = [], 0, 0
+            while time.monotonic() < deadline:
+                # The test client skips the request_started/finished handlers
+                # that apply CONN_MAX_AGE, so run them around each request.
+                close_old_connections()
+                start = time.perf_counter()
+                try:
+                    if rng.random() < options["write_ratio"]:
+                        resp = client.patch(
+                            f"/api/actions/{rng.choice(act_ids)}/",
+                            {"commentaire": f"load {rng.random()}"},
+                            content_type="application/json",
+                        )
+                    else:
+                        resp = client.get("/api/actions/", {"plan": plan.pk, "page_size": 50})
+                    failed += resp.status_code >= 400
+                except Exception as exc:
+                    failed += 1
+                    busy += "locked" in str(exc)
+                samples.append(time.perf_counter() - start)
+                close_old_connections()
+            connection.close()
+            with lock:
+                latencies.extend(samples)
+                errors[0] += failed
+                locked[0] += busy
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(options["threads"])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        latencies.sort()
+        return {
+            "requests": len(latencies),
+            "rps": len(latencies) / options["duration"],
+            "p50": statistics.median(latencies) * 1000 if latencies else 0,
+            "p95": latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0,
+            "errors": errors[0],
+            "locked": locked[0],
+        }
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from pa.services.changes import prune_changes
+
+
+class Command(BaseCommand):
+    help = "Delete change log entries older than the retention period."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--max-age",
+            type=float,
+            default=getattr(settings, "PA_CHANGES_RETENTION", 7 * 24 * 3600),
+            help="Retention in seconds.",
+        )
+
+    def handle(self, *args, **options):
+        deleted = prune_changes(options["max_age"])
+        self.stdout.write(self.style.SUCCESS(f"{deleted} change(s) pruned"))
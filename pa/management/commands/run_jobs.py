@@ -0,0 +1,69 @@
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from pa.services.jobs import (
+    claim_next_job,
+    heartbeat_jobs,
+    requeue_stale_jobs,
+    run_in_worker_thread,
+    run_pending_jobs,
+)
+
+
+class Command(BaseCommand):
+    help = "Run pending background jobs (Excel refresh, import, write-back) from the jobs table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=getattr(settings, "PA_JOBS_THREADS", 4))
+        parser.add_argument(
+            "--poll", type=float, default=1.0, help="Seconds between polls when idle."
+        )
+        parser.add_argument("--once", action="store_true", help="Run pending jobs and exit.")
+
+    def handle(self, *args, **options):
+        requeued = requeue_stale_jobs()
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale job(s)")
+        if options["once"]:
+            count = run_pending_jobs()
+            self.stdout.write(self.style.SUCCESS(f"{count} job(s) run"))
+            return
+
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        threads = max(options["threads"], 1)
+        heartbeat = getattr(settings, "PA_JOBS_HEARTBEAT", 30)
+        running = {}
+        next_beat = time.monotonic() + heartbeat
+        with ThreadPoolExecutor(max_workers=threads, thread_name_prefix="pa-job") as pool:
+            try:
+                while not self.stopping:
+                    while len(running) < threads:
+                        job = claim_next_job()
+                        if job is None:
+                            break
+                        running[pool.submit(run_in_worker_thread, job)] = job.pk
+                    if running:
+                        wait(running, timeout=options["poll"], return_when=FIRST_COMPLETED)
+                    else:
+                        time.sleep(options["poll"])
+                    running = {f: pk for f, pk in running.items() if not f.done()}
+                    if time.monotonic() >= next_beat:
+                        heartbeat_jobs(running.values())
+                        # Also take over the jobs of workers that died meanwhile.
+                        requeue_stale_jobs()
+                        next_beat = time.monotonic() + heartbeat
+            except KeyboardInterrupt:
+                pass
+            self.stdout.write("Waiting for running jobs to finish...")
+            while running:
+                heartbeat_jobs(running.values())
+                wait(running, timeout=heartbeat)
+                running = {f: pk for f, pk in running.items() if not f.done()}
+
+    def stop(self, signum, frame):
+        self.stopping = True
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from pa.models import Plan
+from pa.services.sync import sync_plan
+
+
+class Command(BaseCommand):
+    help = "Reconcile a plan's actions with its Excel workbook, applying only changed rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument("plan_id", type=int)
+        parser.add_argument(
+            "--keep-missing",
+            action="store_true",
+            help="Do not delete actions whose row is no longer in the sheet.",
+        )
+        parser.add_argument("--verbose-diff", action="store_true", help="List changed act_ids.")
+
+    def handle(self, *args, **options):
+        try:
+            plan = Plan.objects.get(pk=options["plan_id"])
+        except Plan.DoesNotExist:
+            raise CommandError(f"Plan {options['plan_id']} does not exist")
+        try:
+            report = sync_plan(plan, delete_missing=not options["keep_missing"])
+        except (OSError, KeyError, ValueError) as exc:
+            raise CommandError(str(exc))
+        if options["verbose_diff"]:
+            for key in ("added", "modified", "moved", "deleted"):
+                for entry in report[key]:
+                    self.stdout.write(f"{key}: {entry}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{len(report['added'])} added, {len(report['modified'])} modified, "
+                f"{len(report['moved'])} moved, {len(report['deleted'])} deleted, "
+                f"{report['unchanged']} unchanged, {report['skipped']} skipped"
+            )
+        )
@@ -0,0 +1,148 @@
+import contextvars
+import functools
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+
+# Prometheus client defaults, in seconds.
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+# Spans recorded during the current request, for the slow-request log.
+_request_spans: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = contextvars.ContextVar(
+    "pa_request_spans", default=None
+)
+_DISABLED = nullcontext()
+
+
+def enabled() -> bool:
+    return getattr(settings, "PA_METRICS_ENABLED", True)
+
+
+class Histogram:
+    """Cumulative histogram per label set, rendered in the Prometheus text format."""
+
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float] = TIME_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self._series: Dict[Labels, List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][idx] += 1
+            series[1] += value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def samples(self, **labels: str) -> Dict[str, float]:
+        """``{"count": n, "sum": s}`` of one label set, mostly for tests."""
+        with self._lock:
+            series = self._series.get(tuple(sorted(labels.items())))
+            if series is None:
+                return {"count": 0, "sum": 0.0}
+            return {"count": sum(series[0]), "sum": series[1]}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted(
+                (key, list(counts), total) for key, (counts, total) in self._series.items()
+            )
+        for key, counts, total in series:
+            cumulative = 0
+            for bound, count in zip([*self.buckets, "+Inf"], counts):
+                cumulative += count
+                le = bound if bound == "+Inf" else repr(float(bound))
+                lines.append(f"{self.name}_bucket{_labels(key + (('le', le),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(key)} {total}")
+            lines.append(f"{self.name}_count{_labels(key)} {cumulative}")
+        return lines
+
+
+def _labels(key: Labels) -> str:
+    if not key:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in key
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+span_seconds = Histogram("pa_span_seconds", "Time spent in instrumented code paths.")
+request_seconds = Histogram("pa_request_duration_seconds", "HTTP request duration.")
+request_queries = Histogram(
+    "pa_request_sql_queries", "SQL queries per HTTP request.", COUNT_BUCKETS
+)
+request_sql_seconds = Histogram("pa_request_sql_seconds", "Time spent in SQL per HTTP request.")
+
+REGISTRY = [span_seconds, request_seconds, request_queries, request_sql_seconds]
+
+
+def render_metrics() -> str:
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        span_seconds.observe(elapsed, span=self.name)
+        spans = _request_spans.get()
+        if spans is not None:
+            spans.append((self.name, elapsed))
+        return False
+
+
+def span(name: str):
+    """Time a block into ``pa_span_seconds{span=name}``; a no-op when metrics are off."""
+    return _Span(name) if enabled() else _DISABLED
+
+
+def timed(name: str):
+    """Decorator form of :func:`span`."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def collect_spans() -> contextvars.Token:
+    """Start recording the spans of the current request; see :func:`request_spans`."""
+    return _request_spans.set([])
+
+
+def request_spans(token: contextvars.Token) -> List[Tuple[str, float]]:
+    """Stop recording and return the ``(name, seconds)`` spans seen since :func:`collect_spans`."""
+    spans = _request_spans.get() or []
+    _request_spans.reset(token)
+    return spans
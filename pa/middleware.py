@@ -0,0 +1,111 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class _QueryCounter:
+    """``execute_wrapper`` adding up the number and duration of SQL queries."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql_text, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql_text, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - start
+
+    def install(self) -> ExitStack:
+        """Wrap the connections of the current thread until the stack is closed."""
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(self))
+        return stack
+
+
+class RequestMetricsMiddleware:
+    """Record duration and SQL query count/time of each request.
+
+    Requests are labelled by their URL route, not the raw path, to keep the
+    number of series bounded. Requests slower than ``PA_SLOW_REQUEST_MS`` are
+    logged with the SQL totals and the :func:`pa.metrics.span` breakdown.
+    Under ASGI the middleware stays async, so async views keep running on
+    the event loop.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not metrics.enabled():
+            return self.get_response(request)
+
+        queries = _QueryCounter()
+        token = metrics.collect_spans()
+        start = time.perf_counter()
+        try:
+            with queries.install():
+                response = self.get_response(request)
+        finally:
+            spans = metrics.request_spans(token)
+        self.record(request, response, time.perf_counter() - start, queries, spans)
+        return response
+
+    async def __acall__(self, request):
+        if not metrics.enabled():
+            return await self.get_response(request)
+
+        queries = _QueryCounter()
+        token = metrics.collect_spans()
+        start = time.perf_counter()
+        try:
+            # Database connections are per thread: wrap those of the thread
+            # that sync_to_async runs the request's queries in.
+            stack = await sync_to_async(queries.install)()
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(stack.close)()
+        finally:
+            spans = metrics.request_spans(token)
+        self.record(request, response, time.perf_counter() - start, queries, spans)
+        return response
+
+    def record(self, request, response, elapsed, queries, spans):
+        match = request.resolver_match
+        route = match.route if match is not None else "unmatched"
+        metrics.request_seconds.observe(
+            elapsed, route=route, method=request.method, status=str(response.status_code)
+        )
+        metrics.request_queries.observe(queries.count, route=route)
+        metrics.request_sql_seconds.observe(queries.seconds, route=route)
+
+        slow_ms = getattr(settings, "PA_SLOW_REQUEST_MS", None)
+        if slow_ms is not None and elapsed * 1000 >= slow_ms:
+            logger.warning(
+                "Slow request %s %s: %.0f ms, %s queries in %.0f ms, spans: %s",
+                request.method,
+                request.get_full_path(),
+                elapsed * 1000,
+                queries.count,
+                queries.seconds * 1000,
+                ", ".join(f"{name}={seconds * 1000:.1f}ms" for name, seconds in spans) or "-",
+            )
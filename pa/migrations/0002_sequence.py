@@ -0,0 +1,43 @@
+# Generated by Django 4.2 on 2026-10-18 17:05
+
+import re
+
+from django.db import migrations, models
+
+
+def seed_act_id_sequence(apps, schema_editor):
+    Action = apps.get_model("pa", "Action")
+    Sequence = apps.get_model("pa", "Sequence")
+    highest = 0
+    for act_id in Action.objects.values_list("act_id", flat=True).iterator():
+        match = re.fullmatch(r"ACT-(\d+)", act_id or "")
+        if match:
+            highest = max(highest, int(match.group(1)))
+    Sequence.objects.update_or_create(name="act_id", defaults={"last_value": highest})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pa", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Sequence",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=50, unique=True)),
+                ("last_value", models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_act_id_sequence, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2 on 2026-10-18 17:08
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pa", "0002_sequence"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="action",
+            index=models.Index(
+                fields=["plan", "statut"], name="pa_action_plan_statut_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="action",
+            index=models.Index(
+                fields=["plan", "priorite"], name="pa_action_plan_prio_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="action",
+            index=models.Index(fields=["plan", "j"], name="pa_action_plan_j_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="action",
+            index=models.Index(
+                django.db.models.functions.text.Upper("statut"),
+                name="pa_action_statut_ci_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 4.2 on 2026-10-18 17:09
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+import django.db.models.deletion
+
+
+def build_plan_stats(apps, schema_editor):
+    # pa.services.stats counting logic as of this migration, copied so that
+    # later changes to that module leave the migration alone.
+    Action = apps.get_model("pa", "Action")
+    PlanStat = apps.get_model("pa", "PlanStat")
+    closed = Q(a=True) | Q(statut__iexact="closed")
+    stats = []
+    for field in ("statut", "priorite"):
+        for row in Action.objects.values("plan_id", field).annotate(n=Count("id")).order_by():
+            stats.append(
+                PlanStat(plan_id=row["plan_id"], key=f"{field}:{row[field]}", value=row["n"])
+            )
+    totals = (
+        Action.objects.values("plan_id")
+        .order_by()
+        .annotate(
+            total=Count("id"),
+            closed=Count("id", filter=closed),
+            **{flag: Count("id", filter=Q(**{flag: True})) for flag in ("p", "d", "c", "a")},
+        )
+    )
+    for row in totals:
+        plan_id = row.pop("plan_id")
+        stats.extend(
+            PlanStat(plan_id=plan_id, key=key, value=value) for key, value in row.items() if value
+        )
+    PlanStat.objects.bulk_create(stats)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pa", "0003_action_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PlanStat",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("key", models.CharField(max_length=100)),
+                ("value", models.IntegerField(default=0)),
+                (
+                    "plan",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="stats",
+                        to="pa.plan",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="planstat",
+            constraint=models.UniqueConstraint(
+                fields=("plan", "key"), name="pa_planstat_plan_key_uniq"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="action",
+            index=models.Index(fields=["plan", "date_fin"], name="pa_action_plan_fin_idx"),
+        ),
+        migrations.RunPython(build_plan_stats, migrations.RunPython.noop),
+    ]
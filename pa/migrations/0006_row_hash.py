@@ -0,0 +1,45 @@
+# Generated by Django 4.2 on 2026-10-18 17:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pa", "0005_job"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RowHash",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("act_id", models.CharField(max_length=9)),
+                ("excel_row_index", models.IntegerField()),
+                ("digest", models.CharField(max_length=32)),
+                (
+                    "plan",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="row_hashes",
+                        to="pa.plan",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="rowhash",
+            constraint=models.UniqueConstraint(
+                fields=("plan", "act_id"), name="pa_rowhash_plan_act_uniq"
+            ),
+        ),
+    ]
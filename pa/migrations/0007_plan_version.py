@@ -0,0 +1,40 @@
+# Generated by Django 4.2 on 2026-10-18 17:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def create_plan_versions(apps, schema_editor):
+    Plan = apps.get_model("pa", "Plan")
+    PlanVersion = apps.get_model("pa", "PlanVersion")
+    PlanVersion.objects.bulk_create(
+        PlanVersion(plan_id=plan_id) for plan_id in Plan.objects.values_list("id", flat=True)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pa", "0006_row_hash"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PlanVersion",
+            fields=[
+                (
+                    "plan",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="version",
+                        serialize=False,
+                        to="pa.plan",
+                    ),
+                ),
+                ("version", models.BigIntegerField(default=0)),
+                ("modified_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(create_plan_versions, migrations.RunPython.noop),
+    ]
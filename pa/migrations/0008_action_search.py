@@ -0,0 +1,104 @@
+# Generated by Django 4.2 on 2026-10-18 19:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+import pa.models
+
+# The DDL of pa.services.search as of this migration, copied so that later
+# changes to that module leave the migration alone.
+SQLITE_INDEX = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS pa_action_fts USING fts5(
+        titre, commentaire, content='pa_action', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS pa_action_fts_ai AFTER INSERT ON pa_action BEGIN
+        INSERT INTO pa_action_fts(rowid, titre, commentaire)
+        VALUES (new.id, new.titre, new.commentaire);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS pa_action_fts_ad AFTER DELETE ON pa_action BEGIN
+        INSERT INTO pa_action_fts(pa_action_fts, rowid, titre, commentaire)
+        VALUES ('delete', old.id, old.titre, old.commentaire);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS pa_action_fts_au AFTER UPDATE OF titre, commentaire
+    ON pa_action BEGIN
+        INSERT INTO pa_action_fts(pa_action_fts, rowid, titre, commentaire)
+        VALUES ('delete', old.id, old.titre, old.commentaire);
+        INSERT INTO pa_action_fts(rowid, titre, commentaire)
+        VALUES (new.id, new.titre, new.commentaire);
+    END""",
+    "INSERT INTO pa_action_fts(pa_action_fts, rank) VALUES ('rank', 'bm25(2.0, 1.0)')",
+    "INSERT INTO pa_action_fts(pa_action_fts) VALUES ('rebuild')",
+]
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS pa_action_fts_ad",
+    "DROP TRIGGER IF EXISTS pa_action_fts_ai",
+    "DROP TRIGGER IF EXISTS pa_action_fts_au",
+    "DROP TABLE IF EXISTS pa_action_fts",
+]
+POSTGRES_INDEX = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    """DO $$ BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'pa_french') THEN
+            CREATE TEXT SEARCH CONFIGURATION pa_french (COPY = french);
+            ALTER TEXT SEARCH CONFIGURATION pa_french
+                ALTER MAPPING FOR hword, hword_part, word WITH unaccent, french_stem;
+        END IF;
+    END $$""",
+    """ALTER TABLE pa_action ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('pa_french'::regconfig, coalesce(titre, '')), 'A')
+            || setweight(to_tsvector('pa_french'::regconfig, coalesce(commentaire, '')), 'B')
+        ) STORED""",
+    "CREATE INDEX IF NOT EXISTS pa_action_search_idx ON pa_action USING GIN (search_vector)",
+]
+POSTGRES_DROP = [
+    "DROP INDEX IF EXISTS pa_action_search_idx",
+    "ALTER TABLE pa_action DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def _execute(schema_editor, statements):
+    for sql in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql, params=None)
+
+
+def install_search_index(apps, schema_editor):
+    _execute(schema_editor, {"sqlite": SQLITE_INDEX, "postgresql": POSTGRES_INDEX})
+
+
+def drop_search_index(apps, schema_editor):
+    _execute(schema_editor, {"sqlite": SQLITE_DROP, "postgresql": POSTGRES_DROP})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pa", "0007_plan_version"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ActionSearch",
+            fields=[
+                (
+                    "action",
+                    models.OneToOneField(
+                        db_column="rowid",
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        primary_key=True,
+                        related_name="search_index",
+                        serialize=False,
+                        to="pa.action",
+                    ),
+                ),
+                ("document", pa.models.SearchDocumentField(db_column="pa_action_fts")),
+                ("rank", models.FloatField()),
+            ],
+            options={
+                "db_table": "pa_action_fts",
+                "managed": False,
+            },
+        ),
+        migrations.RunPython(install_search_index, drop_search_index),
+    ]
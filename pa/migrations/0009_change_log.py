@@ -0,0 +1,36 @@
+# Generated by Django 4.2 on 2026-10-18 20:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pa", "0008_action_search"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Change",
+            fields=[
+                ("seq", models.BigAutoField(primary_key=True, serialize=False)),
+                ("plan_id", models.BigIntegerField()),
+                ("act_id", models.CharField(blank=True, max_length=9)),
+                (
+                    "op",
+                    models.CharField(
+                        choices=[
+                            ("upsert", "upsert"),
+                            ("delete", "delete"),
+                            ("reset", "reset"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "indexes": [models.Index(fields=["plan_id", "seq"], name="pa_change_plan_seq_idx")],
+            },
+        ),
+    ]
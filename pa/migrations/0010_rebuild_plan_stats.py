@@ -0,0 +1,47 @@
+# Generated by Django 4.2 on 2026-10-18 21:10
+
+from django.db import migrations
+from django.db.models import Count, Q
+
+
+def rebuild_plan_stats(apps, schema_editor):
+    """Add the ``closed_rejected`` counters and drop counters skewed by stale deltas."""
+    # pa.services.stats counting logic as of this migration, copied so that
+    # later changes to that module leave the migration alone.
+    Action = apps.get_model("pa", "Action")
+    PlanStat = apps.get_model("pa", "PlanStat")
+    PlanStat.objects.all().delete()
+    closed = Q(a=True) | Q(statut__iexact="closed")
+    stats = []
+    for field in ("statut", "priorite"):
+        for row in Action.objects.values("plan_id", field).annotate(n=Count("id")).order_by():
+            stats.append(
+                PlanStat(plan_id=row["plan_id"], key=f"{field}:{row[field]}", value=row["n"])
+            )
+    totals = (
+        Action.objects.values("plan_id")
+        .order_by()
+        .annotate(
+            total=Count("id"),
+            closed=Count("id", filter=closed),
+            closed_rejected=Count("id", filter=closed & Q(statut__iexact="rejected")),
+            **{flag: Count("id", filter=Q(**{flag: True})) for flag in ("p", "d", "c", "a")},
+        )
+    )
+    for row in totals:
+        plan_id = row.pop("plan_id")
+        stats.extend(
+            PlanStat(plan_id=plan_id, key=key, value=value) for key, value in row.items() if value
+        )
+    PlanStat.objects.bulk_create(stats)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pa", "0009_change_log"),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_plan_stats, migrations.RunPython.noop),
+    ]
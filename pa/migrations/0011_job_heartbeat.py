@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-18 21:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pa", "0010_rebuild_plan_stats"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="job",
+            name="heartbeat_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
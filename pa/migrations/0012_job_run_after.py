@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-18 21:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pa", "0011_job_heartbeat"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="job",
+            name="run_after",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
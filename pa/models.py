@@ -1,5 +1,7 @@
 from django.conf import settings
-from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+from django.db.models.functions import Upper
 
 
 class Plan(models.Model):
@@ -32,9 +34,180 @@ class Action(models.Model):
     excel_feuille = models.CharField(max_length=255)
     excel_row_index = models.IntegerField()
 
+    class Meta:
+        # Match ActionFilter: every list query is scoped by plan first.
+        indexes = [
+            models.Index(fields=["plan", "statut"], name="pa_action_plan_statut_idx"),
+            models.Index(fields=["plan", "priorite"], name="pa_action_plan_prio_idx"),
+            models.Index(fields=["plan", "j"], name="pa_action_plan_j_idx"),
+            models.Index(fields=["plan", "date_fin"], name="pa_action_plan_fin_idx"),
+            # statut__iexact compiles to UPPER(statut) = UPPER(%s) on PostgreSQL.
+            models.Index(Upper("statut"), name="pa_action_statut_ci_idx"),
+        ]
+
     def __str__(self) -> str:
         return f"{self.act_id} - {self.titre}"
 
+    def save(self, *args, **kwargs):
+        """Enregistre dans une transaction : les compteurs du plan verrouillent l'ancienne ligne."""
+        with transaction.atomic(using=kwargs.get("using"), savepoint=False):
+            super().save(*args, **kwargs)
+
+
+class Match(models.Lookup):
+    """``document__match=...`` : ``<colonne> MATCH <requête>`` (FTS5)."""
+
+    lookup_name = "match"
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} MATCH {rhs}", [*lhs_params, *rhs_params]
+
+
+class SearchDocumentField(models.TextField):
+    """Colonne cachée portant le nom de la table FTS5, cible de ``MATCH``."""
+
+
+SearchDocumentField.register_lookup(Match)
+
+
+class ActionSearch(models.Model):
+    """Index plein texte de ``titre`` et ``commentaire`` (table virtuelle FTS5, SQLite).
+
+    Table externe tenue à jour par des triggers, voir ``pa.services.search``.
+    Sous PostgreSQL, la recherche utilise la colonne ``search_vector`` de
+    ``pa_action`` et cette table n'existe pas.
+    """
+
+    action = models.OneToOneField(
+        Action,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column="rowid",
+        db_constraint=False,
+        related_name="search_index",
+    )
+    document = SearchDocumentField(db_column="pa_action_fts")
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = "pa_action_fts"
+
+
+class PlanStat(models.Model):
+    """Compteur matérialisé d'un plan (``total``, ``statut:open``, ``p``, ...)."""
+
+    plan = models.ForeignKey(Plan, on_delete=models.CASCADE, related_name="stats")
+    key = models.CharField(max_length=100)
+    value = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["plan", "key"], name="pa_planstat_plan_key_uniq"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.plan_id} {self.key} = {self.value}"
+
+
+class PlanVersion(models.Model):
+    """Version d'un plan, incrémentée à chaque écriture sur le plan ou ses actions."""
+
+    plan = models.OneToOneField(
+        Plan, on_delete=models.CASCADE, primary_key=True, related_name="version"
+    )
+    version = models.BigIntegerField(default=0)
+    modified_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"{self.plan_id} v{self.version}"
+
+
+class RowHash(models.Model):
+    """Empreinte du contenu d'une ligne Excel lors de la dernière synchronisation."""
+
+    plan = models.ForeignKey(Plan, on_delete=models.CASCADE, related_name="row_hashes")
+    act_id = models.CharField(max_length=9)
+    excel_row_index = models.IntegerField()
+    digest = models.CharField(max_length=32)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["plan", "act_id"], name="pa_rowhash_plan_act_uniq"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.plan_id} {self.act_id}@{self.excel_row_index}"
+
+
+class Change(models.Model):
+    """Entrée du journal des modifications, numérotée dans l'ordre des écritures.
+
+    ``act_id`` est vide pour les modifications du plan lui-même ; ``reset``
+    signifie que toutes les actions du plan sont à recharger.
+    """
+
+    class Op(models.TextChoices):
+        UPSERT = "upsert", "upsert"
+        DELETE = "delete", "delete"
+        RESET = "reset", "reset"
+
+    seq = models.BigAutoField(primary_key=True)
+    # Pas de clé étrangère : le journal survit à la suppression du plan.
+    plan_id = models.BigIntegerField()
+    act_id = models.CharField(max_length=9, blank=True)
+    op = models.CharField(max_length=10, choices=Op.choices)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["plan_id", "seq"], name="pa_change_plan_seq_idx")]
+
+    def __str__(self) -> str:
+        return f"#{self.seq} {self.op} {self.plan_id} {self.act_id}"
+
+
+class Sequence(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+    last_value = models.BigIntegerField(default=0)
+
+    def __str__(self) -> str:
+        return f"{self.name} = {self.last_value}"
+
+
+class Job(models.Model):
+    class Status(models.TextChoices):
+        PENDING = "pending", "pending"
+        RUNNING = "running", "running"
+        SUCCEEDED = "succeeded", "succeeded"
+        FAILED = "failed", "failed"
+
+    kind = models.CharField(max_length=50)
+    params = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    progress_done = models.IntegerField(default=0)
+    progress_total = models.IntegerField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    error = models.TextField(blank=True)
+    plan = models.ForeignKey(Plan, on_delete=models.CASCADE, null=True, blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Renouvelé par le worker tant que la tâche tourne.
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    # Une tâche relancée attend cette date avant d'être reprise.
+    run_after = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "id"], name="pa_job_status_idx")]
+
+    def __str__(self) -> str:
+        return f"{self.kind} #{self.pk} ({self.status})"
+
 
 class Profile(models.Model):
     class Role(models.TextChoices):
@@ -0,0 +1,20 @@
+from rest_framework.pagination import CursorPagination
+
+from .services.search import SEARCH_RANK
+
+
+class IdCursorPagination(CursorPagination):
+    """Keyset pagination on the primary key: cost depends on page size only.
+
+    Searched querysets (``?q=``) are paginated by relevance instead.
+    """
+
+    ordering = "id"
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 500
+
+    def get_ordering(self, request, queryset, view):
+        if SEARCH_RANK in queryset.query.annotations:
+            return (SEARCH_RANK, "id")
+        return super().get_ordering(request, queryset, view)
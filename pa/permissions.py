@@ -1,16 +1,114 @@
+from dataclasses import dataclass
+from typing import FrozenSet, Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import caches
 from rest_framework.permissions import BasePermission, SAFE_METHODS
 
+from .metrics import timed
 from .models import Plan, Profile
 
 
+@dataclass(frozen=True)
+class PermissionContext:
+    """Rôle et plans autorisés de l'utilisateur, calculés une fois par requête."""
+
+    role: Optional[str]
+    plan_ids: FrozenSet[int]
+
+    @property
+    def sees_all_plans(self) -> bool:
+        return self.role in (Profile.Role.SUPER_ADMIN, Profile.Role.PILOTE_PROCESSUS)
+
+    def can_read(self, plan_id: int) -> bool:
+        return self.sees_all_plans or plan_id in self.plan_ids
+
+    def can_write(self, plan_id: int) -> bool:
+        if self.sees_all_plans:
+            return True
+        return self.role == Profile.Role.PILOTE and plan_id in self.plan_ids
+
+    def scope(self, queryset, plan_field: str = "plan_id"):
+        """Restreint un queryset aux plans visibles, au niveau SQL."""
+        if self.sees_all_plans:
+            return queryset
+        return queryset.filter(**{f"{plan_field}__in": self.plan_ids})
+
+
+# Caches propres à chaque processus : les signaux n'y invalideraient que le
+# processus qui écrit, les autres workers garderaient des droits révoqués.
+LOCAL_CACHE_BACKENDS = {
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+}
+
+
+def _cache():
+    """Retourne le cache partagé des contextes, ou ``None`` s'il est local au processus."""
+    alias = getattr(settings, "PA_PERMISSION_CACHE_ALIAS", "default")
+    if settings.CACHES[alias]["BACKEND"] in LOCAL_CACHE_BACKENDS:
+        return None
+    return caches[alias]
+
+
+def _cache_key(user_id: int) -> str:
+    return f"pa:permissions:{user_id}"
+
+
+def load_permission_context(user) -> PermissionContext:
+    """Calcule le contexte d'un utilisateur depuis son profil (deux requêtes au plus)."""
+    profile = getattr(user, "profile", None)
+    role = getattr(profile, "role", None)
+    plan_ids = frozenset()
+    if role in (Profile.Role.PILOTE, Profile.Role.UTILISATEUR):
+        plan_ids = frozenset(profile.plans_autorises.values_list("id", flat=True))
+    return PermissionContext(role, plan_ids)
+
+
+def invalidate_permission_context(user_ids: Iterable[int]) -> None:
+    """Oublie le contexte mis en cache des utilisateurs donnés."""
+    cache = _cache()
+    if cache is not None:
+        cache.delete_many([_cache_key(user_id) for user_id in user_ids])
+
+
+def get_permission_context(request) -> PermissionContext:
+    """Retourne le contexte de permissions de la requête.
+
+    Il est mémorisé sur la requête et, pendant ``PA_PERMISSION_CACHE_TIMEOUT``
+    secondes, dans le cache Django par utilisateur si ce cache est partagé
+    entre processus ; les signaux l'invalident quand le profil ou ses
+    ``plans_autorises`` changent.
+    """
+    context = getattr(request, "_pa_permissions", None)
+    if context is not None:
+        return context
+    user = request.user
+    timeout = getattr(settings, "PA_PERMISSION_CACHE_TIMEOUT", 300)
+    cache = _cache() if timeout else None
+    if not user or not user.is_authenticated:
+        context = PermissionContext(None, frozenset())
+    elif cache is None:
+        context = load_permission_context(user)
+    else:
+        key = _cache_key(user.pk)
+        context = cache.get(key)
+        if context is None:
+            context = load_permission_context(user)
+            cache.set(key, context, timeout)
+    request._pa_permissions = context
+    return context
+
+
 class RolePermission(BasePermission):
     """Permissions basées sur le rôle du profil."""
 
+    @timed("permission.check")
     def has_permission(self, request, view):
         user = request.user
         if not user or not user.is_authenticated:
             return False
-        role = getattr(user.profile, "role", None)
+        role = get_permission_context(request).role
         if role == Profile.Role.SUPER_ADMIN:
             return True
         if role == Profile.Role.PILOTE_PROCESSUS:
@@ -21,15 +119,10 @@ class RolePermission(BasePermission):
             return request.method in SAFE_METHODS
         return False
 
+    @timed("permission.object")
     def has_object_permission(self, request, view, obj):
-        user = request.user
-        role = user.profile.role
-        if role in (Profile.Role.SUPER_ADMIN, Profile.Role.PILOTE_PROCESSUS):
-            return True
-        allowed = user.profile.plans_autorises.all()
-        plan = obj if isinstance(obj, Plan) else obj.plan
-        if role == Profile.Role.PILOTE:
-            return plan in allowed
-        if role == Profile.Role.UTILISATEUR and request.method in SAFE_METHODS:
-            return plan in allowed
-        return False
+        context = get_permission_context(request)
+        plan_id = obj.pk if isinstance(obj, Plan) else obj.plan_id
+        if request.method in SAFE_METHODS:
+            return context.can_read(plan_id)
+        return context.can_write(plan_id)
@@ -0,0 +1,30 @@
+import json
+
+from rest_framework.renderers import BaseRenderer
+
+
+class ExportRenderer(BaseRenderer):
+    """Accept ``?format=`` for file exports; the view streams the file itself.
+
+    Only error payloads (e.g. permission denied) are rendered here, as JSON.
+    """
+
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data).encode()
+
+
+class CSVRenderer(ExportRenderer):
+    media_type = "text/csv"
+    format = "csv"
+
+
+class XLSXRenderer(ExportRenderer):
+    media_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    format = "xlsx"
+
+
+class EventStreamRenderer(ExportRenderer):
+    media_type = "text/event-stream"
+    format = "event-stream"
@@ -1,23 +1,55 @@
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
 
-from .models import Action, Plan
+from .metrics import span
+from .models import Action, Job, Plan
 
 User = get_user_model()
 
 
+def requested_fields(request):
+    """Return the field names asked for with ``?fields=a,b``, or ``None``."""
+    if request is None or request.method != "GET":
+        return None
+    raw = request.query_params.get("fields")
+    if not raw:
+        return None
+    return {name.strip() for name in raw.split(",") if name.strip()}
+
+
+class SparseFieldsMixin:
+    """Only serialize the fields listed in the ``fields`` query parameter."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        wanted = requested_fields(self.context.get("request"))
+        if wanted is not None:
+            for name in set(self.fields) - wanted:
+                self.fields.pop(name)
+
+
+class TimedListSerializer(serializers.ListSerializer):
+    """Time the serialization of list pages as the ``serialize.<model>`` span."""
+
+    def to_representation(self, data):
+        with span(f"serialize.{self.child.Meta.model._meta.model_name}"):
+            return super().to_representation(data)
+
+
 class PlanSerializer(serializers.ModelSerializer):
     class Meta:
         model = Plan
+        list_serializer_class = TimedListSerializer
         fields = ["id", "nom", "excel_path", "excel_sheet", "header_row_index"]
 
 
-class ActionSerializer(serializers.ModelSerializer):
+class ActionSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     responsables = serializers.PrimaryKeyRelatedField(many=True, queryset=User.objects.all())
     act_id = serializers.CharField(read_only=True)
 
     class Meta:
         model = Action
+        list_serializer_class = TimedListSerializer
         fields = [
             "id",
             "act_id",
@@ -39,3 +71,32 @@ class ActionSerializer(serializers.ModelSerializer):
             "excel_feuille",
             "excel_row_index",
         ]
+
+
+class JobSerializer(serializers.ModelSerializer):
+    progress = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = [
+            "id",
+            "kind",
+            "status",
+            "plan",
+            "progress",
+            "progress_done",
+            "progress_total",
+            "result",
+            "error",
+            "created_at",
+            "started_at",
+            "finished_at",
+        ]
+        read_only_fields = fields
+
+    def get_progress(self, obj):
+        if obj.status == Job.Status.SUCCEEDED:
+            return 100
+        if not obj.progress_total:
+            return None
+        return min(100, round(100 * obj.progress_done / obj.progress_total))
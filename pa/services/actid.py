@@ -1,16 +1,96 @@
-from pa.models import Action
+import re
+import random
+import time
+from typing import Iterable, List
+
+from django.db import IntegrityError, OperationalError, transaction
+from django.db.models import F
+
+from pa.models import Action, Sequence
+
+SEQUENCE_NAME = "act_id"
+ACT_ID_RE = re.compile(r"ACT-(\d+)")
+
+
+def format_act_id(number: int) -> str:
+    return f"ACT-{number:04d}"
+
+
+def parse_act_id(act_id: str):
+    """Return the number of an ``ACT-xxxx`` identifier, or ``None``."""
+    match = ACT_ID_RE.fullmatch(act_id or "")
+    return int(match.group(1)) if match else None
+
+
+def _highest(act_ids: Iterable[str]) -> int:
+    return max((n for n in map(parse_act_id, act_ids) if n is not None), default=0)
+
+
+def _create_sequence() -> None:
+    """Create the counter row, seeded past the highest existing identifier."""
+    highest = _highest(Action.objects.values_list("act_id", flat=True).iterator())
+    try:
+        with transaction.atomic():
+            Sequence.objects.get_or_create(name=SEQUENCE_NAME, defaults={"last_value": highest})
+    except IntegrityError:
+        pass
+
+
+def reserve_act_ids(count: int, after: Iterable[str] = (), retries: int = 20) -> List[str]:
+    """Atomically claim ``count`` consecutive ACT identifiers.
+
+    The counter row is incremented with a single ``UPDATE ... SET last_value =
+    last_value + n``, which takes the row lock (or SQLite's write lock) until
+    the transaction ends, so concurrent callers never get overlapping blocks.
+    The block starts past every identifier in ``after``: callers pass the
+    explicit identifiers they are about to save, so that none of them is
+    handed out again.
+    """
+    if count < 1:
+        return []
+    highest = _highest(after)
+    for attempt in range(retries):
+        try:
+            with transaction.atomic():
+                if highest:
+                    Sequence.objects.filter(name=SEQUENCE_NAME, last_value__lt=highest).update(
+                        last_value=highest
+                    )
+                Sequence.objects.filter(name=SEQUENCE_NAME).update(
+                    last_value=F("last_value") + count
+                )
+                last = (
+                    Sequence.objects.filter(name=SEQUENCE_NAME)
+                    .values_list("last_value", flat=True)
+                    .first()
+                )
+                if last is None:
+                    _create_sequence()
+                    continue
+            break
+        except OperationalError:
+            # SQLite reports "database is locked" instead of waiting when
+            # another connection holds the write lock.
+            if attempt == retries - 1:
+                raise
+            time.sleep(random.uniform(0.005, 0.05))
+    else:
+        raise OperationalError("Could not reserve ACT identifiers")
+    return [format_act_id(number) for number in range(last - count + 1, last + 1)]
+
+
+def advance_act_ids(act_ids: Iterable[str]) -> None:
+    """Move the sequence past identifiers that were assigned explicitly."""
+    highest = _highest(act_ids)
+    if not highest:
+        return
+    updated = Sequence.objects.filter(name=SEQUENCE_NAME, last_value__lt=highest).update(
+        last_value=highest
+    )
+    if not updated and not Sequence.objects.filter(name=SEQUENCE_NAME).exists():
+        _create_sequence()
 
 
 def generate_act_id() -> str:
     """Return the next ACT identifier in the sequence ACT-0001, ACT-0002, ..."""
-    last_action = Action.objects.order_by('id').last()
-    if not last_action or not last_action.act_id:
-        next_number = 1
-    else:
-        try:
-            last_number = int(last_action.act_id.split('-')[1])
-        except (IndexError, ValueError):
-            next_number = 1
-        else:
-            next_number = last_number + 1
-    return f"ACT-{next_number:04d}"
+    return reserve_act_ids(1)[0]
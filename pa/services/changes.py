@@ -0,0 +1,122 @@
+from datetime import timedelta
+from typing import Dict, Iterable, Optional
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from pa.models import Change, Sequence
+
+# Sequence row holding the highest seq removed by ``prune_changes``.
+PRUNED_SEQUENCE = "changes.pruned"
+# Arbitrary key of the PostgreSQL advisory lock serializing log writers.
+POSTGRES_LOCK_KEY = 0x7061_6368
+
+
+class ChangesPruned(Exception):
+    """The requested position is older than the retained part of the log."""
+
+
+def _lock_log(using: str) -> None:
+    """Make log entries commit in ``seq`` order.
+
+    A PostgreSQL sequence hands out numbers when rows are inserted, not when
+    they commit, so a reader could see seq 11 before seq 10 commits and then
+    skip it. Writers hold this lock until their transaction ends. SQLite
+    serializes writers anyway.
+    """
+    connection = connections[using]
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", [POSTGRES_LOCK_KEY])
+
+
+def record_changes(
+    plan_id: Optional[int], act_ids: Iterable[str] = (), op: str = Change.Op.UPSERT
+) -> None:
+    """Append the changed actions of a plan to the log, in one INSERT.
+
+    Without ``act_ids`` the entry is about the plan itself. Past
+    ``PA_CHANGES_MAX_ROWS`` identifiers a single ``reset`` entry is written
+    instead, telling clients to reload the plan's actions.
+    """
+    if plan_id is None:
+        return
+    act_ids = list(dict.fromkeys(act_id for act_id in act_ids if act_id))
+    limit = getattr(settings, "PA_CHANGES_MAX_ROWS", 1000)
+    if len(act_ids) > limit:
+        entries = [Change(plan_id=plan_id, op=Change.Op.RESET)]
+    elif act_ids:
+        entries = [Change(plan_id=plan_id, act_id=act_id, op=op) for act_id in act_ids]
+    else:
+        entries = [Change(plan_id=plan_id, op=op)]
+    using = Change.objects.db
+    with transaction.atomic(using=using, savepoint=False):
+        _lock_log(using)
+        Change.objects.bulk_create(entries)
+
+
+def pruned_seq() -> int:
+    """Return the highest seq no longer in the log, 0 if nothing was pruned."""
+    value = (
+        Sequence.objects.filter(name=PRUNED_SEQUENCE).values_list("last_value", flat=True).first()
+    )
+    return value or 0
+
+
+def changes_since(changes, since: int, limit: int) -> Dict:
+    """Read the log after ``since`` from a (permission scoped) Change queryset.
+
+    Entries are collapsed to the latest one per action or plan; a ``reset``
+    or a plan deletion supersedes the earlier entries of its actions. Returns
+    the entries, ``last_seq`` (the position to resume from) and ``has_more``.
+    Raises ``ChangesPruned`` when entries after ``since`` were pruned.
+    """
+    pruned = pruned_seq()
+    if since < pruned:
+        raise ChangesPruned(f"Changes up to {pruned} were pruned, reload everything.")
+    rows = list(
+        changes.filter(seq__gt=since)
+        .order_by("seq")
+        .values_list("seq", "plan_id", "act_id", "op")[: limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    latest: Dict[tuple, Dict] = {}
+    for seq, plan_id, act_id, op in rows:
+        if op == Change.Op.RESET or (op == Change.Op.DELETE and not act_id):
+            for key in [key for key in latest if key[0] == plan_id and key[1]]:
+                del latest[key]
+        latest.pop((plan_id, act_id), None)
+        latest[(plan_id, act_id)] = {"seq": seq, "plan": plan_id, "act_id": act_id, "op": op}
+    return {
+        "changes": list(latest.values()),
+        "last_seq": rows[-1][0] if rows else since,
+        "has_more": has_more,
+    }
+
+
+def latest_seq() -> int:
+    return Change.objects.aggregate(seq=Max("seq"))["seq"] or 0
+
+
+def prune_changes(max_age: Optional[float] = None) -> int:
+    """Delete log entries older than ``max_age`` seconds; returns how many.
+
+    Clients positioned before the pruned range get ``ChangesPruned`` and must
+    reload from the list endpoints.
+    """
+    if max_age is None:
+        max_age = getattr(settings, "PA_CHANGES_RETENTION", 7 * 24 * 3600)
+    cutoff = timezone.now() - timedelta(seconds=max_age)
+    highest = Change.objects.filter(created_at__lt=cutoff).aggregate(seq=Max("seq"))["seq"]
+    if highest is None:
+        return 0
+    with transaction.atomic():
+        sequence, _ = Sequence.objects.select_for_update().get_or_create(name=PRUNED_SEQUENCE)
+        if highest > sequence.last_value:
+            sequence.last_value = highest
+            sequence.save(update_fields=["last_value"])
+        deleted, _ = Change.objects.filter(seq__lte=highest).delete()
+    return deleted
@@ -0,0 +1,132 @@
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Iterable, Optional
+
+# Action fields kept in sync with plan workbook columns, besides act_id.
+SYNC_FIELDS = [
+    "titre",
+    "statut",
+    "priorite",
+    "budget_dzd",
+    "p",
+    "d",
+    "c",
+    "a",
+    "j",
+    "date_debut",
+    "date_fin",
+    "commentaire",
+]
+
+# Extra header labels accepted for a field, besides the field name itself.
+HEADER_ALIASES = {
+    "budget_dzd": ["budget"],
+    "date_debut": ["debut", "début"],
+    "date_fin": ["fin", "echeance", "échéance"],
+}
+
+TRUE_VALUES = {"1", "x", "oui", "yes", "true", "vrai", "o", "y"}
+
+
+HEADER_LABELS = {
+    label: field
+    for field in ["act_id", *SYNC_FIELDS]
+    for label in [field, *HEADER_ALIASES.get(field, [])]
+}
+
+
+def field_for_header(header) -> Optional[str]:
+    """Return the Action field a sheet header maps to, if any."""
+    return HEADER_LABELS.get(str(header).strip().lower())
+
+
+def map_columns(headers: Iterable[str]) -> Dict[str, str]:
+    """Return ``{field: header}`` for the sheet headers matching Action fields."""
+    mapping = {}
+    for header in headers:
+        field = field_for_header(header)
+        if field and field not in mapping:
+            mapping[field] = header
+    return mapping
+
+
+def _to_bool(value) -> bool:
+    if isinstance(value, bool):
+        return value
+    if value is None:
+        return False
+    return str(value).strip().lower() in TRUE_VALUES
+
+
+def _to_date(value) -> Optional[date]:
+    if value in (None, ""):
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value).strip()[:10], "%Y-%m-%d").date()
+
+
+def _to_decimal(value) -> Optional[Decimal]:
+    if value in (None, ""):
+        return None
+    try:
+        return Decimal(str(value)).quantize(Decimal("0.01"))
+    except InvalidOperation:
+        raise ValueError(f"invalid budget {value!r}")
+
+
+def _to_int(value) -> Optional[int]:
+    if value in (None, ""):
+        return None
+    return int(float(value))
+
+
+def to_str(value) -> str:
+    return "" if value is None else str(value).strip()
+
+
+CONVERTERS = {
+    "budget_dzd": _to_decimal,
+    "p": _to_bool,
+    "d": _to_bool,
+    "c": _to_bool,
+    "a": _to_bool,
+    "j": _to_int,
+    "date_debut": _to_date,
+    "date_fin": _to_date,
+}
+
+
+def row_values(row: Dict, columns: Dict[str, str]) -> Dict:
+    """Convert a sheet row to Action field values; raise ValueError if invalid."""
+    values = {}
+    for field, header in columns.items():
+        if field == "act_id":
+            continue
+        try:
+            values[field] = CONVERTERS.get(field, to_str)(row.get(header))
+        except (TypeError, ValueError) as exc:
+            raise ValueError(f"{field}: {exc}")
+    return values
+
+
+def field_value(field: str, cell):
+    """Convert a cell value to what the Action field would hold."""
+    return CONVERTERS.get(field, to_str)(cell)
+
+
+def cell_value(field: str, value):
+    """Convert an Action field value to what is written in the cell."""
+    if value == "" and field not in CONVERTERS:
+        return None
+    return value
+
+
+def differs(field: str, value, cell) -> bool:
+    """Whether writing ``value`` would change the meaning of ``cell``."""
+    try:
+        return field_value(field, cell) != value
+    except (TypeError, ValueError):
+        return True
@@ -1,67 +1,406 @@
+import atexit
 import logging
-from typing import List, Dict
+import os
+import shutil
+import tempfile
+from datetime import date, datetime, time
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
-import pandas as pd
+from django.conf import settings
 from openpyxl import load_workbook
 
+from pa.metrics import span, timed
 from pa.models import Plan, Action
+from pa.services.columns import SYNC_FIELDS, cell_value, differs, map_columns, row_values, to_str
+from pa.services.jobs import enqueue_job
+from pa.services.filelock import WorkbookConflict, workbook_lock
+from pa.services.row_index import RowIndex, load_row_index, record_save
+from pa.services.sheet_cache import Fingerprint, ParsedSheet, TooLarge, fingerprint, sheet_cache
+from pa.services.writeback import WriteBackQueue
 
 logger = logging.getLogger(__name__)
 
+try:
+    import python_calamine
+except ImportError:
+    python_calamine = None
 
-def read_plan(plan: Plan, limit: int = 50) -> List[Dict]:
-    """Return a preview of plan actions from the source Excel file."""
-    df = pd.read_excel(
-        plan.excel_path,
-        sheet_name=plan.excel_sheet,
-        header=plan.header_row_index - 1,
-    )
-    return df.head(limit).to_dict(orient="records")
+WRITE_FIELDS = ["act_id", *SYNC_FIELDS]
+
+
+def _header_names(values) -> List[str]:
+    """Name header cells the way pandas does, so previews keep the same keys."""
+    return [
+        str(value) if value is not None else f"Unnamed: {idx}" for idx, value in enumerate(values)
+    ]
+
+
+def read_engine() -> str:
+    """Return ``PA_EXCEL_READ_ENGINE``, by default calamine when it is installed."""
+    engine = getattr(settings, "PA_EXCEL_READ_ENGINE", None)
+    if engine:
+        return engine
+    return "calamine" if python_calamine is not None else "openpyxl"
+
+
+def _calamine_cell(value):
+    """Return a calamine cell value the way openpyxl reads it."""
+    if isinstance(value, str):
+        return value if value else None
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if type(value) is date:
+        return datetime.combine(value, time())
+    return value
+
+
+def _calamine_rows(path: str, sheet: str, header_row: int) -> Iterator[Sequence]:
+    wb = python_calamine.CalamineWorkbook.from_path(path)
+    try:
+        # Without skip_empty_area, rows and columns start at A1 as with openpyxl.
+        rows = wb.get_sheet_by_name(sheet).to_python(skip_empty_area=False)
+        for values in islice(rows, header_row - 1, None):
+            yield [_calamine_cell(value) for value in values]
+    finally:
+        wb.close()
+
+
+def _openpyxl_rows(path: str, sheet: str, header_row: int) -> Iterator[Sequence]:
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        yield from wb[sheet].iter_rows(min_row=header_row, values_only=True)
+    finally:
+        wb.close()
+
+
+def iter_sheet_values(path: str, sheet: str, header_row: int) -> Iterator[Sequence]:
+    """Stream the cell values of the rows from ``header_row`` on, header included.
+
+    Uses calamine (:func:`read_engine`), several times faster than openpyxl
+    but holding the sheet in native memory; openpyxl in read-only mode keeps
+    memory flat whatever the sheet size. Both return the same values.
+    """
+    if read_engine() == "calamine":
+        return _calamine_rows(path, sheet, header_row)
+    return _openpyxl_rows(path, sheet, header_row)
+
+
+def iter_numbered_rows(path: str, sheet: str, header_row: int) -> Iterator[Tuple[int, Dict]]:
+    """Stream ``(excel_row_index, row)`` pairs below ``header_row``, skipping blank lines.
+
+    The generator stops reading as soon as it is closed.
+    """
+    rows = iter_sheet_values(path, sheet, header_row)
+    try:
+        headers = _header_names(next(rows, ()))
+        for row_index, values in enumerate(rows, start=header_row + 1):
+            if all(value is None for value in values):
+                continue
+            yield row_index, dict(zip(headers, values))
+    finally:
+        rows.close()
+
+
+def iter_sheet_rows(path: str, sheet: str, header_row: int, offset: int = 0) -> Iterator[Dict]:
+    """Stream the rows below ``header_row`` as dicts, starting after ``offset`` rows."""
+    rows = iter_numbered_rows(path, sheet, header_row)
+    try:
+        for _, row in islice(rows, offset, None):
+            yield row
+    finally:
+        rows.close()
+
+
+@timed("excel.parse_sheet")
+def load_sheet(
+    path: str, sheet: str, header_row: int, fp: Fingerprint, max_cells: int
+) -> ParsedSheet:
+    """Parse a whole sheet into row tuples, giving up past ``max_cells``."""
+    rows = iter_sheet_values(path, sheet, header_row)
+    try:
+        headers = _header_names(next(rows, ()))
+        width = max(len(headers), 1)
+        data, numbers = [], []
+        for row_index, values in enumerate(rows, start=header_row + 1):
+            if all(value is None for value in values):
+                continue
+            data.append(tuple(values))
+            numbers.append(row_index)
+            if len(data) * width > max_cells:
+                raise TooLarge(path)
+    finally:
+        rows.close()
+    return ParsedSheet(headers, data, fp, numbers)
+
+
+def cached_sheet(path: str, sheet: str, header_row: int) -> Optional[ParsedSheet]:
+    """Return the parsed sheet from the process cache, or ``None`` if too large."""
+    return sheet_cache.get_or_load(path, sheet, header_row, load_sheet)
+
+
+def sheet_row_count(path: str, sheet: str, header_row: int) -> int:
+    """Upper bound of the rows below the header, from the sheet dimensions."""
+    wb = load_workbook(path, read_only=True)
+    try:
+        return max((wb[sheet].max_row or 0) - header_row, 0)
+    finally:
+        wb.close()
+
+
+@timed("excel.read_plan")
+def read_plan(plan: Plan, limit: int = 50, offset: int = 0) -> List[Dict]:
+    """Return a page of plan actions from the source Excel file."""
+    parsed = cached_sheet(plan.excel_path, plan.excel_sheet, plan.header_row_index)
+    if parsed is not None:
+        return parsed.records(offset, limit)
+    rows = iter_sheet_rows(plan.excel_path, plan.excel_sheet, plan.header_row_index, offset)
+    try:
+        return list(islice(rows, limit))
+    finally:
+        rows.close()
+
+
+def snapshot_action(action: Action, fields: Optional[Iterable[str]] = None) -> Dict:
+    """Capture what write-back needs from an action, without further DB access.
+
+    ``fields`` restricts the write to the fields that were edited, so that
+    other cells changed in the workbook meanwhile are left alone.
+    """
+    data = {field: getattr(action, field) for field in WRITE_FIELDS}
+    data["excel_row_index"] = action.excel_row_index
+    data["fields"] = WRITE_FIELDS if fields is None else [f for f in WRITE_FIELDS if f in fields]
+    return data
+
+
+def _changed_fields(data: Dict, cells: Dict[str, object]) -> List[str]:
+    """Fields of a snapshot whose value differs from the given ``{field: cell}``."""
+    wanted = data.get("fields", WRITE_FIELDS)
+    return [
+        field
+        for field, cell in cells.items()
+        if field in wanted and differs(field, data[field], cell)
+    ]
+
+
+def _target_row(index: RowIndex, data: Dict) -> int:
+    """Row of a snapshot in the sheet: where its act_id is now, else where it was."""
+    return index.row_of(data["act_id"]) or data["excel_row_index"]
 
 
+def _sheet_is_current(path: str, sheet: str, header_row: int, rows: List[Dict]) -> bool:
+    """Check the snapshots against the cached sheet, without opening it for writing."""
+    parsed = cached_sheet(path, sheet, header_row)
+    if parsed is None:
+        return False
+    index = load_row_index(path, sheet, header_row)
+    columns = map_columns(parsed.headers)
+    for data in rows:
+        record = parsed.record_at(_target_row(index, data))
+        if record is None:
+            return False
+        cells = {field: record[header] for field, header in columns.items()}
+        if _changed_fields(data, cells):
+            return False
+    return True
+
+
+def _save_atomically(wb, path: str, expected: Fingerprint) -> Fingerprint:
+    """Save next to ``path`` and swap it in, unless the file changed since ``expected``.
+
+    Returns the fingerprint of the saved file (a rename keeps mtime and size).
+    """
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".xlsx")
+    os.close(fd)
+    try:
+        wb.save(tmp)
+        shutil.copymode(path, tmp)
+        saved = fingerprint(tmp)
+        if fingerprint(path) != expected:
+            raise WorkbookConflict(path)
+        os.replace(tmp, path)
+        return saved
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+@timed("excel.modify")
+def _apply_snapshots(ws, index: RowIndex, rows: List[Dict]) -> Tuple[int, Dict[str, int]]:
+    """Write the differing cells of each snapshot into a loaded sheet.
+
+    Returns the number of rows modified and the rows that received their
+    ``act_id``.
+    """
+    col_map = index.columns
+    act_col = col_map.get("act_id")
+    changed_rows = 0
+    numbered = {}
+    for data in rows:
+        row = index.row_of(data["act_id"])
+        if row is None:
+            # Not in the sheet yet: only an unnumbered row may receive it.
+            row = data["excel_row_index"]
+            current = to_str(ws.cell(row=row, column=act_col).value) if act_col else ""
+            if current:
+                logger.warning(
+                    "%s not found in %s, row %s holds %s: skipped",
+                    data["act_id"],
+                    ws.title,
+                    row,
+                    current,
+                )
+                continue
+        cells = {field: ws.cell(row=row, column=col).value for field, col in col_map.items()}
+        changed = _changed_fields(data, cells)
+        for field in changed:
+            ws.cell(row=row, column=col_map[field], value=cell_value(field, data[field]))
+        if "act_id" in changed:
+            numbered[data["act_id"]] = row
+        changed_rows += bool(changed)
+    return changed_rows, numbered
+
+
+def write_rows(path: str, sheet: str, header_row: int, rows: List[Dict], retries: int = 3) -> int:
+    """Write action snapshots into one sheet with a single load and save.
+
+    Rows are located through the persisted :func:`load_row_index`, so actions
+    whose row was moved in Excel are written where their ``act_id`` now is;
+    a snapshot whose row now holds another action is skipped. Only cells
+    whose value differs are written, and the workbook is neither loaded for
+    writing nor saved when nothing changed. The load/modify/save cycle runs
+    under :func:`workbook_lock`; if the file still changes under us (an
+    editor that ignores the lock), the cycle is retried on the new contents
+    instead of overwriting them. Returns the number of rows modified.
+    """
+    if _sheet_is_current(path, sheet, header_row, rows):
+        return 0
+    with workbook_lock(path):
+        for attempt in range(retries):
+            expected = fingerprint(path)
+            index = load_row_index(path, sheet, header_row, expected)
+            with span("excel.load"):
+                wb = load_workbook(path)
+            changed_rows, numbered = _apply_snapshots(wb[sheet], index, rows)
+
+            if not changed_rows:
+                return 0
+            try:
+                with span("excel.save"):
+                    saved = _save_atomically(wb, path, expected)
+            except WorkbookConflict:
+                logger.warning("%s changed while writing, retrying (%s)", path, attempt + 1)
+                continue
+            finally:
+                sheet_cache.invalidate(path)
+            record_save(path, sheet, header_row, index, saved, numbered)
+            logger.info("%s row(s) written to %s[%s]", changed_rows, path, sheet)
+            return changed_rows
+    raise WorkbookConflict(path)
+
+
+def read_row(path: str, sheet: str, header_row: int, row_index: int) -> Dict:
+    """Read only the header and one row of a sheet, in read-only mode."""
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet]
+        header = next(ws.iter_rows(min_row=header_row, max_row=header_row, values_only=True), ())
+        values = next(ws.iter_rows(min_row=row_index, max_row=row_index, values_only=True), ())
+    finally:
+        wb.close()
+    return dict(zip(_header_names(header), values))
+
+
+@timed("excel.write_action")
 def write_action(action: Action) -> Action:
-    """Write the action back to its Excel source and reload it from disk."""
-    wb = load_workbook(action.excel_fichier)
-    ws = wb[action.excel_feuille]
+    """Write the action back to its Excel source and reload its row from disk.
+
+    The row is found through the row index; when it moved, the new position
+    is saved on the action too.
+    """
+    path, sheet = action.excel_fichier, action.excel_feuille
     header_row = action.plan.header_row_index
-    headers = [cell.value for cell in ws[header_row]]
-    col_map = {header: idx + 1 for idx, header in enumerate(headers) if header}
-    row = action.excel_row_index
-
-    if "act_id" in col_map:
-        ws.cell(row=row, column=col_map["act_id"], value=action.act_id)
-    if "titre" in col_map:
-        ws.cell(row=row, column=col_map["titre"], value=action.titre)
-    if "statut" in col_map:
-        ws.cell(row=row, column=col_map["statut"], value=action.statut)
-    if "priorite" in col_map:
-        ws.cell(row=row, column=col_map["priorite"], value=action.priorite)
-
-    wb.save(action.excel_fichier)
-    logger.info(
-        "Action %s written to %s[%s] row %s",
-        action.act_id,
-        action.excel_fichier,
-        action.excel_feuille,
-        action.excel_row_index,
-    )
+    if not write_rows(path, sheet, header_row, [snapshot_action(action)]):
+        return action
+    row_index = load_row_index(path, sheet, header_row).row_of(action.act_id)
+    if row_index is None:
+        logger.warning("Action %s not found in %s[%s] after writing", action.act_id, path, sheet)
+        return action
+    logger.info("Action %s written to %s[%s] row %s", action.act_id, path, sheet, row_index)
 
-    df = pd.read_excel(
-        action.excel_fichier,
-        sheet_name=action.excel_feuille,
-        header=action.plan.header_row_index - 1,
-    )
-    row_data = df[df["act_id"] == action.act_id].iloc[0].to_dict()
-    for field in ["titre", "statut", "priorite"]:
-        if field in row_data:
-            setattr(action, field, row_data[field])
-    action.save()
+    with span("excel.reload"):
+        row_data = read_row(path, sheet, header_row, row_index)
+    columns = map_columns(row_data)
+    values = row_values(row_data, {f: h for f, h in columns.items() if f in SYNC_FIELDS})
+    values["excel_row_index"] = row_index
+    changed = [field for field, value in values.items() if getattr(action, field) != value]
+    for field in changed:
+        setattr(action, field, values[field])
+    if changed:
+        action.save(update_fields=changed)
     return action
 
 
-def apply_update(act_id: str, strategy: str = "plan") -> int:
-    """Apply updates for all occurrences of an action depending on strategy."""
-    actions = Action.objects.filter(act_id=act_id)
+def write_actions(actions: Iterable[Action], fields: Optional[Iterable[str]] = None) -> int:
+    """Write several actions now, with one load and save per sheet."""
+    batches = {}
+    for action in actions:
+        key = (action.excel_fichier, action.excel_feuille, action.plan.header_row_index)
+        batches.setdefault(key, []).append(snapshot_action(action, fields))
+    return sum(
+        write_rows(path, sheet, header_row, rows)
+        for (path, sheet, header_row), rows in batches.items()
+    )
+
+
+writeback_queue = WriteBackQueue(write_rows)
+atexit.register(writeback_queue.flush)
+
+
+def _sheet_key(action: Action) -> Tuple[str, str, int]:
+    return action.excel_fichier, action.excel_feuille, action.plan.header_row_index
+
+
+def enqueue_action(action: Action, fields: Optional[Iterable[str]] = None) -> None:
+    """Schedule a batched write-back of the action to its Excel source."""
+    writeback_queue.enqueue(_sheet_key(action), action.act_id, snapshot_action(action, fields))
+
+
+def queue_writeback(actions: List[Action], fields: Optional[Iterable[str]] = None) -> int:
+    """Hand actions to the write-back backend, with one save per workbook.
+
+    With ``PA_EXCEL_WRITEBACK_BACKEND = "jobs"`` a single ``excel.writeback``
+    job is stored; otherwise the edits are queued together on
+    ``writeback_queue``.
+    """
+    if not actions:
+        return 0
+    fields = None if fields is None else list(fields)
+    if getattr(settings, "PA_EXCEL_WRITEBACK_BACKEND", "queue") == "jobs":
+        plans = {act.plan_id for act in actions}
+        params = {"act_ids": [act.act_id for act in actions], "fields": fields}
+        enqueue_job("excel.writeback", params, plan=actions[0].plan if len(plans) == 1 else None)
+    else:
+        writeback_queue.enqueue_many(
+            (_sheet_key(act), act.act_id, snapshot_action(act, fields)) for act in actions
+        )
+    return len(actions)
+
+
+@timed("excel.apply_update")
+def apply_update(
+    act_id: str, strategy: str = "plan", fields: Optional[Iterable[str]] = None
+) -> int:
+    """Queue write-back for all occurrences of an action depending on strategy.
+
+    ``fields`` limits the write to the edited fields (default: all of them).
+
+    Edits are coalesced per workbook by ``writeback_queue``; call
+    ``writeback_queue.flush()`` to apply them immediately. With
+    ``PA_EXCEL_WRITEBACK_BACKEND = "jobs"`` they are handed to the ``run_jobs``
+    worker instead, keeping workbook I/O out of web processes.
+    """
+    actions = Action.objects.filter(act_id=act_id).select_related("plan")
     if not actions.exists():
         return 0
     if strategy == "all":
@@ -70,8 +409,4 @@ def apply_update(act_id: str, strategy: str = "plan") -> int:
         to_update = actions.exclude(statut__iexact="closed")
     else:  # default 'plan'
         to_update = [actions.first()]
-    count = 0
-    for act in to_update:
-        write_action(act)
-        count += 1
-    return count
+    return queue_writeback(list(to_update), fields)
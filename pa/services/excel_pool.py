@@ -0,0 +1,79 @@
+import asyncio
+import contextvars
+import functools
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, Optional, TypeVar
+
+from django.conf import settings
+
+T = TypeVar("T")
+
+
+class ExcelIOTimeout(TimeoutError):
+    """Workbook I/O did not finish, or could not start, within the timeout."""
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[int, asyncio.Semaphore]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def excel_executor() -> ThreadPoolExecutor:
+    """Thread pool reserved for workbook I/O, sized by ``PA_EXCEL_IO_THREADS``."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, "PA_EXCEL_IO_THREADS", 8),
+            thread_name_prefix="excel-io",
+        )
+    return _executor
+
+
+@asynccontextmanager
+async def plan_slot(plan_id: int):
+    """Allow at most ``PA_EXCEL_IO_PER_PLAN`` concurrent workbook reads per plan.
+
+    Semaphores belong to the running event loop, so each ASGI worker (or
+    test loop) gets its own set.
+    """
+    per_loop = _slots.setdefault(asyncio.get_running_loop(), {})
+    semaphore = per_loop.get(plan_id)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(getattr(settings, "PA_EXCEL_IO_PER_PLAN", 2))
+        per_loop[plan_id] = semaphore
+    async with semaphore:
+        yield
+
+
+async def run_excel_io(
+    plan_id: int, func: Callable[..., T], *args, timeout: Optional[float] = None, **kwargs
+) -> T:
+    """Run blocking workbook I/O in the Excel pool without blocking the event loop.
+
+    Waiting for a per-plan slot counts towards ``timeout`` (default
+    ``PA_EXCEL_IO_TIMEOUT``). If the caller is cancelled or times out, work
+    that has not started yet is dropped; work already running finishes in its
+    thread but its result is discarded. Raises :class:`ExcelIOTimeout`.
+    """
+    if timeout is None:
+        timeout = getattr(settings, "PA_EXCEL_IO_TIMEOUT", 30)
+
+    async def run():
+        async with plan_slot(plan_id):
+            loop = asyncio.get_running_loop()
+            # Carry the request context over, so spans land in its breakdown.
+            call = functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+            future = loop.run_in_executor(excel_executor(), call)
+            try:
+                return await future
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+
+    try:
+        return await asyncio.wait_for(run(), timeout)
+    except asyncio.TimeoutError:
+        raise ExcelIOTimeout(f"Workbook I/O for plan {plan_id} took more than {timeout}s")
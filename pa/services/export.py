@@ -0,0 +1,67 @@
+import csv
+import os
+import tempfile
+from typing import Iterable, Iterator, Sequence
+
+from openpyxl import Workbook
+
+from pa.services.columns import SYNC_FIELDS
+
+EXPORT_FIELDS = ["act_id", *SYNC_FIELDS, "plan__nom", "excel_row_index"]
+EXPORT_HEADERS = ["act_id", *SYNC_FIELDS, "plan", "excel_row_index"]
+CHUNK_SIZE = 2000
+FILE_BLOCK = 64 * 1024
+
+
+class _Echo:
+    """File-like object whose ``write`` hands the line back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(queryset) -> Iterator[tuple]:
+    """Stream the export columns of an Action queryset without loading it whole."""
+    return queryset.order_by("id").values_list(*EXPORT_FIELDS).iterator(chunk_size=CHUNK_SIZE)
+
+
+def iter_csv(rows: Iterable[Sequence], headers: Sequence[str] = EXPORT_HEADERS) -> Iterator[bytes]:
+    """Encode rows as UTF-8 CSV, yielding blocks of about 64 KiB.
+
+    Starts with a byte order mark so Excel opens accented text correctly.
+    """
+    writer = csv.writer(_Echo())
+    buffer = ["\ufeff", writer.writerow(headers)]
+    size = 0
+    for row in rows:
+        line = writer.writerow(["" if value is None else value for value in row])
+        buffer.append(line)
+        size += len(line)
+        if size >= FILE_BLOCK:
+            yield "".join(buffer).encode()
+            buffer, size = [], 0
+    yield "".join(buffer).encode()
+
+
+def iter_xlsx(
+    rows: Iterable[Sequence], headers: Sequence[str] = EXPORT_HEADERS, title: str = "actions"
+) -> Iterator[bytes]:
+    """Build an XLSX file with openpyxl write-only mode and yield it in blocks.
+
+    Write-only worksheets spool rows to disk, so memory stays flat; the
+    zipped file can only be sent once every row has been written.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title)
+    ws.append(list(headers))
+    for row in rows:
+        ws.append(list(row))
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        wb.save(path)
+        with open(path, "rb") as fh:
+            for block in iter(lambda: fh.read(FILE_BLOCK), b""):
+                yield block
+    finally:
+        os.remove(path)
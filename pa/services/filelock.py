@@ -0,0 +1,82 @@
+import hashlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+
+class WorkbookBusy(Exception):
+    """The workbook could not be written right now; the write may be retried."""
+
+
+class WorkbookLocked(WorkbookBusy, TimeoutError):
+    """Another process held the workbook lock for longer than the timeout."""
+
+
+class WorkbookConflict(WorkbookBusy):
+    """The workbook kept changing under us while we were writing it."""
+
+
+_local_locks: Dict[str, threading.Lock] = {}
+_local_locks_guard = threading.Lock()
+
+
+def _local_lock(path: str) -> threading.Lock:
+    with _local_locks_guard:
+        return _local_locks.setdefault(path, threading.Lock())
+
+
+def lock_path(path: str) -> str:
+    """Return the lock file used for a workbook.
+
+    Defaults to a ``.lock`` file next to the workbook; ``PA_EXCEL_LOCK_DIR``
+    moves lock files elsewhere, e.g. when the share is read-only for locks.
+    """
+    lock_dir = getattr(settings, "PA_EXCEL_LOCK_DIR", None)
+    if not lock_dir:
+        return f"{path}.lock"
+    digest = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()
+    return os.path.join(lock_dir, f"{digest}.lock")
+
+
+@contextmanager
+def workbook_lock(path: str, timeout: Optional[float] = None):
+    """Hold an exclusive lock on ``path`` across threads and processes.
+
+    Uses an advisory ``flock`` on a side file, so only writers going through
+    this function are serialized; locks on different workbooks never wait on
+    each other. Raises :class:`WorkbookLocked` after ``timeout`` seconds.
+    """
+    if timeout is None:
+        timeout = getattr(settings, "PA_EXCEL_LOCK_TIMEOUT", 10)
+    deadline = time.monotonic() + timeout
+    local = _local_lock(os.path.abspath(path))
+    if not local.acquire(timeout=max(timeout, 0)):
+        raise WorkbookLocked(path)
+    try:
+        if fcntl is None:
+            yield
+            return
+        with open(lock_path(path), "a") as fh:
+            while True:
+                try:
+                    fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    if time.monotonic() >= deadline:
+                        raise WorkbookLocked(path)
+                    time.sleep(0.05)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+    finally:
+        local.release()
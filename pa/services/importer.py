@@ -0,0 +1,153 @@
+import logging
+from itertools import chain, islice
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from django.db import transaction
+
+from pa.models import Action, Plan
+from pa.services.actid import advance_act_ids, reserve_act_ids
+from pa.services.changes import record_changes
+from pa.services.columns import map_columns, row_values, to_str
+from pa.services.excel_io import enqueue_action, iter_numbered_rows
+from pa.services.stats import rebuild_plan_stats
+from pa.services.versions import bump_plan_versions
+
+logger = logging.getLogger(__name__)
+
+
+def _chunks(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _import_chunk(
+    plan: Plan,
+    chunk: List[Tuple[int, Dict]],
+    columns: Dict[str, str],
+    counts: Dict,
+    touched: List[str],
+    seen: Set[str],
+    unnumbered: List[Dict],
+) -> None:
+    parsed = {}
+    for row_index, row in chunk:
+        act_id = to_str(row.get(columns["act_id"]))
+        if len(act_id) > Action._meta.get_field("act_id").max_length:
+            counts["skipped"] += 1
+            continue
+        # The first occurrence wins, as in sync_plan and the row index.
+        if act_id in seen:
+            counts["skipped"] += 1
+            continue
+        if act_id:
+            seen.add(act_id)
+        try:
+            values = row_values(row, columns)
+        except ValueError as exc:
+            logger.warning("Row %s of %s skipped: %s", row_index, plan.excel_path, exc)
+            counts["skipped"] += 1
+            continue
+        values.update(
+            excel_fichier=plan.excel_path,
+            excel_feuille=plan.excel_sheet,
+            excel_row_index=row_index,
+        )
+        if not act_id:
+            if values.get("titre"):
+                unnumbered.append(values)
+            else:
+                counts["skipped"] += 1
+            continue
+        parsed[act_id] = values
+    _upsert(plan, parsed, counts, touched)
+
+
+def _upsert(
+    plan: Plan,
+    parsed: Dict[str, Dict],
+    counts: Dict,
+    touched: List[str],
+    numbered: Optional[List[Action]] = None,
+) -> None:
+    """Create or update actions by ``act_id``; new ones are added to ``numbered``."""
+    existing = Action.objects.in_bulk(list(parsed), field_name="act_id")
+    to_create, to_update = [], []
+    update_fields = set()
+    for act_id, values in parsed.items():
+        action = existing.get(act_id)
+        if action is None:
+            to_create.append(Action(act_id=act_id, plan=plan, **values))
+            continue
+        if action.plan_id != plan.id:
+            logger.warning("%s belongs to another plan, row skipped", act_id)
+            counts["skipped"] += 1
+            continue
+        changed = [field for field, value in values.items() if getattr(action, field) != value]
+        if not changed:
+            counts["unchanged"] += 1
+            continue
+        for field in changed:
+            setattr(action, field, values[field])
+        update_fields.update(changed)
+        to_update.append(action)
+
+    if to_create:
+        Action.objects.bulk_create(to_create)
+        advance_act_ids(action.act_id for action in to_create)
+        if numbered is not None:
+            numbered.extend(to_create)
+    if to_update:
+        Action.objects.bulk_update(to_update, sorted(update_fields))
+    touched.extend(action.act_id for action in chain(to_create, to_update))
+    counts["inserted"] += len(to_create)
+    counts["updated"] += len(to_update)
+
+
+def import_plan(
+    plan: Plan, chunk_size: int = 1000, progress: Optional[Callable[[int], None]] = None
+) -> Dict[str, int]:
+    """Upsert the actions of a plan's workbook into the database by ``act_id``.
+
+    The sheet is streamed and processed in chunks; each chunk costs one
+    lookup query, one ``bulk_create`` and one ``bulk_update`` whatever its
+    size. Rows without an ``act_id`` get a freshly reserved identifier once
+    the whole sheet is read, past every explicit one, which is then written
+    back to the sheet. Returns inserted/updated/unchanged/skipped counts.
+    ``progress`` is called with the number of rows read after each chunk.
+    """
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0, "skipped": 0}
+    numbered, touched, seen, unnumbered = [], [], set(), []
+    rows = iter_numbered_rows(plan.excel_path, plan.excel_sheet, plan.header_row_index)
+    try:
+        first = next(rows, None)
+        if first is None:
+            return counts
+        columns = map_columns(first[1].keys())
+        if "act_id" not in columns:
+            raise ValueError(f"No act_id column in {plan.excel_path}[{plan.excel_sheet}]")
+        with transaction.atomic():
+            done = 0
+            for chunk in _chunks(chain([first], rows), chunk_size):
+                _import_chunk(plan, chunk, columns, counts, touched, seen, unnumbered)
+                done += len(chunk)
+                if progress is not None:
+                    progress(done)
+            # A contiguous block in one round trip, that no act_id of the sheet can collide with.
+            reserved = reserve_act_ids(len(unnumbered), after=seen)
+            _upsert(plan, dict(zip(reserved, unnumbered)), counts, touched, numbered)
+            # Bulk writes bypass the signals that maintain plan counters.
+            if counts["inserted"] or counts["updated"]:
+                rebuild_plan_stats([plan.pk])
+                bump_plan_versions([plan.pk])
+                record_changes(plan.pk, touched)
+    finally:
+        rows.close()
+    # Only queue write-back once the read-only stream has released the file.
+    for action in numbered:
+        enqueue_action(action, ["act_id"])
+    logger.info("Plan %s imported: %s", plan.pk, counts)
+    return counts
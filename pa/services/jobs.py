@@ -0,0 +1,174 @@
+import logging
+import traceback
+from datetime import timedelta
+from typing import Callable, Dict, Iterable, Optional
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+
+from pa.models import Job
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[..., Optional[Dict]]
+
+HANDLERS: Dict[str, Handler] = {}
+
+
+class RetryJob(Exception):
+    """Raised by a handler to run its job again in ``delay`` seconds.
+
+    The delay defaults to ``PA_JOBS_RETRY_DELAY``.
+    """
+
+    def __init__(self, reason: str = "", delay: Optional[float] = None):
+        super().__init__(reason)
+        self.delay = getattr(settings, "PA_JOBS_RETRY_DELAY", 5) if delay is None else delay
+
+
+def job_handler(kind: str):
+    """Register a function as the handler of a job kind.
+
+    Handlers receive the :class:`Job` followed by its params as keyword
+    arguments, may call :func:`report_progress`, and return a JSON result.
+    """
+
+    def register(func: Handler) -> Handler:
+        HANDLERS[kind] = func
+        return func
+
+    return register
+
+
+def enqueue_job(kind: str, params: Optional[Dict] = None, user=None, plan=None) -> Job:
+    """Store a pending job for the ``run_jobs`` worker and return it."""
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind {kind!r}")
+    return Job.objects.create(
+        kind=kind,
+        params=params or {},
+        plan=plan,
+        created_by=user if user is not None and user.is_authenticated else None,
+    )
+
+
+def report_progress(job: Job, done: int, total: Optional[int] = None) -> None:
+    """Record how far a running job is, with a single UPDATE."""
+    job.progress_done = done
+    if total is not None:
+        job.progress_total = total
+    Job.objects.filter(pk=job.pk).update(
+        progress_done=job.progress_done,
+        progress_total=job.progress_total,
+        heartbeat_at=timezone.now(),
+    )
+
+
+def claim_next_job() -> Optional[Job]:
+    """Atomically move the oldest pending job to running and return it.
+
+    The claim is a compare-and-set ``UPDATE ... WHERE status = 'pending'``,
+    so several workers can poll the same table without a broker.
+    """
+    while True:
+        due = Q(run_after__isnull=True) | Q(run_after__lte=timezone.now())
+        candidate = (
+            Job.objects.filter(due, status=Job.Status.PENDING)
+            .order_by("id")
+            .values_list("pk", flat=True)
+            .first()
+        )
+        if candidate is None:
+            return None
+        now = timezone.now()
+        claimed = Job.objects.filter(pk=candidate, status=Job.Status.PENDING).update(
+            status=Job.Status.RUNNING, started_at=now, heartbeat_at=now
+        )
+        if claimed:
+            return Job.objects.get(pk=candidate)
+
+
+def run_job(job: Job) -> Job:
+    """Run a claimed job and store its result or error.
+
+    A job whose handler raises :class:`RetryJob` goes back to pending.
+    """
+    handler = HANDLERS.get(job.kind)
+    try:
+        if handler is None:
+            raise ValueError(f"Unknown job kind {job.kind!r}")
+        job.result = handler(job, **job.params)
+        job.status = Job.Status.SUCCEEDED
+        if job.progress_total is not None:
+            job.progress_done = job.progress_total
+    except RetryJob as exc:
+        logger.warning("Job %s (%s) retried in %ss: %s", job.pk, job.kind, exc.delay, exc)
+        job.status = Job.Status.PENDING
+        job.started_at = job.heartbeat_at = None
+        job.run_after = timezone.now() + timedelta(seconds=exc.delay)
+        job.save(update_fields=["status", "started_at", "heartbeat_at", "run_after"])
+        return job
+    except Exception:
+        logger.exception("Job %s (%s) failed", job.pk, job.kind)
+        job.status = Job.Status.FAILED
+        job.error = traceback.format_exc(limit=5)
+    job.finished_at = timezone.now()
+    job.save(
+        update_fields=[
+            "status",
+            "result",
+            "error",
+            "progress_done",
+            "progress_total",
+            "finished_at",
+        ]
+    )
+    return job
+
+
+def run_pending_jobs(limit: Optional[int] = None) -> int:
+    """Run pending jobs in the current thread; used by tests and ``--once``."""
+    count = 0
+    while limit is None or count < limit:
+        job = claim_next_job()
+        if job is None:
+            break
+        run_job(job)
+        count += 1
+    return count
+
+
+def heartbeat_jobs(job_ids: Iterable[int]) -> int:
+    """Tell other workers that these running jobs are still alive."""
+    job_ids = list(job_ids)
+    if not job_ids:
+        return 0
+    return Job.objects.filter(pk__in=job_ids, status=Job.Status.RUNNING).update(
+        heartbeat_at=timezone.now()
+    )
+
+
+def requeue_stale_jobs(max_age: Optional[float] = None) -> int:
+    """Put back running jobs whose worker stopped beating for ``max_age`` seconds.
+
+    Live workers beat every ``PA_JOBS_HEARTBEAT`` seconds, so a job still
+    running elsewhere is never requeued however long it has been running.
+    """
+    if max_age is None:
+        max_age = getattr(settings, "PA_JOBS_STALE_AFTER", 300)
+    cutoff = timezone.now() - timedelta(seconds=max_age)
+    silent = Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff)
+    return Job.objects.filter(silent, status=Job.Status.RUNNING).update(
+        status=Job.Status.PENDING, started_at=None, heartbeat_at=None
+    )
+
+
+def run_in_worker_thread(job: Job) -> Job:
+    """Run a job from a pool thread, which owns its own DB connection."""
+    close_old_connections()
+    try:
+        return run_job(job)
+    finally:
+        close_old_connections()
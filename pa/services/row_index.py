@@ -0,0 +1,145 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from django.conf import settings
+from openpyxl import load_workbook
+
+from pa.metrics import timed
+from pa.models import Action
+from pa.services.columns import field_for_header, to_str
+from pa.services.sheet_cache import Fingerprint, fingerprint
+
+logger = logging.getLogger(__name__)
+
+ACT_ID_LENGTH = Action._meta.get_field("act_id").max_length
+
+
+@dataclass
+class RowIndex:
+    """Where each ``act_id`` and mapped column sits in a sheet (1-based Excel numbers)."""
+
+    fingerprint: Fingerprint
+    columns: Dict[str, int] = field(default_factory=dict)
+    rows: Dict[str, int] = field(default_factory=dict)
+
+    def row_of(self, act_id: str) -> Optional[int]:
+        return self.rows.get(act_id)
+
+
+def index_path(path: str) -> str:
+    """Return the file holding the row indexes of a workbook.
+
+    Defaults to a ``.rowindex.json`` file next to the workbook, like lock
+    files; ``PA_ROW_INDEX_DIR`` moves index files elsewhere.
+    """
+    index_dir = getattr(settings, "PA_ROW_INDEX_DIR", None)
+    if not index_dir:
+        return f"{path}.rowindex.json"
+    digest = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()
+    return os.path.join(index_dir, f"{digest}.rowindex.json")
+
+
+def _sheet_key(sheet: str, header_row: int) -> str:
+    return f"{header_row}:{sheet}"
+
+
+def _read(path: str) -> Dict:
+    try:
+        with open(index_path(path), encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write(path: str, data: Dict) -> None:
+    """Replace the index file atomically, so concurrent readers never see half of it."""
+    target = index_path(path)
+    tmp = None
+    try:
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(target)), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            json.dump(data, fh)
+        os.replace(tmp, target)
+    except OSError as exc:
+        # The index is only an accelerator: it is rebuilt on the next use.
+        logger.warning("Row index of %s not saved: %r", path, exc)
+    finally:
+        if tmp and os.path.exists(tmp):
+            os.remove(tmp)
+
+
+@timed("excel.build_row_index")
+def build_row_index(path: str, sheet: str, header_row: int, fp: Fingerprint) -> RowIndex:
+    """Locate the mapped columns and every ``act_id`` in one read-only pass."""
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb[sheet].iter_rows(min_row=header_row, values_only=True)
+        index = RowIndex(fp)
+        for col, header in enumerate(next(rows, ()), start=1):
+            name = field_for_header(header) if header is not None else None
+            if name and name not in index.columns:
+                index.columns[name] = col
+        act_col = index.columns.get("act_id")
+        if act_col is None:
+            return index
+        for row_index, values in enumerate(rows, start=header_row + 1):
+            act_id = to_str(values[act_col - 1]) if len(values) >= act_col else ""
+            # The first occurrence wins, as in the importer.
+            if act_id and len(act_id) <= ACT_ID_LENGTH and act_id not in index.rows:
+                index.rows[act_id] = row_index
+    finally:
+        wb.close()
+    return index
+
+
+def load_row_index(
+    path: str, sheet: str, header_row: int, fp: Optional[Fingerprint] = None
+) -> RowIndex:
+    """Return the row index of a sheet, rebuilding it when the workbook changed.
+
+    The index is persisted per workbook and only trusted while the file
+    fingerprint matches the one it was built from; ``fp`` lets callers that
+    already took the fingerprint (under the workbook lock) pass it along.
+    """
+    fp = tuple(fp or fingerprint(path))
+    data = _read(path)
+    key = _sheet_key(sheet, header_row)
+    if tuple(data.get("fingerprint", ())) == fp and key in data.get("sheets", {}):
+        entry = data["sheets"][key]
+        return RowIndex(fp, entry["columns"], entry["rows"])
+
+    logger.info("Building row index of %s[%s]", path, sheet)
+    index = build_row_index(path, sheet, header_row, fp)
+    sheets = data.get("sheets", {}) if tuple(data.get("fingerprint", ())) == fp else {}
+    sheets[key] = {"columns": index.columns, "rows": index.rows}
+    _write(path, {"fingerprint": list(fp), "sheets": sheets})
+    return index
+
+
+def record_save(
+    path: str,
+    sheet: str,
+    header_row: int,
+    index: RowIndex,
+    fp: Fingerprint,
+    numbered: Optional[Dict[str, int]] = None,
+) -> None:
+    """Carry the indexes of ``path`` over to ``fp`` after we saved it ourselves.
+
+    Our writes only change cell values, so rows stay where they were; the
+    ``act_id`` values just written (``numbered``, act_id → row) are added. Indexes
+    of the other sheets are kept when they matched the file we loaded.
+    """
+    data = _read(path)
+    sheets = (
+        data.get("sheets", {}) if tuple(data.get("fingerprint", ())) == index.fingerprint else {}
+    )
+    rows = dict(index.rows)
+    rows.update(numbered or {})
+    sheets[_sheet_key(sheet, header_row)] = {"columns": index.columns, "rows": rows}
+    _write(path, {"fingerprint": list(fp), "sheets": sheets})
@@ -0,0 +1,147 @@
+import logging
+import re
+from typing import List
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import BooleanField, F, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+logger = logging.getLogger(__name__)
+
+# Sort key annotated on searched querysets, best match first (ascending).
+SEARCH_RANK = "search_rank"
+
+# External-content FTS5 table over pa_action, accent-insensitive, kept in
+# sync by triggers so that bulk_create/bulk_update and raw SQL are covered.
+# Titles weigh twice as much as comments in the bm25 rank.
+SQLITE_INDEX = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS pa_action_fts USING fts5(
+        titre, commentaire, content='pa_action', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS pa_action_fts_ai AFTER INSERT ON pa_action BEGIN
+        INSERT INTO pa_action_fts(rowid, titre, commentaire)
+        VALUES (new.id, new.titre, new.commentaire);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS pa_action_fts_ad AFTER DELETE ON pa_action BEGIN
+        INSERT INTO pa_action_fts(pa_action_fts, rowid, titre, commentaire)
+        VALUES ('delete', old.id, old.titre, old.commentaire);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS pa_action_fts_au AFTER UPDATE OF titre, commentaire
+    ON pa_action BEGIN
+        INSERT INTO pa_action_fts(pa_action_fts, rowid, titre, commentaire)
+        VALUES ('delete', old.id, old.titre, old.commentaire);
+        INSERT INTO pa_action_fts(rowid, titre, commentaire)
+        VALUES (new.id, new.titre, new.commentaire);
+    END""",
+    "INSERT INTO pa_action_fts(pa_action_fts, rank) VALUES ('rank', 'bm25(2.0, 1.0)')",
+    "INSERT INTO pa_action_fts(pa_action_fts) VALUES ('rebuild')",
+]
+SQLITE_TRIGGERS = {"pa_action_fts_ai", "pa_action_fts_ad", "pa_action_fts_au"}
+SQLITE_DROP = [
+    *(f"DROP TRIGGER IF EXISTS {name}" for name in sorted(SQLITE_TRIGGERS)),
+    "DROP TABLE IF EXISTS pa_action_fts",
+]
+
+# French stemming without accents (needs the unaccent extension), in a stored
+# generated column with a GIN index.
+POSTGRES_INDEX = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    """DO $$ BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'pa_french') THEN
+            CREATE TEXT SEARCH CONFIGURATION pa_french (COPY = french);
+            ALTER TEXT SEARCH CONFIGURATION pa_french
+                ALTER MAPPING FOR hword, hword_part, word WITH unaccent, french_stem;
+        END IF;
+    END $$""",
+    """ALTER TABLE pa_action ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('pa_french'::regconfig, coalesce(titre, '')), 'A')
+            || setweight(to_tsvector('pa_french'::regconfig, coalesce(commentaire, '')), 'B')
+        ) STORED""",
+    "CREATE INDEX IF NOT EXISTS pa_action_search_idx ON pa_action USING GIN (search_vector)",
+]
+POSTGRES_DROP = [
+    "DROP INDEX IF EXISTS pa_action_search_idx",
+    "ALTER TABLE pa_action DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def install_search_index(connection) -> None:
+    """Create the full-text index of the connection's backend, if it has one."""
+    statements = {"sqlite": SQLITE_INDEX, "postgresql": POSTGRES_INDEX}.get(connection.vendor)
+    with connection.cursor() as cursor:
+        for sql in statements or []:
+            cursor.execute(sql)
+
+
+def drop_search_index(connection) -> None:
+    statements = {"sqlite": SQLITE_DROP, "postgresql": POSTGRES_DROP}.get(connection.vendor)
+    with connection.cursor() as cursor:
+        for sql in statements or []:
+            cursor.execute(sql)
+
+
+def ensure_search_triggers(connection) -> None:
+    """Restore the SQLite triggers, and rebuild the index, if they went missing.
+
+    SQLite migrations that alter ``pa_action`` copy it into a new table,
+    which drops its triggers; this runs after every ``migrate``.
+    """
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+        missing = SQLITE_TRIGGERS - {row[0] for row in cursor.fetchall()}
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'pa_action_fts'")
+        if not missing or cursor.fetchone() is None:
+            return
+    logger.warning("Full-text triggers %s missing, rebuilding the index", sorted(missing))
+    install_search_index(connection)
+
+
+def search_terms(text: str) -> List[str]:
+    """Split a search into words; punctuation and query operators are dropped."""
+    limit = getattr(settings, "PA_SEARCH_MAX_TERMS", 8)
+    return re.findall(r"\w+", text or "")[:limit]
+
+
+def search_actions(queryset, text: str):
+    """Restrict an Action queryset to the actions matching every word of ``text``.
+
+    Words match as prefixes of words in ``titre`` or ``commentaire``,
+    ignoring case and accents. The queryset is annotated with
+    ``search_rank``, lower is better; callers order by it. Other filters
+    can be chained before or after.
+    """
+    terms = search_terms(text)
+    if not terms:
+        return queryset
+    vendor = connections[queryset.db].vendor
+    if vendor == "sqlite":
+        match = " ".join(f'"{term}"*' for term in terms)
+        return queryset.filter(search_index__document__match=match).annotate(
+            **{SEARCH_RANK: F("search_index__rank")}
+        )
+    if vendor == "postgresql":
+        tsquery = " & ".join(f"{term}:*" for term in terms)
+        table = queryset.model._meta.db_table
+        return queryset.annotate(
+            search_match=RawSQL(
+                f"{table}.search_vector @@ to_tsquery('pa_french', %s)",
+                (tsquery,),
+                output_field=BooleanField(),
+            ),
+            **{
+                SEARCH_RANK: RawSQL(
+                    f"-ts_rank({table}.search_vector, to_tsquery('pa_french', %s))",
+                    (tsquery,),
+                    output_field=FloatField(),
+                )
+            },
+        ).filter(search_match=True)
+    # No full-text index on this backend: unranked substring match.
+    for term in terms:
+        queryset = queryset.filter(Q(titre__icontains=term) | Q(commentaire__icontains=term))
+    return queryset.annotate(**{SEARCH_RANK: Value(0.0)})
@@ -0,0 +1,163 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+Fingerprint = Tuple[int, int, str]
+CacheKey = Tuple[str, str, int]
+
+
+@dataclass
+class ParsedSheet:
+    """Rows of a sheet below its header, with the header → position map."""
+
+    headers: List[str]
+    rows: List[tuple]
+    fingerprint: Fingerprint
+    row_numbers: List[int] = field(default_factory=list)
+    columns: Dict[str, int] = field(init=False)
+    positions: Dict[int, int] = field(init=False)
+
+    def __post_init__(self):
+        self.columns = {name: idx for idx, name in enumerate(self.headers)}
+        self.positions = {number: idx for idx, number in enumerate(self.row_numbers)}
+
+    @property
+    def cells(self) -> int:
+        return len(self.headers) * len(self.rows)
+
+    def record_at(self, row_number: int) -> Optional[Dict]:
+        """Return the row at an Excel row number, or ``None`` if it is blank."""
+        idx = self.positions.get(row_number)
+        return None if idx is None else dict(zip(self.headers, self.rows[idx]))
+
+    def records(self, offset: int = 0, limit: Optional[int] = None) -> List[Dict]:
+        end = None if limit is None else offset + limit
+        return [dict(zip(self.headers, row)) for row in self.rows[offset:end]]
+
+
+class TooLarge(Exception):
+    """Raised by loaders when a sheet exceeds the cache cell budget."""
+
+
+def fingerprint(path: str, with_hash: bool = False) -> Fingerprint:
+    """Identify a file version by mtime and size, optionally by content hash."""
+    stat = os.stat(path)
+    digest = ""
+    if with_hash:
+        sha = hashlib.sha1()
+        with open(path, "rb") as fh:
+            for chunk in iter(lambda: fh.read(1 << 20), b""):
+                sha.update(chunk)
+        digest = sha.hexdigest()
+    return stat.st_mtime_ns, stat.st_size, digest
+
+
+class SheetCache:
+    """Process-wide LRU cache of parsed sheets, bounded by entries and cells.
+
+    Entries are keyed by ``(path, sheet, header_row)`` and only served while
+    the file fingerprint is unchanged. Sheets that do not fit the cell budget
+    are remembered as too large so callers can fall back to streaming.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, max_cells: Optional[int] = None):
+        self._max_entries = max_entries
+        self._max_cells = max_cells
+        self._entries: "OrderedDict[CacheKey, ParsedSheet]" = OrderedDict()
+        self._too_large: Dict[CacheKey, Fingerprint] = {}
+        self._cells = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def max_entries(self) -> int:
+        if self._max_entries is not None:
+            return self._max_entries
+        return getattr(settings, "PA_SHEET_CACHE_MAX_ENTRIES", 16)
+
+    @property
+    def max_cells(self) -> int:
+        if self._max_cells is not None:
+            return self._max_cells
+        return getattr(settings, "PA_SHEET_CACHE_MAX_CELLS", 2_000_000)
+
+    def get_or_load(
+        self,
+        path: str,
+        sheet: str,
+        header_row: int,
+        loader: Callable[[str, str, int, Fingerprint, int], ParsedSheet],
+    ) -> Optional[ParsedSheet]:
+        """Return the cached sheet, loading it on a miss.
+
+        Returns ``None`` when the sheet is larger than the cell budget.
+        """
+        key = (path, sheet, header_row)
+        fp = fingerprint(path, getattr(settings, "PA_SHEET_CACHE_HASH", False))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.fingerprint == fp:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            if self._too_large.get(key) == fp:
+                self.hits += 1
+                return None
+            self.misses += 1
+        try:
+            entry = loader(path, sheet, header_row, fp, self.max_cells)
+        except TooLarge:
+            with self._lock:
+                self._discard(key)
+                self._too_large[key] = fp
+            return None
+        with self._lock:
+            self._discard(key)
+            self._too_large.pop(key, None)
+            self._entries[key] = entry
+            self._cells += entry.cells
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._cells > self.max_cells
+            ):
+                _, evicted = self._entries.popitem(last=False)
+                self._cells -= evicted.cells
+        return entry
+
+    def invalidate(self, path: str) -> None:
+        """Drop every sheet of ``path``, e.g. after the workbook was saved."""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == path]:
+                self._discard(key)
+            for key in [k for k in self._too_large if k[0] == path]:
+                del self._too_large[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._too_large.clear()
+            self._cells = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "cells": self._cells,
+            }
+
+    def _discard(self, key: CacheKey) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._cells -= entry.cells
+
+
+sheet_cache = SheetCache()
@@ -0,0 +1,176 @@
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from pa.models import Action, PlanStat
+
+TRACKED_FIELDS = ("plan_id", "statut", "priorite", "p", "d", "c", "a")
+PDCA = ("p", "d", "c", "a")
+CLOSED = Q(a=True) | Q(statut__iexact="closed")
+REJECTED = "rejected"
+
+
+def is_closed(statut: str, a: bool) -> bool:
+    return bool(a) or (statut or "").lower() == "closed"
+
+
+def counter_keys(values: Dict) -> Iterable[str]:
+    """Counter keys an action with these field values contributes to."""
+    yield "total"
+    yield f"statut:{values['statut']}"
+    yield f"priorite:{values['priorite']}"
+    for flag in PDCA:
+        if values[flag]:
+            yield flag
+    if is_closed(values["statut"], values["a"]):
+        yield "closed"
+        if (values["statut"] or "").lower() == REJECTED:
+            yield "closed_rejected"
+
+
+def tracked_values(action: Action) -> Optional[Dict]:
+    """Snapshot the tracked fields without triggering deferred-field queries."""
+    loaded = action.__dict__
+    if any(field not in loaded for field in TRACKED_FIELDS):
+        return None
+    return {field: loaded[field] for field in TRACKED_FIELDS}
+
+
+def locked_values(action: Action) -> Optional[Dict]:
+    """Read the tracked fields of the stored row, locked until the transaction ends.
+
+    Deltas start from the row rather than from the instance, which may be
+    stale when several instances of an action are saved. ``None`` when the
+    row does not exist.
+    """
+    return Action.objects.select_for_update().filter(pk=action.pk).values(*TRACKED_FIELDS).first()
+
+
+def locked_values_in(pks: Iterable[int]) -> List[Dict]:
+    """Like :func:`locked_values` for many actions, in one query."""
+    return list(Action.objects.select_for_update().filter(pk__in=list(pks)).values(*TRACKED_FIELDS))
+
+
+def compute_counters(queryset) -> Dict[Tuple[int, str], int]:
+    """Count a queryset of actions per (plan, key) with three GROUP BY queries."""
+    counters = {}
+    for row in queryset.values("plan_id", "statut").annotate(n=Count("id")).order_by():
+        counters[(row["plan_id"], f"statut:{row['statut']}")] = row["n"]
+    for row in queryset.values("plan_id", "priorite").annotate(n=Count("id")).order_by():
+        counters[(row["plan_id"], f"priorite:{row['priorite']}")] = row["n"]
+    totals = queryset.values("plan_id").order_by().annotate(
+        total=Count("id"),
+        closed=Count("id", filter=CLOSED),
+        closed_rejected=Count("id", filter=CLOSED & Q(statut__iexact=REJECTED)),
+        **{flag: Count("id", filter=Q(**{flag: True})) for flag in PDCA},
+    )
+    for row in totals:
+        plan_id = row.pop("plan_id")
+        for key, value in row.items():
+            if value:
+                counters[(plan_id, key)] = value
+    return counters
+
+
+def rebuild_plan_stats(plan_ids: Optional[Iterable[int]] = None) -> None:
+    """Recompute counters from the actions table, e.g. after bulk writes."""
+    actions = Action.objects.all()
+    stats = PlanStat.objects.all()
+    if plan_ids is not None:
+        plan_ids = list(plan_ids)
+        actions = actions.filter(plan_id__in=plan_ids)
+        stats = stats.filter(plan_id__in=plan_ids)
+    counters = compute_counters(actions)
+    with transaction.atomic():
+        stats.delete()
+        PlanStat.objects.bulk_create(
+            PlanStat(plan_id=plan_id, key=key, value=value)
+            for (plan_id, key), value in counters.items()
+        )
+
+
+def apply_delta(before: Optional[Dict], after: Optional[Dict]) -> None:
+    """Update counters for one action going from ``before`` to ``after`` values."""
+    apply_deltas([(before, after)])
+
+
+def apply_deltas(changes: Iterable[Tuple[Optional[Dict], Optional[Dict]]]) -> None:
+    """Update counters for many ``(before, after)`` changes, one UPDATE per counter."""
+    delta = Counter()
+    for before, after in changes:
+        if before is not None:
+            delta.subtract((before["plan_id"], key) for key in counter_keys(before))
+        if after is not None:
+            delta.update((after["plan_id"], key) for key in counter_keys(after))
+    for (plan_id, key), change in delta.items():
+        if not change:
+            continue
+        updated = PlanStat.objects.filter(plan_id=plan_id, key=key).update(
+            value=F("value") + change
+        )
+        # A missing counter cannot go below zero: its plan is being deleted.
+        if updated or change < 0:
+            continue
+        try:
+            with transaction.atomic():
+                PlanStat.objects.create(plan_id=plan_id, key=key, value=change)
+        except IntegrityError:
+            PlanStat.objects.filter(plan_id=plan_id, key=key).update(value=F("value") + change)
+
+
+def _summary(counters: Dict[str, int], overdue: int) -> Dict:
+    total = counters.get("total", 0)
+    closed = counters.get("closed", 0)
+    # Rejected actions that are also closed (a=True) are counted in ``closed`` only.
+    rejected = sum(v for k, v in counters.items() if k.lower() == f"statut:{REJECTED}")
+    rejected -= counters.get("closed_rejected", 0)
+    return {
+        "total": total,
+        "closed": closed,
+        "overdue": overdue,
+        "in_progress": total - closed - rejected,
+        "statut": {k[7:]: v for k, v in counters.items() if k.startswith("statut:") and v},
+        "priorite": {k[9:]: v for k, v in counters.items() if k.startswith("priorite:") and v},
+        "pdca": {flag: counters.get(flag, 0) for flag in PDCA},
+    }
+
+
+def dashboard_stats(plans) -> Dict:
+    """Global and per-plan counts for the given plans queryset.
+
+    Counts come from the materialized counters; only ``overdue`` depends on
+    today's date and is computed with a single grouped query on
+    ``(plan, date_fin)``.
+    """
+    plans = list(plans.values("id", "nom"))
+    plan_ids = [plan["id"] for plan in plans]
+    per_plan = defaultdict(dict)
+    for plan_id, key, value in PlanStat.objects.filter(plan_id__in=plan_ids).values_list(
+        "plan_id", "key", "value"
+    ):
+        per_plan[plan_id][key] = value
+    overdue = dict(
+        Action.objects.filter(plan_id__in=plan_ids, date_fin__lt=timezone.localdate())
+        .exclude(CLOSED)
+        .values("plan_id")
+        .order_by()
+        .annotate(n=Count("id"))
+        .values_list("plan_id", "n")
+    )
+    totals = Counter()
+    for counters in per_plan.values():
+        totals.update(counters)
+    return {
+        "global": _summary(totals, sum(overdue.values())),
+        "plans": [
+            {
+                "plan": plan["id"],
+                "nom": plan["nom"],
+                **_summary(per_plan[plan["id"]], overdue.get(plan["id"], 0)),
+            }
+            for plan in plans
+        ],
+    }
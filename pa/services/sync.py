@@ -0,0 +1,229 @@
+import hashlib
+import logging
+from typing import Callable, Dict, List, Optional
+
+from django.db import connections, transaction
+
+from pa.models import Action, Change, Plan, RowHash
+from pa.services.actid import advance_act_ids, reserve_act_ids
+from pa.services.changes import record_changes
+from pa.services.columns import map_columns, row_values, to_str
+from pa.services.excel_io import enqueue_action, iter_numbered_rows
+from pa.services.stats import rebuild_plan_stats
+from pa.services.versions import bump_plan_versions
+
+logger = logging.getLogger(__name__)
+
+ACT_ID_LENGTH = Action._meta.get_field("act_id").max_length
+
+
+def row_digest(row: Dict, columns: Dict[str, str]) -> str:
+    """Hash the mapped cells of a row, leaving out its ``act_id`` and position."""
+    cells = tuple(
+        (field, row.get(header)) for field, header in sorted(columns.items()) if field != "act_id"
+    )
+    return hashlib.blake2b(repr(cells).encode(), digest_size=16).hexdigest()
+
+
+def _empty_report() -> Dict:
+    return {"added": [], "modified": [], "moved": [], "deleted": [], "unchanged": 0, "skipped": 0}
+
+
+def sync_plan(
+    plan: Plan, delete_missing: bool = True, progress: Optional[Callable[[int], None]] = None
+) -> Dict:
+    """Reconcile a plan's actions with its workbook, touching only changed rows.
+
+    Each synced row leaves a content hash keyed by ``act_id``; rows whose hash
+    and position are unchanged are skipped without being converted, so
+    re-syncing an unchanged sheet costs a single query. Returns the diff as
+    ``added``/``modified``/``moved``/``deleted`` lists plus ``unchanged`` and
+    ``skipped`` counts. Actions whose row disappeared from the sheet are
+    deleted unless ``delete_missing`` is false.
+    """
+    report = _empty_report()
+    known = {
+        act_id: (pk, row_index, digest)
+        for pk, act_id, row_index, digest in RowHash.objects.filter(plan=plan).values_list(
+            "pk", "act_id", "excel_row_index", "digest"
+        )
+    }
+    seen: Dict[str, tuple] = {}
+    changed: Dict[str, Dict] = {}
+    moved: Dict[str, int] = {}
+    unnumbered = []
+
+    rows = iter_numbered_rows(plan.excel_path, plan.excel_sheet, plan.header_row_index)
+    try:
+        columns = None
+        for done, (row_index, row) in enumerate(rows, start=1):
+            if columns is None:
+                columns = map_columns(row.keys())
+                if "act_id" not in columns:
+                    raise ValueError(f"No act_id column in {plan.excel_path}[{plan.excel_sheet}]")
+            if progress is not None and done % 1000 == 0:
+                progress(done)
+            act_id = to_str(row.get(columns["act_id"]))
+            if len(act_id) > ACT_ID_LENGTH or (act_id and act_id in seen):
+                report["skipped"] += 1
+                continue
+            digest = row_digest(row, columns)
+            previous = known.get(act_id)
+            if previous is not None and previous[2] == digest:
+                seen[act_id] = (row_index, digest)
+                if previous[1] == row_index:
+                    report["unchanged"] += 1
+                else:
+                    moved[act_id] = row_index
+                continue
+            try:
+                values = row_values(row, columns)
+            except ValueError as exc:
+                logger.warning("Row %s of %s skipped: %s", row_index, plan.excel_path, exc)
+                report["skipped"] += 1
+                if previous is not None:
+                    seen[act_id] = previous[1:]
+                continue
+            values.update(
+                excel_fichier=plan.excel_path,
+                excel_feuille=plan.excel_sheet,
+                excel_row_index=row_index,
+            )
+            if act_id:
+                seen[act_id] = (row_index, digest)
+                changed[act_id] = values
+            elif values.get("titre"):
+                unnumbered.append((values, digest))
+            else:
+                report["skipped"] += 1
+    finally:
+        rows.close()
+
+    deleted = [act_id for act_id in known if act_id not in seen] if delete_missing else []
+    if not (changed or moved or unnumbered or deleted):
+        return report
+
+    numbered = []
+    with transaction.atomic():
+        # ``seen`` holds every explicit act_id of the sheet: none can be reserved again.
+        reserved = reserve_act_ids(len(unnumbered), after=seen)
+        for act_id, (values, digest) in zip(reserved, unnumbered):
+            seen[act_id] = (values["excel_row_index"], digest)
+            changed[act_id] = values
+        _apply_rows(plan, changed, report, seen, numbered, set(reserved))
+        _apply_moves(plan, moved, known, report)
+        if deleted:
+            _delete_actions(plan, deleted)
+            report["deleted"] = deleted
+        _store_hashes(plan, known, seen, deleted)
+        if report["added"] or report["modified"] or report["deleted"]:
+            rebuild_plan_stats([plan.pk])
+        if report["added"] or report["modified"] or report["moved"] or report["deleted"]:
+            bump_plan_versions([plan.pk])
+        logged = report["added"] + [e["act_id"] for e in report["modified"] + report["moved"]]
+        if logged:
+            record_changes(plan.pk, logged)
+        if deleted:
+            record_changes(plan.pk, deleted, Change.Op.DELETE)
+
+    for action in numbered:
+        enqueue_action(action, ["act_id"])
+    logger.info(
+        "Plan %s synced: %s",
+        plan.pk,
+        {key: len(value) if isinstance(value, list) else value for key, value in report.items()},
+    )
+    return report
+
+
+def _apply_rows(
+    plan: Plan,
+    changed: Dict[str, Dict],
+    report: Dict,
+    seen: Dict[str, tuple],
+    numbered: List[Action],
+    new_ids: set,
+) -> None:
+    existing = Action.objects.in_bulk(list(changed), field_name="act_id")
+    to_create, to_update = [], []
+    update_fields = set()
+    for act_id, values in changed.items():
+        action = existing.get(act_id)
+        if action is None:
+            to_create.append(Action(act_id=act_id, plan=plan, **values))
+            continue
+        if action.plan_id != plan.id:
+            logger.warning("%s belongs to another plan, row skipped", act_id)
+            report["skipped"] += 1
+            del seen[act_id]
+            continue
+        fields = [field for field, value in values.items() if getattr(action, field) != value]
+        if not fields:
+            # The cells changed but still mean the same, e.g. after a write-back.
+            report["unchanged"] += 1
+            continue
+        if "excel_row_index" in fields:
+            report["moved"].append(
+                {"act_id": act_id, "from": action.excel_row_index, "to": values["excel_row_index"]}
+            )
+        content = [field for field in fields if field != "excel_row_index"]
+        if content:
+            report["modified"].append({"act_id": act_id, "fields": content})
+        for field in fields:
+            setattr(action, field, values[field])
+        update_fields.update(fields)
+        to_update.append(action)
+
+    if to_create:
+        Action.objects.bulk_create(to_create)
+        advance_act_ids(action.act_id for action in to_create)
+        numbered.extend(action for action in to_create if action.act_id in new_ids)
+        report["added"] = [action.act_id for action in to_create]
+    if to_update:
+        Action.objects.bulk_update(to_update, sorted(update_fields))
+
+
+def _delete_actions(plan: Plan, act_ids: List[str]) -> None:
+    """Delete actions in two statements, without the per-row delete signals.
+
+    The caller rebuilds the plan counters, bumps its version and logs the
+    deletions once for all rows.
+    """
+    actions = Action.objects.filter(plan=plan, act_id__in=act_ids)
+    Action.responsables.through.objects.filter(action__in=actions).delete()
+    # QuerySet.delete() would collect the rows and send the per-row signals.
+    subquery, params = actions.values("pk").query.sql_with_params()
+    connection = connections[actions.db]
+    table = connection.ops.quote_name(Action._meta.db_table)
+    pk = connection.ops.quote_name(Action._meta.pk.column)
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {table} WHERE {pk} IN ({subquery})", params)
+
+
+def _apply_moves(plan: Plan, moved: Dict[str, int], known: Dict, report: Dict) -> None:
+    """Follow rows whose content is unchanged but which now sit elsewhere."""
+    if not moved:
+        return
+    actions = list(Action.objects.filter(plan=plan, act_id__in=list(moved)).only("id", "act_id"))
+    for action in actions:
+        action.excel_row_index = moved[action.act_id]
+        report["moved"].append(
+            {"act_id": action.act_id, "from": known[action.act_id][1], "to": moved[action.act_id]}
+        )
+    Action.objects.bulk_update(actions, ["excel_row_index"])
+
+
+def _store_hashes(plan: Plan, known: Dict, seen: Dict[str, tuple], deleted: List[str]) -> None:
+    to_create, to_update = [], []
+    for act_id, (row_index, digest) in seen.items():
+        previous = known.get(act_id)
+        if previous is None:
+            to_create.append(
+                RowHash(plan=plan, act_id=act_id, excel_row_index=row_index, digest=digest)
+            )
+        elif previous[1:] != (row_index, digest):
+            to_update.append(RowHash(pk=previous[0], excel_row_index=row_index, digest=digest))
+    if deleted:
+        RowHash.objects.filter(plan=plan, act_id__in=deleted).delete()
+    RowHash.objects.bulk_create(to_create)
+    RowHash.objects.bulk_update(to_update, ["excel_row_index", "digest"])
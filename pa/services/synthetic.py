@@ -0,0 +1,147 @@
+import random
+from datetime import date, timedelta
+from typing import List, Sequence
+
+from django.contrib.auth import get_user_model
+from openpyxl import Workbook
+
+from pa.models import Action, Change, Plan, Profile
+from pa.services.actid import reserve_act_ids
+from pa.services.changes import record_changes
+from pa.services.importer import import_plan
+from pa.services.versions import bump_plan_versions
+
+SHEET = "plan d’action"
+HEADER_ROW = 11
+HEADERS = [
+    "act_id",
+    "titre",
+    "statut",
+    "priorite",
+    "Budget",
+    "p",
+    "d",
+    "c",
+    "a",
+    "j",
+    "Début",
+    "Échéance",
+    "commentaire",
+]
+# Columns that real plans carry but the application ignores.
+EXTRA_HEADERS = ["Direction", "Site", "Source", "Référence", "Pilote", "Notes internes"]
+STATUTS = ["open", "en cours", "closed", "rejected"]
+PRIORITES = ["haute", "moyenne", "basse"]
+ACT_ID_LENGTH = Action._meta.get_field("act_id").max_length
+ROLES = [Profile.Role.PILOTE, Profile.Role.PILOTE_PROCESSUS, Profile.Role.UTILISATEUR]
+
+
+def extra_headers(count: int) -> List[str]:
+    names = EXTRA_HEADERS[:count]
+    return names + [f"Colonne {n}" for n in range(len(names) + 1, count + 1)]
+
+
+def write_plan_workbook(
+    path: str,
+    act_ids: Sequence[str],
+    sheet: str = SHEET,
+    header_row: int = HEADER_ROW,
+    extra_columns: int = len(EXTRA_HEADERS),
+    seed: int = 0,
+) -> None:
+    """Write a plan workbook shaped like the real ones: title block, header, one row per act_id.
+
+    Rows are deterministic for a given ``seed``, so two runs compare the same data.
+    """
+    rng = random.Random(seed)
+    extras = extra_headers(extra_columns)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(sheet)
+    if header_row > 1:
+        ws.append(["Plan d’action (données synthétiques)"])
+    for _ in range(header_row - 2):
+        ws.append([])
+    ws.append(HEADERS + extras)
+    start = date(2025, 1, 1)
+    for n, act_id in enumerate(act_ids, start=1):
+        ws.append(
+            [
+                act_id,
+                f"Action {n}",
+                rng.choice(STATUTS),
+                rng.choice(PRIORITES),
+                round(rng.uniform(0, 1e6), 2),
+                *(rng.choice(["x", None]) for _ in range(4)),
+                rng.randint(-60, 120),
+                start + timedelta(days=rng.randint(0, 365)),
+                start + timedelta(days=rng.randint(365, 730)),
+                rng.choice([None, "", f"Suivi {n}"]),
+                *(f"{name} {n % 17}" for name in extras),
+            ]
+        )
+    wb.save(path)
+
+
+def create_users(count: int, prefix: str = "synthetic", seed: int = 0) -> List:
+    """Create ``count`` users with profiles of mixed roles, reusing existing ones."""
+    User = get_user_model()
+    rng = random.Random(seed)
+    users = []
+    for n in range(count):
+        user, created = User.objects.get_or_create(username=f"{prefix}{n}")
+        if created:
+            user.set_password(prefix)
+            user.save(update_fields=["password"])
+            Profile.objects.create(user=user, role=rng.choice(ROLES))
+        users.append(user)
+    return users
+
+
+def create_synthetic_plan(
+    name: str,
+    path: str,
+    actions: int,
+    users: Sequence = (),
+    sheet: str = SHEET,
+    header_row: int = HEADER_ROW,
+    extra_columns: int = len(EXTRA_HEADERS),
+    seed: int = 0,
+    responsables_per_action: int = 2,
+) -> Plan:
+    """Generate a workbook of ``actions`` rows, import it as a plan and assign users.
+
+    Act ids come from the regular sequence, so generated plans can live next
+    to real ones. Users get access to the plan and are spread over the
+    actions as responsables.
+    """
+    act_ids = reserve_act_ids(actions)
+    if act_ids and len(act_ids[-1]) > ACT_ID_LENGTH:
+        raise ValueError(f"{act_ids[-1]} does not fit in act_id ({ACT_ID_LENGTH} characters)")
+    plan = Plan.objects.create(
+        nom=name, excel_path=path, excel_sheet=sheet, header_row_index=header_row
+    )
+    write_plan_workbook(path, act_ids, sheet, header_row, extra_columns, seed)
+    import_plan(plan)
+    if users:
+        for user in users:
+            user.profile.plans_autorises.add(plan)
+        _assign_responsables(plan, users, responsables_per_action, seed)
+        bump_plan_versions([plan.pk])
+        record_changes(plan.pk, op=Change.Op.RESET)
+    return plan
+
+
+def _assign_responsables(plan: Plan, users: Sequence, per_action: int, seed: int) -> None:
+    rng = random.Random(seed)
+    users = list(users)
+    through = Action.responsables.through
+    per_action = min(per_action, len(users))
+    batch = []
+    for action_id in Action.objects.filter(plan=plan).values_list("id", flat=True).iterator():
+        batch.extend(
+            through(action_id=action_id, user_id=user.pk) for user in rng.sample(users, per_action)
+        )
+        if len(batch) >= 5000:
+            through.objects.bulk_create(batch)
+            batch = []
+    through.objects.bulk_create(batch)
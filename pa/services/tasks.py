@@ -0,0 +1,43 @@
+from typing import Dict, List, Optional
+
+from pa.models import Action, Plan
+from pa.services.excel_io import read_plan, sheet_row_count, write_actions
+from pa.services.filelock import WorkbookBusy
+from pa.services.importer import import_plan
+from pa.services.jobs import RetryJob, job_handler, report_progress
+from pa.services.sheet_cache import sheet_cache
+from pa.services.sync import sync_plan
+
+
+@job_handler("excel.refresh")
+def refresh_plan(job, plan_id: int, limit: int = 50) -> Dict:
+    """Re-read a plan's workbook and return its first rows."""
+    plan = Plan.objects.get(pk=plan_id)
+    sheet_cache.invalidate(plan.excel_path)
+    return {"rows": read_plan(plan, limit=limit)}
+
+
+@job_handler("excel.import")
+def import_plan_job(job, plan_id: int, chunk_size: int = 1000) -> Dict:
+    plan = Plan.objects.get(pk=plan_id)
+    total = sheet_row_count(plan.excel_path, plan.excel_sheet, plan.header_row_index)
+    report_progress(job, 0, total)
+    return import_plan(plan, chunk_size, progress=lambda done: report_progress(job, done))
+
+
+@job_handler("excel.sync")
+def sync_plan_job(job, plan_id: int, delete_missing: bool = True) -> Dict:
+    plan = Plan.objects.get(pk=plan_id)
+    total = sheet_row_count(plan.excel_path, plan.excel_sheet, plan.header_row_index)
+    report_progress(job, 0, total)
+    return sync_plan(plan, delete_missing, progress=lambda done: report_progress(job, done))
+
+
+@job_handler("excel.writeback")
+def writeback_actions(job, act_ids: List[str], fields: Optional[List[str]] = None) -> Dict:
+    """Write actions back to their workbooks, later if one is busy, like the queue backend."""
+    actions = Action.objects.filter(act_id__in=act_ids).select_related("plan")
+    try:
+        return {"written": write_actions(actions, fields)}
+    except WorkbookBusy as exc:
+        raise RetryJob(repr(exc)) from exc
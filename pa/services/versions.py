@@ -0,0 +1,38 @@
+import hashlib
+from typing import Iterable
+
+from django.db.models import F
+from django.utils import timezone
+
+from pa.models import PlanVersion
+
+
+def bump_plan_versions(plan_ids: Iterable[int]) -> None:
+    """Mark plans as modified, invalidating ETags and cached pages built on them.
+
+    Only existing rows are updated: they are created with their plan, and a
+    plan being deleted must not get one back from its cascading actions.
+    """
+    plan_ids = {plan_id for plan_id in plan_ids if plan_id is not None}
+    if plan_ids:
+        PlanVersion.objects.filter(plan_id__in=plan_ids).update(
+            version=F("version") + 1, modified_at=timezone.now()
+        )
+
+
+def plans_validator(plans) -> str:
+    """Summarize the versions of a plans queryset as a digest.
+
+    Adding, deleting or editing any of the plans, or any of their actions,
+    and adding or removing a plan from the queryset change the digest; it
+    costs one query on ``PlanVersion``.
+    """
+    digest = hashlib.sha1()
+    rows = (
+        PlanVersion.objects.filter(plan__in=plans.values("id"))
+        .order_by("plan_id")
+        .values_list("plan_id", "version")
+    )
+    for plan_id, version in rows:
+        digest.update(f"{plan_id}:{version};".encode())
+    return digest.hexdigest()
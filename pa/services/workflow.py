@@ -0,0 +1,82 @@
+from typing import Dict, Iterable, List
+
+from django.db import transaction
+
+from pa.models import Action
+from pa.services.changes import record_changes
+from pa.services.excel_io import queue_writeback
+from pa.services.stats import apply_deltas, locked_values_in
+from pa.services.versions import bump_plan_versions
+
+TRANSITIONS = {
+    "validate": {"c": True},
+    "close": {"a": True},
+    "reject": {"statut": "rejected"},
+}
+
+
+def _log_changes(actions: List[Action]) -> None:
+    by_plan: Dict[int, List[str]] = {}
+    for action in actions:
+        by_plan.setdefault(action.plan_id, []).append(action.act_id)
+    for plan_id, act_ids in by_plan.items():
+        record_changes(plan_id, act_ids)
+
+
+def bulk_transition(actions: List[Action], operation: str) -> List[Action]:
+    """Apply a workflow transition to many actions with a single UPDATE.
+
+    Actions already in the target state are left alone. The changed ones are
+    written back to Excel together, one save per workbook, and returned.
+    """
+    changes = TRANSITIONS[operation]
+    changed = [
+        action
+        for action in actions
+        if any(getattr(action, field) != value for field, value in changes.items())
+    ]
+    if not changed:
+        return []
+    with transaction.atomic():
+        pks = [action.pk for action in changed]
+        # UPDATE bypasses the signals that maintain plan counters and versions:
+        # the counters move by the deltas between the stored rows and the result.
+        stored = locked_values_in(pks)
+        Action.objects.filter(pk__in=pks).update(**changes)
+        apply_deltas((values, {**values, **changes}) for values in stored)
+        bump_plan_versions({action.plan_id for action in changed})
+        _log_changes(changed)
+    for action in changed:
+        for field, value in changes.items():
+            setattr(action, field, value)
+    queue_writeback(changed, fields=list(changes))
+    return changed
+
+
+def bulk_assign(actions: List[Action], user_ids: Iterable[int]) -> List[Action]:
+    """Replace the responsables of many actions with one DELETE and one INSERT.
+
+    Responsables have no column in the workbook, so nothing is written back.
+    Returns the actions whose responsables changed.
+    """
+    wanted = set(user_ids)
+    through = Action.responsables.through
+    current: Dict[int, set] = {action.pk: set() for action in actions}
+    for action_id, user_id in through.objects.filter(action_id__in=list(current)).values_list(
+        "action_id", "user_id"
+    ):
+        current[action_id].add(user_id)
+    changed = [action for action in actions if current[action.pk] != wanted]
+    if not changed:
+        return []
+    ids = [action.pk for action in changed]
+    with transaction.atomic():
+        through.objects.filter(action_id__in=ids).exclude(user_id__in=wanted).delete()
+        through.objects.bulk_create(
+            through(action_id=action_id, user_id=user_id)
+            for action_id in ids
+            for user_id in wanted - current[action_id]
+        )
+        bump_plan_versions({action.plan_id for action in changed})
+        _log_changes(changed)
+    return changed
@@ -0,0 +1,135 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+
+from pa.services.filelock import WorkbookBusy
+
+logger = logging.getLogger(__name__)
+
+SheetKey = Tuple[str, str, int]
+Writer = Callable[[str, str, int, List[Dict]], int]
+
+
+def _merge(older: Dict, newer: Dict) -> Dict:
+    """Combine two snapshots of one action: newer values, union of fields."""
+    if "fields" not in older or "fields" not in newer:
+        return {k: v for k, v in newer.items() if k != "fields"}
+    return {**newer, "fields": list(dict.fromkeys([*older["fields"], *newer["fields"]]))}
+
+
+class WriteBackQueue:
+    """Coalesce Excel write-backs per (workbook, sheet) and apply them in batches.
+
+    Pending edits are keyed by ``act_id`` inside each sheet, so repeated edits
+    to the same action only keep the latest values. A background thread
+    flushes the queue after ``delay`` seconds, with one load and one save per
+    sheet.
+    """
+
+    def __init__(self, writer: Writer, delay: Optional[float] = None):
+        self.writer = writer
+        self._delay = delay
+        self._pending: Dict[SheetKey, Dict[str, Dict]] = {}
+        self._lock = threading.Lock()
+        self._apply_lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._wakeup = threading.Event()
+        self._running = 0
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def delay(self) -> float:
+        if self._delay is not None:
+            return self._delay
+        return getattr(settings, "PA_EXCEL_WRITEBACK_DELAY", 0.5)
+
+    @property
+    def is_async(self) -> bool:
+        return getattr(settings, "PA_EXCEL_WRITEBACK_ASYNC", True)
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return sum(len(rows) for rows in self._pending.values())
+
+    def enqueue(self, key: SheetKey, act_id: str, data: Dict) -> None:
+        """Record the latest values of ``act_id`` for the given sheet.
+
+        ``data["fields"]`` lists the fields to write; when an edit is merged
+        with a pending one, the field lists are combined.
+        """
+        self.enqueue_many([(key, act_id, data)])
+
+    def enqueue_many(self, items: Iterable[Tuple[SheetKey, str, Dict]]) -> None:
+        """Record several edits at once, so that they are flushed together."""
+        with self._lock:
+            for key, act_id, data in items:
+                pending = self._pending.setdefault(key, {})
+                previous = pending.get(act_id)
+                pending[act_id] = data if previous is None else _merge(previous, data)
+        if self.is_async:
+            self._ensure_worker()
+            self._wakeup.set()
+        else:
+            self.flush()
+
+    def flush(self) -> int:
+        """Apply every pending edit now and return the number of rows written."""
+        with self._apply_lock:
+            with self._lock:
+                batches, self._pending = self._pending, {}
+                self._running += 1
+            written = 0
+            try:
+                for key, rows in batches.items():
+                    path, sheet, header_row = key
+                    try:
+                        written += self.writer(path, sheet, header_row, list(rows.values()))
+                    except WorkbookBusy as exc:
+                        logger.warning("Excel write-back of %s[%s] deferred: %r", path, sheet, exc)
+                        self._requeue(key, rows)
+                    except Exception:
+                        logger.exception("Excel write-back failed for %s[%s]", path, sheet)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._idle.notify_all()
+            return written
+
+    def _requeue(self, key: SheetKey, rows: Dict[str, Dict]) -> None:
+        """Put back a batch that could not be written; newer edits win."""
+        with self._lock:
+            pending = self._pending.setdefault(key, {})
+            for act_id, data in rows.items():
+                newer = pending.get(act_id)
+                pending[act_id] = data if newer is None else _merge(data, newer)
+        if self.is_async:
+            self._wakeup.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the queue is drained; return ``False`` on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            while self._pending or self._running:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+            return not self._pending
+
+    def _ensure_worker(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="excel-writeback", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait()
+            # Leave a short window so bursts of edits land in one batch.
+            time.sleep(self.delay)
+            self._wakeup.clear()
+            self.flush()
@@ -0,0 +1,157 @@
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_migrate,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from .models import Action, Change, Plan, PlanVersion, Profile
+from .permissions import invalidate_permission_context
+from .services import stats
+from .services.actid import advance_act_ids
+from .services.changes import record_changes
+from .services.search import ensure_search_triggers
+from .services.versions import bump_plan_versions
+
+
+@receiver(post_save, sender=Action)
+def keep_act_id_sequence_ahead(sender, instance, created, raw=False, **kwargs):
+    """Advance the ACT sequence when an action is saved with an explicit id."""
+    if created and not raw:
+        advance_act_ids([instance.act_id])
+
+
+@receiver(pre_save, sender=Action)
+@receiver(pre_delete, sender=Action)
+def remember_counted_values(sender, instance, raw=False, **kwargs):
+    """Counters move from the stored row, locked by the save or delete transaction."""
+    if not raw:
+        instance._counted_values = stats.locked_values(instance) if instance.pk else None
+
+
+@receiver(post_save, sender=Action)
+def log_saved_action(sender, instance, created, raw=False, **kwargs):
+    """Log the saved action, and its removal from the plan it left."""
+    if raw:
+        return
+    before = None if created else (instance._counted_values or {}).get("plan_id")
+    if before is not None and before != instance.plan_id:
+        record_changes(before, [instance.act_id], Change.Op.DELETE)
+    record_changes(instance.plan_id, [instance.act_id])
+
+
+@receiver(post_save, sender=Action)
+def update_plan_stats(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """Keep the materialized plan counters in step with the saved action."""
+    if raw:
+        return
+    before = None if created else instance._counted_values
+    after = stats.tracked_values(instance)
+    if update_fields is not None and before is not None:
+        # Fields left out of the save keep their stored values.
+        saved = {Action._meta.get_field(name).attname for name in update_fields}
+        after = {
+            field: getattr(instance, field) if field in saved else before[field]
+            for field in stats.TRACKED_FIELDS
+        }
+    if after is None or (before is None and not created):
+        stats.rebuild_plan_stats([instance.plan_id])
+    else:
+        stats.apply_delta(before, after)
+    bump_plan_versions([instance.plan_id, (before or {}).get("plan_id")])
+
+
+@receiver(post_delete, sender=Action)
+def discount_deleted_action(sender, instance, **kwargs):
+    before = instance._counted_values
+    if before is None:
+        stats.rebuild_plan_stats([instance.plan_id])
+    else:
+        stats.apply_delta(before, None)
+    bump_plan_versions([instance.plan_id])
+    record_changes(instance.plan_id, [instance.act_id], Change.Op.DELETE)
+
+
+@receiver(post_save, sender=Plan)
+def bump_saved_plan_version(sender, instance, created, raw=False, **kwargs):
+    if created or raw:
+        PlanVersion.objects.get_or_create(plan=instance)
+    else:
+        bump_plan_versions([instance.pk])
+    if not raw:
+        record_changes(instance.pk)
+
+
+@receiver(post_delete, sender=Plan)
+def log_deleted_plan(sender, instance, **kwargs):
+    record_changes(instance.pk, op=Change.Op.DELETE)
+
+
+def _log_actions(actions) -> None:
+    by_plan = {}
+    for plan_id, act_id in actions.values_list("plan_id", "act_id"):
+        by_plan.setdefault(plan_id, []).append(act_id)
+    for plan_id, act_ids in by_plan.items():
+        record_changes(plan_id, act_ids)
+
+
+@receiver(m2m_changed, sender=Action.responsables.through)
+def bump_version_on_assignment(sender, instance, action, reverse, pk_set, **kwargs):
+    """Assigning responsables changes the actions' payload, hence their plan's version."""
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            bump_plan_versions([instance.plan_id])
+            record_changes(instance.plan_id, [instance.act_id])
+    elif action in ("post_add", "post_remove"):
+        bump_plan_versions(Action.objects.filter(pk__in=pk_set).values_list("plan_id", flat=True))
+        _log_actions(Action.objects.filter(pk__in=pk_set))
+    elif action == "pre_clear":
+        bump_plan_versions(instance.actions.values_list("plan_id", flat=True))
+        _log_actions(instance.actions.all())
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def forget_permissions(sender, instance, **kwargs):
+    """A new user, or a changed profile, must not reuse a cached permission context."""
+    invalidate_permission_context([instance.user_id if sender is Profile else instance.pk])
+
+
+@receiver(m2m_changed, sender=Profile.plans_autorises.through)
+def forget_permissions_on_plans_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith("post_") and action != "pre_clear":
+        return
+    if not reverse:
+        invalidate_permission_context([instance.user_id])
+    elif pk_set:
+        invalidate_permission_context(
+            Profile.objects.filter(pk__in=pk_set).values_list("user_id", flat=True)
+        )
+    else:
+        invalidate_permission_context(instance.profile_set.values_list("user_id", flat=True))
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    """Enable WAL and a busy timeout on SQLite connections."""
+    if connection.vendor != "sqlite":
+        return
+    timeout = getattr(settings, "PA_SQLITE_BUSY_TIMEOUT", 20)
+    with connection.cursor() as cursor:
+        cursor.execute(f"PRAGMA busy_timeout = {int(timeout * 1000)}")
+        if getattr(settings, "PA_SQLITE_WAL", True):
+            cursor.execute("PRAGMA journal_mode = WAL")
+            cursor.execute("PRAGMA synchronous = NORMAL")
+
+
+@receiver(post_migrate)
+def restore_search_triggers(sender, using, **kwargs):
+    if sender.name == "pa":
+        ensure_search_triggers(connections[using])
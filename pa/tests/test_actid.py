@@ -1,7 +1,10 @@
-from django.test import TestCase
+import threading
+
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
 
 from pa.models import Action, Plan
-from pa.services.actid import generate_act_id
+from pa.services.actid import generate_act_id, reserve_act_ids
 
 
 class ActIdServiceTests(TestCase):
@@ -26,3 +29,64 @@ class ActIdServiceTests(TestCase):
             excel_row_index=2,
         )
         self.assertEqual(generate_act_id(), "ACT-0002")
+
+
+class ActIdReservationTests(TestCase):
+    def test_reserve_block_is_contiguous(self):
+        self.assertEqual(reserve_act_ids(3), ["ACT-0001", "ACT-0002", "ACT-0003"])
+        self.assertEqual(generate_act_id(), "ACT-0004")
+
+    def test_sequence_uses_highest_number_not_id_order(self):
+        plan = Plan.objects.create(
+            nom="Plan1",
+            excel_path="file.xlsx",
+            excel_sheet="Sheet1",
+            header_row_index=1,
+        )
+        for act_id in ("ACT-0007", "ACT-0003"):
+            Action.objects.create(
+                act_id=act_id,
+                titre="Test",
+                statut="open",
+                priorite="high",
+                plan=plan,
+                excel_fichier="file.xlsx",
+                excel_feuille="Sheet1",
+                excel_row_index=2,
+            )
+        self.assertEqual(generate_act_id(), "ACT-0008")
+
+    def test_reserve_after_explicit_ids(self):
+        self.assertEqual(
+            reserve_act_ids(2, after=["ACT-0005", "X-1", "ACT-0002"]), ["ACT-0006", "ACT-0007"]
+        )
+        # Identifiers below the counter do not move it back.
+        self.assertEqual(reserve_act_ids(1, after=["ACT-0003"]), ["ACT-0008"])
+
+
+class ActIdConcurrencyTests(TransactionTestCase):
+    """Runs against the configured backend, e.g. ``PA_DB_ENGINE=postgres``."""
+
+    def test_concurrent_reservations_never_overlap(self):
+        results = []
+        errors = []
+
+        def worker():
+            try:
+                for _ in range(10):
+                    results.extend(reserve_act_ids(3))
+                results.append(generate_act_id())
+            except Exception as exc:  # pragma: no cover - surfaced below
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(results), 8 * 31)
+        self.assertEqual(len(set(results)), len(results))
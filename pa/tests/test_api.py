@@ -1,9 +1,13 @@
+from io import BytesIO
+
 from django.contrib.auth import get_user_model
 from django.test import TestCase
 from rest_framework.test import APIClient
-from openpyxl import Workbook
+from openpyxl import Workbook, load_workbook
 
 from pa.models import Plan, Action, Profile
+from pa.services.excel_io import writeback_queue
+from pa.services.jobs import run_pending_jobs
 
 
 class APITests(TestCase):
@@ -39,15 +43,21 @@ class APITests(TestCase):
             excel_row_index=12,
         )
 
+    def tearDown(self):
+        writeback_queue.flush()
+
     def test_plan_list(self):
         self.client.force_authenticate(self.user)
         resp = self.client.get("/api/plans/")
         self.assertEqual(resp.status_code, 200)
+        # Only actions are paginated.
+        self.assertEqual([plan["id"] for plan in resp.data], [self.plan.id])
 
     def test_action_list(self):
         self.client.force_authenticate(self.user)
         resp = self.client.get("/api/actions/", {"plan": self.plan.id})
         self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data["results"][0]["act_id"], "ACT-0001")
 
     def test_action_validate(self):
         self.client.force_authenticate(self.user)
@@ -60,8 +70,145 @@ class APITests(TestCase):
         self.assertEqual(resp.status_code, 200)
         self.assertIn("rows", resp.data)
 
+    def test_excel_preview_pagination(self):
+        wb = Workbook()
+        ws = wb.active
+        ws.title = "plan d’action"
+        for _ in range(10):
+            ws.append([])
+        ws.append(["act_id", "titre", "statut", "priorite"])
+        for i in range(1, 8):
+            ws.append([f"ACT-{i:04d}", f"Action{i}", "open", "high"])
+        wb.save(self.plan.excel_path)
+
+        self.client.force_authenticate(self.user)
+        resp = self.client.get(f"/api/excel/preview?plan={self.plan.id}&offset=3&limit=3")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(
+            [r["act_id"] for r in resp.data["rows"]], ["ACT-0004", "ACT-0005", "ACT-0006"]
+        )
+        self.assertEqual(resp.data["next_offset"], 6)
+
+        resp = self.client.get(f"/api/excel/preview?plan={self.plan.id}&offset=6&limit=3")
+        self.assertEqual([r["act_id"] for r in resp.data["rows"]], ["ACT-0007"])
+        self.assertIsNone(resp.data["next_offset"])
+
     def test_excel_refresh(self):
         self.client.force_authenticate(self.user)
         resp = self.client.post("/api/excel/refresh", {"plan": self.plan.id}, format="json")
+        self.assertEqual(resp.status_code, 202)
+        self.assertEqual(resp.data["status"], "pending")
+        run_pending_jobs()
+        resp = self.client.get(f"/api/jobs/{resp.data['id']}/")
+        self.assertEqual(resp.data["status"], "succeeded")
+        self.assertIn("rows", resp.data["result"])
+
+    def test_excel_import(self):
+        self.client.force_authenticate(self.user)
+        resp = self.client.post("/api/excel/import", {"plan": self.plan.id}, format="json")
+        self.assertEqual(resp.status_code, 202)
+        run_pending_jobs()
+        resp = self.client.get(f"/api/jobs/{resp.data['id']}/")
+        self.assertEqual(resp.data["result"]["unchanged"], 1)
+        self.assertEqual(resp.data["progress"], 100)
+
+    def test_action_export_csv(self):
+        self.client.force_authenticate(self.user)
+        resp = self.client.get(f"/api/actions/export/?format=csv&plan={self.plan.id}")
         self.assertEqual(resp.status_code, 200)
-        self.assertIn("rows", resp.data)
+        self.assertEqual(resp["Content-Type"], "text/csv")
+        lines = b"".join(resp.streaming_content).decode("utf-8-sig").splitlines()
+        self.assertTrue(lines[0].startswith("act_id,titre,statut"))
+        self.assertTrue(lines[1].startswith("ACT-0001,Action1,open,high"))
+
+        resp = self.client.get("/api/actions/export/?format=csv&statut=closed")
+        self.assertEqual(len(b"".join(resp.streaming_content).splitlines()), 1)
+
+    def test_action_export_xlsx(self):
+        self.client.force_authenticate(self.user)
+        resp = self.client.get("/api/actions/export/")
+        self.assertEqual(resp.status_code, 200)
+        wb = load_workbook(BytesIO(b"".join(resp.streaming_content)), read_only=True)
+        rows = list(wb.active.iter_rows(values_only=True))
+        self.assertEqual(rows[1][:2], ("ACT-0001", "Action1"))
+
+    def test_bulk_close_by_act_ids(self):
+        Action.objects.create(
+            act_id="ACT-0002",
+            titre="Action2",
+            statut="open",
+            priorite="high",
+            a=True,
+            plan=self.plan,
+            excel_fichier=self.plan.excel_path,
+            excel_feuille="plan d’action",
+            excel_row_index=13,
+        )
+        self.client.force_authenticate(self.user)
+        resp = self.client.post(
+            "/api/actions/bulk/close/",
+            {"act_ids": ["ACT-0001", "ACT-0002", "ACT-9999"]},
+            format="json",
+        )
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(
+            resp.data["results"],
+            [
+                {"act_id": "ACT-0001", "status": "updated"},
+                {"act_id": "ACT-0002", "status": "unchanged"},
+                {"act_id": "ACT-9999", "status": "not_found"},
+            ],
+        )
+        self.action.refresh_from_db()
+        self.assertTrue(self.action.a)
+
+    def test_bulk_reject_by_filter_and_assign(self):
+        self.client.force_authenticate(self.user)
+        resp = self.client.post(
+            "/api/actions/bulk/reject/", {"filter": {"statut": "open"}}, format="json"
+        )
+        self.assertEqual(resp.data["updated"], 1)
+        self.action.refresh_from_db()
+        self.assertEqual(self.action.statut, "rejected")
+
+        resp = self.client.post(
+            "/api/actions/bulk/assign/",
+            {"act_ids": ["ACT-0001"], "responsables": [self.user.pk]},
+            format="json",
+        )
+        self.assertEqual(resp.data["updated"], 1)
+        self.assertEqual(list(self.action.responsables.all()), [self.user])
+
+    def test_assign_validates_responsables_and_leaves_the_workbook_alone(self):
+        self.client.force_authenticate(self.user)
+        resp = self.client.post(
+            "/api/actions/ACT-0001/assign/", {"responsables": [self.user.pk + 100]}, format="json"
+        )
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn("responsables", resp.data)
+
+        # An edit made in the workbook meanwhile is not overwritten by the assignment.
+        wb = load_workbook(self.plan.excel_path)
+        wb["plan d’action"].cell(row=12, column=2, value="Edited in Excel")
+        wb.save(self.plan.excel_path)
+        resp = self.client.post(
+            "/api/actions/ACT-0001/assign/", {"responsables": [self.user.pk]}, format="json"
+        )
+        self.assertEqual(resp.status_code, 200)
+        writeback_queue.flush()
+        self.assertEqual(list(self.action.responsables.all()), [self.user])
+        ws = load_workbook(self.plan.excel_path)["plan d’action"]
+        self.assertEqual(ws.cell(row=12, column=2).value, "Edited in Excel")
+
+    def test_bulk_rejects_an_empty_filter(self):
+        self.client.force_authenticate(self.user)
+        for filters in ({}, {"unknown": "x"}, {"statut": ""}):
+            resp = self.client.post("/api/actions/bulk/close/", {"filter": filters}, format="json")
+            self.assertEqual(resp.status_code, 400)
+        self.action.refresh_from_db()
+        self.assertFalse(self.action.a)
+
+    def test_bulk_requires_targets(self):
+        self.client.force_authenticate(self.user)
+        resp = self.client.post("/api/actions/bulk/validate/", {}, format="json")
+        self.assertEqual(resp.status_code, 400)
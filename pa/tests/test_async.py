@@ -0,0 +1,65 @@
+import asyncio
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.test import AsyncClient, SimpleTestCase, TestCase, override_settings
+from openpyxl import Workbook
+from rest_framework_simplejwt.tokens import AccessToken
+
+from pa.models import Plan, Profile
+from pa.services.excel_pool import ExcelIOTimeout, run_excel_io
+
+
+class ExcelPoolTests(SimpleTestCase):
+    @override_settings(PA_EXCEL_IO_PER_PLAN=2)
+    async def test_reads_are_limited_per_plan(self):
+        running, peak = {1: 0, 2: 0}, {1: 0, 2: 0}
+        lock = threading.Lock()
+
+        def read(plan_id):
+            with lock:
+                running[plan_id] += 1
+                peak[plan_id] = max(peak[plan_id], running[plan_id])
+            time.sleep(0.05)
+            with lock:
+                running[plan_id] -= 1
+
+        await asyncio.gather(*(run_excel_io(p, read, p) for p in [1, 2] * 5))
+        self.assertEqual(peak, {1: 2, 2: 2})
+
+    async def test_timeout(self):
+        with self.assertRaises(ExcelIOTimeout):
+            await run_excel_io(1, time.sleep, 0.5, timeout=0.05)
+
+
+class AsyncPreviewTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user("user", password="pass")
+        Profile.objects.create(user=user, role=Profile.Role.SUPER_ADMIN)
+        self.token = str(AccessToken.for_user(user))
+        self.plan = Plan.objects.create(
+            nom="Plan1", excel_path="/tmp/plan_async.xlsx", excel_sheet="s", header_row_index=1
+        )
+        wb = Workbook()
+        wb.active.title = "s"
+        wb.active.append(["act_id", "titre"])
+        for i in range(1, 31):
+            wb.active.append([f"ACT-{i:04d}", f"Action{i}"])
+        wb.save(self.plan.excel_path)
+
+    async def test_concurrent_previews(self):
+        client = AsyncClient()
+        headers = {"Authorization": f"Bearer {self.token}"}
+        responses = await asyncio.gather(
+            *(
+                client.get(
+                    "/api/excel/preview",
+                    {"plan": self.plan.pk, "offset": i, "limit": 5},
+                    headers=headers,
+                )
+                for i in range(10)
+            )
+        )
+        self.assertEqual({resp.status_code for resp in responses}, {200})
+        self.assertEqual(responses[3].json()["rows"][0]["act_id"], "ACT-0004")
@@ -0,0 +1,91 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils.http import http_date
+from openpyxl import Workbook
+from rest_framework.test import APIClient
+
+from pa.models import Action, Plan, PlanStat, PlanVersion, Profile
+from pa.services.excel_io import writeback_queue
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user("admin", password="pass")
+        Profile.objects.create(user=user, role=Profile.Role.SUPER_ADMIN)
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        wb = Workbook()
+        wb.active.title = "s"
+        wb.active.append(["act_id", "titre", "statut", "priorite", "a"])
+        wb.save("/tmp/plan_caching.xlsx")
+        self.plan = Plan.objects.create(
+            nom="Plan1", excel_path="/tmp/plan_caching.xlsx", excel_sheet="s", header_row_index=1
+        )
+        self.action = Action.objects.create(
+            act_id="ACT-0001",
+            titre="Action1",
+            statut="open",
+            priorite="high",
+            plan=self.plan,
+            excel_fichier="/tmp/plan_caching.xlsx",
+            excel_feuille="s",
+            excel_row_index=2,
+        )
+
+    def tearDown(self):
+        writeback_queue.flush()
+
+    def test_unchanged_list_gets_304_without_querying_actions(self):
+        resp = self.client.get("/api/actions/")
+        etag = resp["ETag"]
+        self.assertNotIn("Last-Modified", resp)
+        # plan versions only: the admin's profile is cached on the user
+        with self.assertNumQueries(1):
+            resp = self.client.get("/api/actions/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+
+    def test_writes_change_the_etag(self):
+        etag = self.client.get(f"/api/actions/{self.action.act_id}/")["ETag"]
+        self.client.post(f"/api/actions/{self.action.act_id}/close/")
+        resp = self.client.get(f"/api/actions/{self.action.act_id}/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.data["a"])
+
+        etag = resp["ETag"]
+        self.action.responsables.add(get_user_model().objects.get())
+        resp = self.client.get(f"/api/actions/{self.action.act_id}/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+
+    def test_plan_list_etag_follows_new_plans(self):
+        etag = self.client.get("/api/plans/")["ETag"]
+        Plan.objects.create(
+            nom="Plan2", excel_path="/tmp/p2.xlsx", excel_sheet="s", header_row_index=1
+        )
+        resp = self.client.get("/api/plans/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(len(resp.data), 2)
+
+    def test_plan_list_etag_follows_deleted_plans(self):
+        other = Plan.objects.create(
+            nom="Plan2", excel_path="/tmp/p2.xlsx", excel_sheet="s", header_row_index=1
+        )
+        etag = self.client.get("/api/plans/")["ETag"]
+        other.delete()
+        resp = self.client.get(
+            "/api/plans/", HTTP_IF_NONE_MATCH=etag, HTTP_IF_MODIFIED_SINCE=http_date()
+        )
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.data), 1)
+
+    @override_settings(PA_RESPONSE_CACHE=True)
+    def test_server_cache_serves_serialized_pages(self):
+        cache.clear()
+        self.client.get("/api/actions/")
+        with self.assertNumQueries(1):
+            resp = self.client.get("/api/actions/")
+        self.assertEqual(resp.data["results"][0]["act_id"], "ACT-0001")
+
+    def test_deleting_a_plan_leaves_no_orphan_rows(self):
+        self.plan.delete()
+        self.assertFalse(PlanVersion.objects.exists())
+        self.assertFalse(PlanStat.objects.exists())
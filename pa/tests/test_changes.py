@@ -0,0 +1,170 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import AsyncClient, TestCase, override_settings
+from openpyxl import Workbook
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from pa.models import Action, Change, Plan, Profile
+from pa.services.changes import prune_changes
+from pa.services.excel_io import writeback_queue
+
+
+class ChangeFeedTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.admin = User.objects.create_user("admin", password="pass")
+        Profile.objects.create(user=self.admin, role=Profile.Role.SUPER_ADMIN)
+        self.pilote = User.objects.create_user("pilote", password="pass")
+        profile = Profile.objects.create(user=self.pilote, role=Profile.Role.PILOTE)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.plans = []
+        for n in (1, 2):
+            plan = Plan.objects.create(
+                nom=f"Plan{n}",
+                excel_path=f"/tmp/plan_changes{n}.xlsx",
+                excel_sheet="s",
+                header_row_index=1,
+            )
+            wb = Workbook()
+            wb.active.title = "s"
+            wb.active.append(["act_id", "titre", "statut"])
+            for i in (1, 2):
+                act_id = f"ACT-{n}{i:03d}"
+                wb.active.append([act_id, f"Action{i}", "open"])
+                Action.objects.create(
+                    act_id=act_id,
+                    titre=f"Action{i}",
+                    statut="open",
+                    priorite="haute",
+                    plan=plan,
+                    excel_fichier=plan.excel_path,
+                    excel_feuille="s",
+                    excel_row_index=i + 1,
+                )
+            wb.save(plan.excel_path)
+            self.plans.append(plan)
+        profile.plans_autorises.add(self.plans[0])
+        self.since = self.client.get("/api/changes").data["last_seq"]
+
+    def tearDown(self):
+        writeback_queue.flush()
+
+    def changes(self, since=None):
+        resp = self.client.get("/api/changes", {"since": self.since if since is None else since})
+        self.assertEqual(resp.status_code, 200)
+        return resp.data
+
+    def test_save_paths_are_logged_as_compact_deltas(self):
+        self.client.patch("/api/actions/ACT-1001/", {"titre": "Renamed"}, format="json")
+        self.client.post("/api/actions/ACT-1001/validate/")
+        self.client.post("/api/actions/bulk/close/", {"act_ids": ["ACT-2001"]}, format="json")
+        self.client.post(
+            "/api/actions/ACT-2002/assign/", {"responsables": [self.pilote.pk]}, format="json"
+        )
+        self.client.delete("/api/actions/ACT-1002/")
+
+        data = self.changes()
+        self.assertFalse(data["has_more"])
+        entries = {entry["act_id"]: entry for entry in data["changes"]}
+        self.assertEqual(list(entries), ["ACT-1001", "ACT-2001", "ACT-2002", "ACT-1002"])
+        self.assertEqual(entries["ACT-1001"]["action"]["titre"], "Renamed")
+        self.assertTrue(entries["ACT-1001"]["action"]["c"])
+        self.assertTrue(entries["ACT-2001"]["action"]["a"])
+        self.assertEqual(entries["ACT-2002"]["action"]["responsables"], [self.pilote.pk])
+        self.assertEqual(entries["ACT-1002"]["op"], "delete")
+        self.assertEqual(data["last_seq"], entries["ACT-1002"]["seq"])
+        self.assertEqual(self.changes(data["last_seq"])["changes"], [])
+
+        # A pilote only sees the plans they are allowed on.
+        self.client.force_authenticate(self.pilote)
+        self.assertEqual(
+            [entry["act_id"] for entry in self.changes()["changes"]], ["ACT-1001", "ACT-1002"]
+        )
+
+    @override_settings(PA_CHANGES_MAX_ROWS=1)
+    def test_large_writes_log_a_reset(self):
+        Action.objects.filter(act_id="ACT-1001").get().save()
+        self.client.post(
+            "/api/actions/bulk/reject/", {"filter": {"plan": self.plans[0].pk}}, format="json"
+        )
+        self.assertEqual(
+            [(entry["plan"], entry["op"]) for entry in self.changes()["changes"]],
+            [(self.plans[0].pk, "reset")],
+        )
+
+    def test_pagination_and_pruning(self):
+        for plan in self.plans:
+            plan.nom += " bis"
+            plan.save()
+        first = self.client.get("/api/changes", {"since": self.since, "limit": 1}).data
+        self.assertTrue(first["has_more"])
+        self.assertEqual(first["changes"][0]["plan_data"]["nom"], "Plan1 bis")
+        second = self.changes(first["last_seq"])
+        self.assertEqual([entry["plan"] for entry in second["changes"]], [self.plans[1].pk])
+
+        self.assertGreater(prune_changes(max_age=-1), 0)
+        self.assertFalse(Change.objects.exists())
+        resp = self.client.get("/api/changes", {"since": self.since})
+        self.assertEqual(resp.status_code, 410)
+        self.assertEqual(self.changes(second["last_seq"])["changes"], [])
+
+    def test_bad_since(self):
+        self.assertEqual(self.client.get("/api/changes", {"since": "x"}).status_code, 400)
+
+
+class ChangeStreamTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user("user", password="pass")
+        Profile.objects.create(user=user, role=Profile.Role.SUPER_ADMIN)
+        self.token = str(AccessToken.for_user(user))
+        self.plan = Plan.objects.create(
+            nom="Plan1", excel_path="/tmp/plan_stream.xlsx", excel_sheet="s", header_row_index=1
+        )
+
+    @override_settings(PA_CHANGES_STREAM_TIMEOUT=0)
+    async def test_stream_sends_events_from_last_event_id(self):
+        first = await Change.objects.acreate(plan_id=self.plan.pk, act_id="ACT-0001", op="delete")
+        await Change.objects.acreate(plan_id=self.plan.pk, act_id="ACT-0002", op="delete")
+        response = await AsyncClient().get(
+            "/api/changes/stream",
+            headers={"Authorization": f"Bearer {self.token}", "Last-Event-ID": str(first.seq)},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        body = b"".join([chunk async for chunk in response.streaming_content]).decode()
+        event_id, event, data = body.strip().split("\n")
+        self.assertEqual(event_id, f"id: {first.seq + 1}")
+        self.assertEqual(event, "event: change")
+        self.assertEqual(json.loads(data[len("data: ") :])["act_id"], "ACT-0002")
+
+    @override_settings(PA_CHANGES_STREAM_TIMEOUT=0)
+    async def test_stream_accepts_a_stream_token_in_the_query(self):
+        client = AsyncClient()
+        resp = await client.post(
+            "/api/changes/stream/token", headers={"Authorization": f"Bearer {self.token}"}
+        )
+        self.assertEqual(resp.status_code, 200)
+        stream_token = resp.json()["token"]
+        change = await Change.objects.acreate(plan_id=self.plan.pk, act_id="ACT-0001", op="delete")
+        response = await client.get(
+            "/api/changes/stream", {"since": change.seq - 1, "token": stream_token}
+        )
+        self.assertEqual(response.status_code, 200)
+        body = b"".join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertIn(f"id: {change.seq}\nevent: change\n", body)
+
+        # A stream token opens nothing else, and access tokens stay out of URLs.
+        resp = await client.get("/api/changes", headers={"Authorization": f"Bearer {stream_token}"})
+        self.assertEqual(resp.status_code, 401)
+        resp = await client.get("/api/changes/stream", {"token": self.token})
+        self.assertEqual(resp.status_code, 401)
+
+    def test_stream_is_refused_under_wsgi(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token}")
+        resp = client.get("/api/changes/stream")
+        self.assertEqual(resp.status_code, 501)
+        self.assertIn("/api/changes", json.loads(resp.content)["detail"])
@@ -0,0 +1,14 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import SimpleTestCase
+
+
+@skipUnless(connection.vendor == "sqlite", "SQLite pragmas")
+class SQLitePragmaTests(SimpleTestCase):
+    databases = {"default"}
+
+    def test_busy_timeout_is_applied_on_connect(self):
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA busy_timeout")
+            self.assertEqual(cursor.fetchone()[0], 20_000)
@@ -0,0 +1,83 @@
+import multiprocessing
+import os
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+from openpyxl import Workbook, load_workbook
+
+from pa.services import excel_io
+from pa.services.filelock import WorkbookConflict, WorkbookLocked, workbook_lock
+
+
+def hold_lock(path, ready, release):
+    with workbook_lock(path, timeout=5):
+        ready.set()
+        release.wait(5)
+
+
+class WorkbookLockTests(SimpleTestCase):
+    def setUp(self):
+        self.path = "/tmp/plan_lock.xlsx"
+        wb = Workbook()
+        ws = wb.active
+        ws.title = "Sheet1"
+        ws.append(["act_id", "titre", "statut", "priorite"])
+        ws.append(["ACT-0001", "Action1", "open", "high"])
+        wb.save(self.path)
+        self.row = {
+            "act_id": "ACT-0001", "titre": "changed", "statut": "open",
+            "priorite": "high", "excel_row_index": 2, "fields": ["titre"],
+        }
+
+    def test_lock_held_by_other_process_times_out(self):
+        ctx = multiprocessing.get_context("fork")
+        ready, release = ctx.Event(), ctx.Event()
+        proc = ctx.Process(target=hold_lock, args=(self.path, ready, release))
+        proc.start()
+        try:
+            self.assertTrue(ready.wait(5))
+            with self.assertRaises(WorkbookLocked):
+                with workbook_lock(self.path, timeout=0.2):
+                    pass
+            # Other workbooks are not affected.
+            with workbook_lock("/tmp/other_plan_lock.xlsx", timeout=0.2):
+                pass
+        finally:
+            release.set()
+            proc.join()
+        with workbook_lock(self.path, timeout=1):
+            pass
+
+    @override_settings(PA_EXCEL_LOCK_DIR="/tmp")
+    def test_lock_dir_setting(self):
+        with workbook_lock(self.path, timeout=1):
+            pass
+
+    def test_external_edit_during_write_is_retried_not_clobbered(self):
+        real_load = excel_io.load_workbook
+        calls = []
+
+        def load_then_edit(path, *args, **kwargs):
+            wb = real_load(path, *args, **kwargs)
+            if not kwargs.get("read_only") and not calls:
+                calls.append(path)
+                # Someone saves the workbook outside our lock meanwhile.
+                other = real_load(path)
+                other["Sheet1"]["D2"] = "low"
+                other.save(path)
+                os.utime(path, ns=(1, 1))
+            return wb
+
+        with mock.patch("pa.services.excel_io.load_workbook", side_effect=load_then_edit):
+            self.assertEqual(excel_io.write_rows(self.path, "Sheet1", 1, [self.row]), 1)
+        ws = load_workbook(self.path)["Sheet1"]
+        self.assertEqual(ws["B2"].value, "changed")
+        self.assertEqual(ws["D2"].value, "low")
+
+    def test_conflict_raised_after_retries(self):
+        def moving_fingerprint(*args):
+            return (0, 0, os.urandom(4).hex())
+
+        with mock.patch("pa.services.excel_io.fingerprint", side_effect=moving_fingerprint):
+            with self.assertRaises(WorkbookConflict):
+                excel_io.write_rows(self.path, "Sheet1", 1, [self.row])
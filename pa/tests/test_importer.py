@@ -0,0 +1,142 @@
+from datetime import date, datetime
+from unittest import skipIf
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from openpyxl import Workbook, load_workbook
+
+from pa.models import Action, Plan, Sequence
+from pa.services import excel_io
+from pa.services.importer import import_plan
+
+HEADERS = ["act_id", "Titre", "statut", "priorite", "Budget", "p", "d", "c", "a", "j", "date_fin"]
+
+
+def make_plan_workbook(path, rows):
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "plan d’action"
+    for _ in range(10):
+        ws.append([])
+    ws.append(HEADERS)
+    for row in rows:
+        ws.append(row)
+    wb.save(path)
+
+
+class ImportPlanTests(TestCase):
+    def setUp(self):
+        self.path = "/tmp/plan_import.xlsx"
+        self.plan = Plan.objects.create(
+            nom="Plan1",
+            excel_path=self.path,
+            excel_sheet="plan d’action",
+            header_row_index=11,
+        )
+
+    def rows(self, n):
+        return [
+            [
+                f"ACT-{i:04d}", f"Action{i}", "open", "high", 1000 + i,
+                "x", None, None, None, i, date(2025, 1, i % 28 + 1),
+            ]
+            for i in range(1, n + 1)
+        ]
+
+    def test_inserts_then_updates_by_act_id(self):
+        make_plan_workbook(self.path, self.rows(30) + [[None, None, "open"]])
+        counts = import_plan(self.plan, chunk_size=10)
+        self.assertEqual(counts, {"inserted": 30, "updated": 0, "unchanged": 0, "skipped": 1})
+
+        action = Action.objects.get(act_id="ACT-0003")
+        self.assertEqual(action.budget_dzd, Decimal("1003.00"))
+        self.assertTrue(action.p)
+        self.assertFalse(action.d)
+        self.assertEqual(action.j, 3)
+        self.assertEqual(action.excel_row_index, 14)
+
+        rows = self.rows(30)
+        rows[4][2] = "closed"
+        make_plan_workbook(self.path, rows)
+        counts = import_plan(self.plan, chunk_size=10)
+        self.assertEqual(counts, {"inserted": 0, "updated": 1, "unchanged": 29, "skipped": 0})
+        self.assertEqual(Action.objects.get(act_id="ACT-0005").statut, "closed")
+
+    def test_first_occurrence_of_a_duplicate_act_id_wins(self):
+        rows = self.rows(12)
+        duplicate = list(rows[2])
+        duplicate[1] = "Doublon"
+        rows.insert(1, list(rows[2]))
+        rows.append(duplicate)
+        rows[1][1] = "Premier"
+        make_plan_workbook(self.path, rows)
+        # The duplicates sit in the same chunk and in the next one.
+        counts = import_plan(self.plan, chunk_size=10)
+        self.assertEqual(counts, {"inserted": 12, "updated": 0, "unchanged": 0, "skipped": 2})
+        action = Action.objects.get(act_id="ACT-0003")
+        self.assertEqual((action.titre, action.excel_row_index), ("Premier", 13))
+
+    def test_query_count_is_constant_per_chunk(self):
+        make_plan_workbook(self.path, self.rows(40))
+        # savepoint, per chunk: lookup, bulk insert and sequence bump,
+        # then the plan counters rebuild (3 GROUP BY, delete, insert, savepoint)
+        # the plan version bump and the change log insert
+        with self.assertNumQueries(2 + 4 * 3 + 7 + 1 + 1):
+            import_plan(self.plan, chunk_size=10)
+
+    @override_settings(PA_EXCEL_WRITEBACK_ASYNC=False)
+    def test_rows_without_act_id_get_reserved_ids(self):
+        Sequence.objects.filter(name="act_id").update(last_value=41)
+        make_plan_workbook(self.path, [[None, "Nouvelle"], [None, "Autre"]])
+        counts = import_plan(self.plan)
+        self.assertEqual(counts["inserted"], 2)
+        self.assertEqual(
+            list(Action.objects.order_by("excel_row_index").values_list("act_id", flat=True)),
+            ["ACT-0042", "ACT-0043"],
+        )
+        ws = load_workbook(self.path)["plan d’action"]
+        self.assertEqual(ws["A12"].value, "ACT-0042")
+
+    @override_settings(PA_EXCEL_WRITEBACK_ASYNC=False)
+    def test_reserved_ids_skip_the_explicit_ids_of_the_sheet(self):
+        # The blank row comes first, in another chunk than the explicit ids.
+        make_plan_workbook(
+            self.path, [[None, "B"], ["ACT-0001", "A"], ["X", "C"], ["ACT-0002", "D"]]
+        )
+        counts = import_plan(self.plan, chunk_size=1)
+        self.assertEqual(counts, {"inserted": 4, "updated": 0, "unchanged": 0, "skipped": 0})
+        self.assertEqual(
+            dict(Action.objects.values_list("act_id", "titre")),
+            {"ACT-0001": "A", "ACT-0002": "D", "ACT-0003": "B", "X": "C"},
+        )
+        self.assertEqual(load_workbook(self.path)["plan d’action"]["A12"].value, "ACT-0003")
+
+    def test_management_command(self):
+        make_plan_workbook(self.path, self.rows(3))
+        out = StringIO()
+        call_command("import_plan", str(self.plan.pk), stdout=out)
+        self.assertIn("3 inserted", out.getvalue())
+        self.assertEqual(Action.objects.filter(plan=self.plan).count(), 3)
+
+
+@skipIf(excel_io.python_calamine is None, "python-calamine is not installed")
+class ReadEngineTests(TestCase):
+    def test_engines_read_the_same_rows(self):
+        path = "/tmp/plan_engines.xlsx"
+        make_plan_workbook(
+            path,
+            [
+                ["ACT-0001", " Action1 ", "open", "high", 1250.5, "x", True, None, None, 3],
+                [],
+                ["ACT-0002", "Action2"] + [None] * 8 + [datetime(2025, 1, 2, 10, 30)],
+                [None] * 10 + [date(2025, 1, 3)],
+            ],
+        )
+        rows = {}
+        for engine in ("openpyxl", "calamine"):
+            with override_settings(PA_EXCEL_READ_ENGINE=engine):
+                rows[engine] = list(excel_io.iter_numbered_rows(path, "plan d’action", 11))
+        self.assertEqual([row_index for row_index, _ in rows["calamine"]], [12, 14, 15])
+        self.assertEqual(rows["calamine"], rows["openpyxl"])
@@ -0,0 +1,127 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from openpyxl import Workbook, load_workbook
+
+from pa.models import Action, Job, Plan
+from pa.services.excel_io import apply_update
+from pa.services.filelock import WorkbookLocked
+from pa.services.jobs import (
+    claim_next_job,
+    enqueue_job,
+    heartbeat_jobs,
+    job_handler,
+    report_progress,
+    requeue_stale_jobs,
+    run_pending_jobs,
+)
+
+
+@job_handler("test.progress")
+def progress_job(job, steps):
+    for step in range(1, steps + 1):
+        report_progress(job, step, steps)
+    return {"steps": steps}
+
+
+@job_handler("test.fail")
+def failing_job(job):
+    raise RuntimeError("boom")
+
+
+class JobRunnerTests(TestCase):
+    def test_claim_is_exclusive_and_ordered(self):
+        first = enqueue_job("test.progress", {"steps": 1})
+        second = enqueue_job("test.progress", {"steps": 1})
+        self.assertEqual(claim_next_job().pk, first.pk)
+        self.assertEqual(claim_next_job().pk, second.pk)
+        self.assertIsNone(claim_next_job())
+
+    def test_result_progress_and_failure_are_recorded(self):
+        ok = enqueue_job("test.progress", {"steps": 3})
+        ko = enqueue_job("test.fail")
+        with self.assertLogs("pa.services.jobs", "ERROR"):
+            self.assertEqual(run_pending_jobs(), 2)
+        ok.refresh_from_db()
+        ko.refresh_from_db()
+        self.assertEqual(ok.status, Job.Status.SUCCEEDED)
+        self.assertEqual((ok.progress_done, ok.progress_total), (3, 3))
+        self.assertEqual(ok.result, {"steps": 3})
+        self.assertEqual(ko.status, Job.Status.FAILED)
+        self.assertIn("boom", ko.error)
+
+    def test_only_jobs_without_a_recent_heartbeat_are_requeued(self):
+        alive = enqueue_job("test.progress", {"steps": 1})
+        dead = enqueue_job("test.progress", {"steps": 1})
+        claim_next_job(), claim_next_job()
+        long_ago = timezone.now() - timedelta(hours=2)
+        Job.objects.update(started_at=long_ago, heartbeat_at=long_ago)
+        heartbeat_jobs([alive.pk])
+        self.assertEqual(requeue_stale_jobs(max_age=60), 1)
+        self.assertEqual(Job.objects.get(pk=alive.pk).status, Job.Status.RUNNING)
+        self.assertEqual(Job.objects.get(pk=dead.pk).status, Job.Status.PENDING)
+
+    def test_unknown_kind_is_rejected(self):
+        with self.assertRaises(ValueError):
+            enqueue_job("nope")
+
+    def test_run_jobs_once_command(self):
+        enqueue_job("test.progress", {"steps": 1})
+        out = StringIO()
+        call_command("run_jobs", "--once", stdout=out)
+        self.assertIn("1 job(s) run", out.getvalue())
+
+
+@override_settings(PA_EXCEL_WRITEBACK_BACKEND="jobs")
+class WriteBackJobTests(TestCase):
+    def setUp(self):
+        path = self.path = "/tmp/plan_jobs.xlsx"
+        wb = Workbook()
+        ws = wb.active
+        ws.title = "Sheet1"
+        ws.append(["act_id", "titre", "statut", "priorite"])
+        ws.append(["ACT-0001", "Action1", "open", "high"])
+        wb.save(path)
+        plan = Plan.objects.create(
+            nom="Plan1", excel_path=path, excel_sheet="Sheet1", header_row_index=1
+        )
+        Action.objects.create(
+            act_id="ACT-0001",
+            titre="Action1",
+            statut="rejected",
+            priorite="high",
+            plan=plan,
+            excel_fichier=path,
+            excel_feuille="Sheet1",
+            excel_row_index=2,
+        )
+
+    def test_apply_update_hands_write_back_to_worker(self):
+        self.assertEqual(apply_update("ACT-0001", fields=["statut"]), 1)
+        job = Job.objects.get(kind="excel.writeback")
+        self.assertEqual(load_workbook(self.path)["Sheet1"]["C2"].value, "open")
+        run_pending_jobs()
+        job.refresh_from_db()
+        self.assertEqual(job.result, {"written": 1})
+        self.assertEqual(load_workbook(self.path)["Sheet1"]["C2"].value, "rejected")
+
+    @override_settings(PA_JOBS_RETRY_DELAY=60)
+    def test_busy_workbook_retries_the_job_later(self):
+        apply_update("ACT-0001", fields=["statut"])
+        job = Job.objects.get(kind="excel.writeback")
+        with mock.patch("pa.services.tasks.write_actions", side_effect=WorkbookLocked(self.path)):
+            self.assertEqual(run_pending_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.PENDING)
+        self.assertGreater(job.run_after, timezone.now() + timedelta(seconds=50))
+        self.assertEqual(run_pending_jobs(), 0)
+
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        self.assertEqual(run_pending_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.SUCCEEDED)
+        self.assertEqual(load_workbook(self.path)["Sheet1"]["C2"].value, "rejected")
@@ -0,0 +1,87 @@
+from asgiref.sync import iscoroutinefunction
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import AsyncClient, SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from pa import metrics
+from pa.middleware import RequestMetricsMiddleware
+from pa.models import Plan, Profile
+
+
+class HistogramTests(SimpleTestCase):
+    def test_render_is_cumulative(self):
+        histogram = metrics.Histogram("pa_test_seconds", "Test.", buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 3):
+            histogram.observe(value, span='a"b')
+        self.assertEqual(
+            histogram.render(),
+            [
+                "# HELP pa_test_seconds Test.",
+                "# TYPE pa_test_seconds histogram",
+                'pa_test_seconds_bucket{span="a\\"b",le="0.1"} 1',
+                'pa_test_seconds_bucket{span="a\\"b",le="1.0"} 3',
+                'pa_test_seconds_bucket{span="a\\"b",le="+Inf"} 4',
+                'pa_test_seconds_sum{span="a\\"b"} 4.05',
+                'pa_test_seconds_count{span="a\\"b"} 4',
+            ],
+        )
+
+    @override_settings(PA_METRICS_ENABLED=False)
+    def test_disabled_spans_record_nothing(self):
+        metrics.span_seconds.clear()
+        with metrics.span("noop"):
+            pass
+        self.assertEqual(metrics.span_seconds.samples(span="noop")["count"], 0)
+
+
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        for histogram in metrics.REGISTRY:
+            histogram.clear()
+        user = get_user_model().objects.create_user("admin", password="pass")
+        Profile.objects.create(user=user, role=Profile.Role.SUPER_ADMIN)
+        Plan.objects.create(
+            nom="Plan1", excel_path="/tmp/p.xlsx", excel_sheet="s", header_row_index=1
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        self.token = str(AccessToken.for_user(user))
+
+    def test_request_and_span_histograms(self):
+        self.client.get("/api/plans/")
+        route = "api/plans/$"
+        self.assertEqual(metrics.request_queries.samples(route=route)["count"], 1)
+        self.assertGreater(metrics.request_queries.samples(route=route)["sum"], 0)
+        self.assertEqual(metrics.span_seconds.samples(span="permission.check")["count"], 1)
+        self.assertEqual(metrics.span_seconds.samples(span="serialize.plan")["count"], 1)
+
+        resp = self.client.get("/api/metrics")
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn(f'pa_request_sql_queries_count{{route="{route}"}} 1', resp.content.decode())
+
+    async def test_async_requests_stay_async(self):
+        async def get_response(request):
+            return HttpResponse()
+
+        self.assertTrue(iscoroutinefunction(RequestMetricsMiddleware(get_response)))
+        self.assertFalse(iscoroutinefunction(RequestMetricsMiddleware(lambda request: None)))
+
+        await AsyncClient().get("/api/plans/", headers={"Authorization": f"Bearer {self.token}"})
+        samples = metrics.request_queries.samples(route="api/plans/$")
+        self.assertEqual(samples["count"], 1)
+        self.assertGreater(samples["sum"], 0)
+
+    @override_settings(PA_SLOW_REQUEST_MS=0)
+    def test_slow_request_log_has_span_breakdown(self):
+        with self.assertLogs("pa.middleware", "WARNING") as logs:
+            self.client.get("/api/plans/")
+        self.assertIn("permission.check=", logs.output[0])
+
+    @override_settings(PA_METRICS_TOKEN="secret")
+    def test_token(self):
+        client = APIClient()
+        self.assertEqual(client.get("/api/metrics").status_code, 401)
+        resp = client.get("/api/metrics", HTTP_AUTHORIZATION="Bearer secret")
+        self.assertEqual(resp.status_code, 200)
@@ -0,0 +1,149 @@
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from pa.models import Action, Plan, Profile
+
+# The permission context is only cached in a backend shared between workers.
+SHARED_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": tempfile.mkdtemp(prefix="pa-cache-"),
+    }
+}
+
+
+class ActionListQueryCountTests(TestCase):
+    """The number of queries per request must not grow with the number of actions."""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.user = User.objects.create_user("pilote", password="pass")
+        cls.profile = Profile.objects.create(user=cls.user, role=Profile.Role.PILOTE)
+        cls.plan = Plan.objects.create(
+            nom="Plan1",
+            excel_path="/tmp/plan.xlsx",
+            excel_sheet="Sheet1",
+            header_row_index=1,
+        )
+        cls.other_plan = Plan.objects.create(
+            nom="Plan2",
+            excel_path="/tmp/plan2.xlsx",
+            excel_sheet="Sheet1",
+            header_row_index=1,
+        )
+        cls.profile.plans_autorises.add(cls.plan)
+        cls.responsables = [
+            User.objects.create_user(f"resp{i}", password="pass") for i in range(3)
+        ]
+
+    def setUp(self):
+        # Start from a cold permission cache, see test_permission_context_is_cached.
+        cache.clear()
+        self.client = APIClient()
+        # A fresh instance, as the authentication backend would load it.
+        self.client.force_authenticate(get_user_model().objects.get(pk=self.user.pk))
+
+    def create_actions(self, count, plan=None):
+        plan = plan or self.plan
+        start = Action.objects.count()
+        actions = Action.objects.bulk_create(
+            Action(
+                act_id=f"ACT-{start + i:05d}",
+                titre=f"Action{i}",
+                statut="open",
+                priorite="high",
+                plan=plan,
+                excel_fichier=plan.excel_path,
+                excel_feuille=plan.excel_sheet,
+                excel_row_index=i + 2,
+            )
+            for i in range(count)
+        )
+        through = Action.responsables.through
+        through.objects.bulk_create(
+            through(action_id=action.pk, user_id=user.pk)
+            for action in actions
+            for user in self.responsables
+        )
+
+    def assert_list_queries(self, count):
+        self.create_actions(count)
+        # profile, authorized plan ids, plan versions (ETag), actions,
+        # prefetched responsables
+        with self.assertNumQueries(5):
+            resp = self.client.get("/api/actions/", {"page_size": 500})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.data["results"]), min(count, 500))
+        self.assertEqual(len(resp.data["results"][0]["responsables"]), 3)
+
+    def test_list_10_actions(self):
+        self.assert_list_queries(10)
+
+    def test_list_100_actions(self):
+        self.assert_list_queries(100)
+
+    def test_list_1000_actions(self):
+        self.assert_list_queries(1000)
+
+    def test_list_is_scoped_to_authorized_plans(self):
+        self.create_actions(5)
+        self.create_actions(5, plan=self.other_plan)
+        resp = self.client.get("/api/actions/")
+        self.assertEqual(len(resp.data["results"]), 5)
+        self.assertEqual({row["plan"] for row in resp.data["results"]}, {self.plan.pk})
+
+    def test_detail_queries(self):
+        self.create_actions(10)
+        with self.assertNumQueries(5):
+            resp = self.client.get("/api/actions/ACT-00003/")
+        self.assertEqual(resp.status_code, 200)
+
+    def test_cursor_pagination_walks_every_action_once(self):
+        self.create_actions(25)
+        seen = []
+        url = "/api/actions/?page_size=10"
+        while url:
+            resp = self.client.get(url)
+            seen.extend(row["act_id"] for row in resp.data["results"])
+            url = resp.data["next"]
+        self.assertEqual(len(seen), 25)
+        self.assertEqual(len(set(seen)), 25)
+
+    def test_sparse_fieldset_skips_columns_and_prefetch(self):
+        self.create_actions(10)
+        # profile, authorized plan ids, plan versions (ETag), actions
+        with self.assertNumQueries(4):
+            resp = self.client.get("/api/actions/", {"fields": "act_id,titre"})
+        self.assertEqual(set(resp.data["results"][0]), {"act_id", "titre"})
+
+    @override_settings(CACHES=SHARED_CACHES)
+    def test_permission_context_is_cached(self):
+        cache.clear()
+        self.create_actions(10)
+        self.client.get("/api/actions/")
+        # plan versions (ETag), actions, prefetched responsables
+        with self.assertNumQueries(3):
+            self.client.get("/api/actions/")
+
+    def test_local_memory_cache_is_not_used_for_permissions(self):
+        # Other workers would keep a revoked access until the entry expires.
+        self.create_actions(10)
+        self.client.get("/api/actions/")
+        # authorized plan ids, plan versions (ETag), actions, prefetched responsables
+        with self.assertNumQueries(4):
+            self.client.get("/api/actions/")
+
+    @override_settings(CACHES=SHARED_CACHES)
+    def test_plans_autorises_change_invalidates_cache(self):
+        cache.clear()
+        self.create_actions(2, plan=self.other_plan)
+        self.assertEqual(len(self.client.get("/api/actions/").data["results"]), 0)
+        self.profile.plans_autorises.add(self.other_plan)
+        self.assertEqual(len(self.client.get("/api/actions/").data["results"]), 2)
+        self.other_plan.profile_set.clear()
+        self.assertEqual(len(self.client.get("/api/actions/").data["results"]), 0)
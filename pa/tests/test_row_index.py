@@ -0,0 +1,99 @@
+import os
+from unittest import mock
+
+from django.test import TestCase
+from openpyxl import Workbook, load_workbook
+
+from pa.models import Action, Plan
+from pa.services import row_index
+from pa.services.excel_io import write_action, write_rows
+from pa.services.importer import import_plan
+from pa.services.row_index import index_path, load_row_index
+from pa.services.sync import sync_plan
+
+
+class RowIndexTests(TestCase):
+    def setUp(self):
+        self.path = "/tmp/plan_row_index.xlsx"
+        if os.path.exists(index_path(self.path)):
+            os.remove(index_path(self.path))
+        wb = Workbook()
+        ws = wb.active
+        ws.title = "Sheet1"
+        ws.append(["act_id", "titre", "statut", "priorite"])
+        ws.append(["ACT-0001", "Action1", "open", "high"])
+        ws.append(["ACT-0002", "Action2", "open", "low"])
+        wb.save(self.path)
+        self.plan = Plan.objects.create(
+            nom="Plan1", excel_path=self.path, excel_sheet="Sheet1", header_row_index=1
+        )
+        self.action = Action.objects.create(
+            act_id="ACT-0002",
+            titre="Action2",
+            statut="open",
+            priorite="low",
+            plan=self.plan,
+            excel_fichier=self.path,
+            excel_feuille="Sheet1",
+            excel_row_index=3,
+        )
+
+    def test_index_is_persisted_and_reused(self):
+        index = load_row_index(self.path, "Sheet1", 1)
+        self.assertEqual(index.rows, {"ACT-0001": 2, "ACT-0002": 3})
+        self.assertEqual(index.columns["priorite"], 4)
+        with mock.patch.object(row_index, "build_row_index") as build:
+            load_row_index(self.path, "Sheet1", 1)
+        build.assert_not_called()
+
+    def test_own_save_carries_index_over(self):
+        self.action.titre = "renamed"
+        with mock.patch.object(
+            row_index, "build_row_index", wraps=row_index.build_row_index
+        ) as build:
+            write_action(self.action)
+            write_action(self.action)
+        self.assertEqual(build.call_count, 1)
+        self.assertEqual(load_workbook(self.path)["Sheet1"]["B3"].value, "renamed")
+
+    def test_moved_row_is_followed(self):
+        wb = load_workbook(self.path)
+        wb["Sheet1"].insert_rows(2)
+        wb["Sheet1"]["A2"] = "ACT-0009"
+        wb.save(self.path)
+
+        self.action.statut = "closed"
+        write_action(self.action)
+        ws = load_workbook(self.path)["Sheet1"]
+        self.assertEqual(ws["C4"].value, "closed")
+        self.assertEqual(ws["C3"].value, "open")
+        self.action.refresh_from_db()
+        self.assertEqual(self.action.excel_row_index, 4)
+
+    def test_row_of_another_action_is_not_overwritten(self):
+        snapshot = {
+            "act_id": "ACT-0007",
+            "titre": "ghost",
+            "excel_row_index": 2,
+            "fields": ["titre"],
+        }
+        self.assertEqual(write_rows(self.path, "Sheet1", 1, [snapshot]), 0)
+        self.assertEqual(load_workbook(self.path)["Sheet1"]["B2"].value, "Action1")
+
+    def test_duplicated_act_id_resolves_to_the_first_row_everywhere(self):
+        wb = load_workbook(self.path)
+        wb["Sheet1"].append(["ACT-0002", "Doublon", "closed", "high"])
+        wb.save(self.path)
+
+        import_plan(self.plan)
+        self.action.refresh_from_db()
+        self.assertEqual((self.action.titre, self.action.excel_row_index), ("Action2", 3))
+
+        wb = load_workbook(self.path)
+        wb["Sheet1"]["B4"] = "Doublon modifié"
+        wb.save(self.path)
+        sync_plan(self.plan)
+        self.action.refresh_from_db()
+        self.assertEqual((self.action.titre, self.action.excel_row_index), ("Action2", 3))
+
+        self.assertEqual(load_row_index(self.path, "Sheet1", 1).row_of("ACT-0002"), 3)
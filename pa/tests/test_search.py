@@ -0,0 +1,81 @@
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from pa.models import Action, Plan, Profile
+from pa.services.search import ensure_search_triggers, search_actions
+
+
+@skipUnless(connection.vendor == "sqlite", "FTS5 index")
+class ActionSearchTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user("user", password="pass")
+        Profile.objects.create(user=user, role=Profile.Role.SUPER_ADMIN)
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        self.plan = Plan.objects.create(
+            nom="Plan1", excel_path="/tmp/plan.xlsx", excel_sheet="s", header_row_index=1
+        )
+        rows = [
+            ("Réunion du comité sécurité", "", "open"),
+            ("Audit incendie", "à présenter au comité de sécurité", "open"),
+            ("Formation", "réunion de lancement", "closed"),
+            ("Inventaire", "", "open"),
+        ]
+        for n, (titre, commentaire, statut) in enumerate(rows, start=1):
+            Action.objects.create(
+                act_id=f"ACT-{n:04d}",
+                titre=titre,
+                commentaire=commentaire,
+                statut=statut,
+                priorite="haute",
+                plan=self.plan,
+                excel_fichier="/tmp/plan.xlsx",
+                excel_feuille="s",
+                excel_row_index=n + 1,
+            )
+
+    def search(self, **params):
+        resp = self.client.get("/api/actions/", params)
+        self.assertEqual(resp.status_code, 200)
+        return [row["act_id"] for row in resp.data["results"]]
+
+    def test_accent_insensitive_prefix_search_is_ranked(self):
+        # The title match ranks above the comment match.
+        self.assertEqual(self.search(q="securite comit"), ["ACT-0001", "ACT-0002"])
+        self.assertEqual(self.search(q="REUNION"), ["ACT-0001", "ACT-0003"])
+        self.assertEqual(self.search(q="absent"), [])
+
+    def test_combines_with_filters(self):
+        self.assertEqual(self.search(q="réunion", statut="closed"), ["ACT-0003"])
+
+    def test_cursor_pages_follow_the_rank(self):
+        Action.objects.filter(act_id__in=["ACT-0002", "ACT-0004"]).update(commentaire="réunion")
+        ranked = self.search(q="reunion")
+        self.assertEqual(len(ranked), 4)
+        seen, url = [], "/api/actions/?q=reunion&page_size=1"
+        while url:
+            resp = self.client.get(url)
+            seen.extend(row["act_id"] for row in resp.data["results"])
+            url = resp.data["next"]
+        self.assertEqual(seen, ranked)
+
+    def test_index_follows_writes(self):
+        action = Action.objects.get(act_id="ACT-0004")
+        action.titre = "Contrôle électrique"
+        action.save()
+        Action.objects.filter(act_id="ACT-0003").update(commentaire="contrôle annuel")
+        queryset = search_actions(Action.objects.all(), "controle")
+        self.assertEqual(set(queryset.values_list("act_id", flat=True)), {"ACT-0003", "ACT-0004"})
+        action.delete()
+        self.assertEqual(list(queryset.values_list("act_id", flat=True)), ["ACT-0003"])
+
+    def test_missing_triggers_are_restored(self):
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TRIGGER pa_action_fts_au")
+        ensure_search_triggers(connection)
+        Action.objects.filter(act_id="ACT-0004").update(titre="Archivage")
+        self.assertEqual(self.search(q="archivage"), ["ACT-0004"])
@@ -0,0 +1,66 @@
+from django.test import TestCase, override_settings
+from openpyxl import Workbook
+
+from pa.models import Plan
+from pa.services.excel_io import load_sheet, read_plan, write_rows
+from pa.services.sheet_cache import SheetCache, sheet_cache
+
+
+def make_workbook(path, rows):
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Sheet1"
+    ws.append(["act_id", "titre", "statut", "priorite"])
+    for i in range(1, rows + 1):
+        ws.append([f"ACT-{i:04d}", f"Action{i}", "open", "high"])
+    wb.save(path)
+
+
+class SheetCacheTests(TestCase):
+    def setUp(self):
+        sheet_cache.clear()
+        self.path = "/tmp/plan_cache.xlsx"
+        make_workbook(self.path, 5)
+        self.plan = Plan.objects.create(
+            nom="Plan1",
+            excel_path=self.path,
+            excel_sheet="Sheet1",
+            header_row_index=1,
+        )
+
+    def test_repeated_reads_hit_the_cache(self):
+        first = read_plan(self.plan, limit=2)
+        second = read_plan(self.plan, limit=2, offset=2)
+        self.assertEqual(first[0]["act_id"], "ACT-0001")
+        self.assertEqual(second[0]["act_id"], "ACT-0003")
+        self.assertEqual(sheet_cache.stats()["misses"], 1)
+        self.assertEqual(sheet_cache.stats()["hits"], 1)
+
+    def test_save_invalidates_entry(self):
+        read_plan(self.plan)
+        write_rows(self.path, "Sheet1", 1, [{
+            "act_id": "ACT-0001", "titre": "changed", "statut": "open",
+            "priorite": "high", "excel_row_index": 2,
+        }])
+        self.assertEqual(sheet_cache.stats()["entries"], 0)
+        self.assertEqual(read_plan(self.plan, limit=1)[0]["titre"], "changed")
+        self.assertEqual(sheet_cache.stats()["misses"], 2)
+
+    def test_lru_eviction_and_cell_budget(self):
+        cache = SheetCache(max_entries=1, max_cells=100)
+        other = "/tmp/plan_cache_other.xlsx"
+        make_workbook(other, 3)
+        cache.get_or_load(self.path, "Sheet1", 1, load_sheet)
+        cache.get_or_load(other, "Sheet1", 1, load_sheet)
+        self.assertEqual(cache.stats()["entries"], 1)
+        cache.get_or_load(other, "Sheet1", 1, load_sheet)
+        self.assertEqual(cache.hits, 1)
+
+        make_workbook(other, 50)
+        self.assertIsNone(cache.get_or_load(other, "Sheet1", 1, load_sheet))
+        self.assertEqual(cache.stats()["entries"], 0)
+
+    @override_settings(PA_SHEET_CACHE_MAX_CELLS=8)
+    def test_too_large_sheet_falls_back_to_streaming(self):
+        rows = read_plan(self.plan, limit=2, offset=3)
+        self.assertEqual([r["act_id"] for r in rows], ["ACT-0004", "ACT-0005"])
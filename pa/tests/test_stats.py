@@ -0,0 +1,109 @@
+from datetime import timedelta
+from importlib import import_module
+
+from django.apps import apps
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from pa.models import Action, Plan, PlanStat, Profile
+from pa.services.stats import compute_counters, dashboard_stats
+from pa.services.workflow import bulk_transition
+
+
+class PlanStatsTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        User = get_user_model()
+        self.user = User.objects.create_user("user", password="pass")
+        Profile.objects.create(user=self.user, role=Profile.Role.SUPER_ADMIN)
+        self.plan = Plan.objects.create(
+            nom="Plan1",
+            excel_path="/tmp/plan.xlsx",
+            excel_sheet="Sheet1",
+            header_row_index=1,
+        )
+        yesterday = timezone.localdate() - timedelta(days=1)
+        for i, (statut, a) in enumerate([("open", False), ("open", False), ("closed", True)]):
+            Action.objects.create(
+                act_id=f"ACT-{i + 1:04d}",
+                titre=f"Action{i}",
+                statut=statut,
+                priorite="high",
+                a=a,
+                p=True,
+                date_fin=yesterday,
+                plan=self.plan,
+                excel_fichier=self.plan.excel_path,
+                excel_feuille="Sheet1",
+                excel_row_index=i + 2,
+            )
+
+    def stored_counters(self):
+        return {
+            (s.plan_id, s.key): s.value for s in PlanStat.objects.exclude(value=0)
+        }
+
+    def test_counters_follow_saves_and_deletes(self):
+        action = Action.objects.get(act_id="ACT-0001")
+        action.statut = "rejected"
+        action.save()
+        Action.objects.get(act_id="ACT-0002").delete()
+        self.assertEqual(self.stored_counters(), compute_counters(Action.objects.all()))
+        self.assertEqual(
+            PlanStat.objects.get(plan=self.plan, key="statut:rejected").value, 1
+        )
+
+    def test_stale_instances_do_not_skew_counters(self):
+        first = Action.objects.get(act_id="ACT-0001")
+        second = Action.objects.get(act_id="ACT-0001")
+        first.statut = "closed"
+        first.save()
+        second.statut = "rejected"
+        second.save()
+        second.titre = "Renamed"
+        second.save(update_fields=["titre"])
+        self.assertEqual(self.stored_counters(), compute_counters(Action.objects.all()))
+        first.delete()
+        self.assertEqual(self.stored_counters(), compute_counters(Action.objects.all()))
+
+    def test_closed_rejected_actions_are_not_subtracted_twice(self):
+        action = Action.objects.get(act_id="ACT-0003")
+        action.statut = "rejected"
+        action.save()
+        self.assertEqual(dashboard_stats(Plan.objects.all())["global"]["in_progress"], 2)
+
+    def test_bulk_transitions_apply_deltas(self):
+        actions = list(Action.objects.order_by("id"))
+        # A stale instance: the stored row is already rejected.
+        Action.objects.filter(act_id="ACT-0002").update(statut="rejected")
+        PlanStat.objects.filter(plan=self.plan, key="statut:open").update(value=1)
+        PlanStat.objects.create(plan=self.plan, key="statut:rejected", value=1)
+
+        bulk_transition(actions, "reject")
+        self.assertEqual(self.stored_counters(), compute_counters(Action.objects.all()))
+        bulk_transition(list(Action.objects.all()), "validate")
+        self.assertEqual(self.stored_counters(), compute_counters(Action.objects.all()))
+
+    def test_data_migration_counts_like_the_service(self):
+        Action.objects.filter(act_id="ACT-0003").update(statut="rejected")
+        migration = import_module("pa.migrations.0010_rebuild_plan_stats")
+        migration.rebuild_plan_stats(apps, None)
+        self.assertEqual(self.stored_counters(), compute_counters(Action.objects.all()))
+
+    def test_stats_endpoint(self):
+        self.client.force_authenticate(get_user_model().objects.get(pk=self.user.pk))
+        # profile, plans, counters, overdue
+        with self.assertNumQueries(4):
+            resp = self.client.get("/api/stats/")
+        self.assertEqual(resp.status_code, 200)
+        summary = resp.data["global"]
+        self.assertEqual(summary["total"], 3)
+        self.assertEqual(summary["closed"], 1)
+        self.assertEqual(summary["overdue"], 2)
+        self.assertEqual(summary["in_progress"], 2)
+        self.assertEqual(summary["statut"], {"open": 2, "closed": 1})
+        self.assertEqual(summary["pdca"], {"p": 3, "d": 0, "c": 0, "a": 1})
+        self.assertEqual(resp.data["plans"][0]["total"], 3)
@@ -0,0 +1,112 @@
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from pa.models import Action, Change, Plan, PlanStat, RowHash
+from pa.services.sync import sync_plan
+from pa.tests.test_importer import make_plan_workbook
+
+
+def make_rows(n):
+    return [
+        [f"ACT-{i:04d}", f"Action{i}", "open", "high", 1000 + i, "x", None, None, None, i,
+         date(2025, 1, i % 28 + 1)]
+        for i in range(1, n + 1)
+    ]
+
+
+@override_settings(PA_EXCEL_WRITEBACK_ASYNC=False)
+class SyncPlanTests(TestCase):
+    def setUp(self):
+        self.path = "/tmp/plan_sync.xlsx"
+        self.plan = Plan.objects.create(
+            nom="Plan1",
+            excel_path=self.path,
+            excel_sheet="plan d’action",
+            header_row_index=11,
+        )
+
+    def test_first_sync_adds_every_row(self):
+        make_plan_workbook(self.path, make_rows(20))
+        report = sync_plan(self.plan)
+        self.assertEqual(len(report["added"]), 20)
+        self.assertEqual(Action.objects.filter(plan=self.plan).count(), 20)
+        self.assertEqual(RowHash.objects.filter(plan=self.plan).count(), 20)
+        self.assertEqual(PlanStat.objects.get(plan=self.plan, key="total").value, 20)
+
+    def test_unchanged_sheet_costs_one_query(self):
+        make_plan_workbook(self.path, make_rows(200))
+        sync_plan(self.plan)
+        with self.assertNumQueries(1):
+            report = sync_plan(self.plan)
+        self.assertEqual(report["unchanged"], 200)
+        self.assertEqual(report["added"] + report["modified"] + report["moved"], [])
+
+    def test_reports_modified_moved_and_deleted_rows(self):
+        rows = make_rows(5)
+        make_plan_workbook(self.path, rows)
+        sync_plan(self.plan)
+
+        rows[1][2] = "closed"
+        del rows[2]
+        rows.insert(0, [None, "Nouvelle action", "open", "low"])
+        make_plan_workbook(self.path, rows)
+        report = sync_plan(self.plan)
+
+        self.assertEqual(len(report["added"]), 1)
+        self.assertEqual(report["modified"], [{"act_id": "ACT-0002", "fields": ["statut"]}])
+        self.assertEqual(report["deleted"], ["ACT-0003"])
+        self.assertIn({"act_id": "ACT-0001", "from": 12, "to": 13}, report["moved"])
+        self.assertEqual(Action.objects.get(act_id="ACT-0002").statut, "closed")
+        self.assertEqual(Action.objects.get(act_id="ACT-0001").excel_row_index, 13)
+        self.assertFalse(Action.objects.filter(act_id="ACT-0003").exists())
+        self.assertEqual(PlanStat.objects.get(plan=self.plan, key="closed").value, 1)
+
+        # The reserved identifier was written back; the next sync is a no-op.
+        report = sync_plan(self.plan)
+        self.assertEqual(report["unchanged"], 5)
+        self.assertEqual(report["added"] + report["modified"] + report["moved"], [])
+
+    def test_deletions_cost_the_same_whatever_their_number(self):
+        user = get_user_model().objects.create_user("user", password="pass")
+        counts = []
+        for kept in (18, 8):
+            make_plan_workbook(self.path, make_rows(20))
+            sync_plan(self.plan)
+            Action.objects.get(act_id="ACT-0020").responsables.add(user)
+            make_plan_workbook(self.path, make_rows(kept))
+            with CaptureQueriesContext(connection) as queries:
+                report = sync_plan(self.plan)
+            self.assertEqual(len(report["deleted"]), 20 - kept)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(Action.objects.filter(plan=self.plan).count(), 8)
+        self.assertEqual(PlanStat.objects.get(plan=self.plan, key="total").value, 8)
+        self.assertEqual(Change.objects.filter(act_id="ACT-0015", op="delete").count(), 1)
+
+    def test_reserved_ids_skip_the_explicit_ids_of_the_sheet(self):
+        make_plan_workbook(self.path, [[None, "B", "open", "low"], ["ACT-0001", "A", "open", "low"]])
+        report = sync_plan(self.plan)
+        self.assertEqual(sorted(report["added"]), ["ACT-0001", "ACT-0002"])
+        self.assertEqual(report["skipped"], 0)
+        self.assertEqual(
+            dict(Action.objects.values_list("act_id", "titre")), {"ACT-0001": "A", "ACT-0002": "B"}
+        )
+        self.assertEqual(
+            dict(RowHash.objects.values_list("act_id", "excel_row_index")),
+            {"ACT-0001": 13, "ACT-0002": 12},
+        )
+        # The write-back numbered the blank row: nothing left to do.
+        report = sync_plan(self.plan)
+        self.assertEqual(report["unchanged"], 2)
+
+    def test_keep_missing_rows(self):
+        make_plan_workbook(self.path, make_rows(3))
+        sync_plan(self.plan)
+        make_plan_workbook(self.path, make_rows(2))
+        report = sync_plan(self.plan, delete_missing=False)
+        self.assertEqual(report["deleted"], [])
+        self.assertTrue(Action.objects.filter(act_id="ACT-0003").exists())
@@ -0,0 +1,38 @@
+from io import StringIO
+
+from django.test import SimpleTestCase, TestCase
+from openpyxl import load_workbook
+
+from pa.management.commands.benchmark import Command as BenchmarkCommand
+from pa.models import Action
+from pa.services.synthetic import create_synthetic_plan, create_users
+
+
+class SyntheticPlanTests(TestCase):
+    def test_generated_plan_is_imported(self):
+        users = create_users(3)
+        plan = create_synthetic_plan(
+            "synthetic", "/tmp/plan_synthetic.xlsx", 25, users, extra_columns=8
+        )
+        ws = load_workbook(plan.excel_path, read_only=True)["plan d’action"]
+        header = next(ws.iter_rows(min_row=11, max_row=11, values_only=True))
+        self.assertEqual(header[0], "act_id")
+        self.assertEqual(len(header), 13 + 8)
+
+        actions = Action.objects.filter(plan=plan)
+        self.assertEqual(actions.count(), 25)
+        self.assertEqual(actions.order_by("excel_row_index").first().excel_row_index, 12)
+        self.assertEqual(Action.responsables.through.objects.count(), 25 * 2)
+        self.assertTrue(all(user.profile.plans_autorises.filter(pk=plan.pk) for user in users))
+
+
+class BenchmarkCompareTests(SimpleTestCase):
+    def result(self, p50, queries=3, peak=100):
+        return {"p50_ms": p50, "queries": queries, "peak_kb": peak}
+
+    def test_regressions(self):
+        command = BenchmarkCommand(stdout=StringIO())
+        baseline = {"a": self.result(10), "b": self.result(10), "c": self.result(0.1)}
+        current = {"a": self.result(14), "b": self.result(10, queries=4), "c": self.result(0.5)}
+        options = {"max_regression": 0.25, "min_delta_ms": 1.0}
+        self.assertEqual(command.compare(baseline, current, options), ["a", "b"])
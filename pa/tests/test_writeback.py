@@ -0,0 +1,158 @@
+import os
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from openpyxl import Workbook, load_workbook
+
+from pa.models import Action, Plan
+from pa.services.excel_io import apply_update, write_action, write_rows, writeback_queue
+from pa.services.filelock import WorkbookLocked
+from pa.services.workflow import bulk_transition
+from pa.services.writeback import WriteBackQueue
+
+
+class WriteBackQueueTests(TestCase):
+    def setUp(self):
+        self.path = "/tmp/plan_writeback.xlsx"
+        wb = Workbook()
+        ws = wb.active
+        ws.title = "Sheet1"
+        ws.append(["act_id", "titre", "statut", "priorite"])
+        ws.append(["ACT-0001", "Action1", "open", "high"])
+        ws.append(["ACT-0002", "Action2", "open", "low"])
+        wb.save(self.path)
+        self.plan = Plan.objects.create(
+            nom="Plan1",
+            excel_path=self.path,
+            excel_sheet="Sheet1",
+            header_row_index=1,
+        )
+        self.actions = [
+            Action.objects.create(
+                act_id=f"ACT-000{i}",
+                titre=f"Action{i}",
+                statut="open",
+                priorite="high",
+                plan=self.plan,
+                excel_fichier=self.path,
+                excel_feuille="Sheet1",
+                excel_row_index=i + 1,
+            )
+            for i in (1, 2)
+        ]
+
+    def tearDown(self):
+        writeback_queue.flush()
+
+    def test_edits_are_coalesced_into_one_save(self):
+        writer = mock.Mock(wraps=write_rows)
+        queue = WriteBackQueue(writer)
+        key = (self.path, "Sheet1", 1)
+        with mock.patch.object(WriteBackQueue, "_ensure_worker"):
+            for titre in ("first", "second"):
+                queue.enqueue(key, "ACT-0001", {
+                    "act_id": "ACT-0001", "titre": titre, "statut": "open",
+                    "priorite": "high", "excel_row_index": 2,
+                })
+            queue.enqueue(key, "ACT-0002", {
+                "act_id": "ACT-0002", "titre": "other", "statut": "closed",
+                "priorite": "low", "excel_row_index": 3,
+            })
+            self.assertEqual(queue.pending_count(), 2)
+            self.assertEqual(queue.flush(), 2)
+
+        writer.assert_called_once()
+        ws = load_workbook(self.path)["Sheet1"]
+        self.assertEqual(ws["B2"].value, "second")
+        self.assertEqual(ws["C3"].value, "closed")
+        self.assertTrue(queue.wait(timeout=1))
+
+    @override_settings(PA_EXCEL_WRITEBACK_ASYNC=False)
+    def test_locked_workbook_is_requeued(self):
+        writer = mock.Mock(side_effect=[WorkbookLocked(self.path), 1])
+        queue = WriteBackQueue(writer)
+        key = (self.path, "Sheet1", 1)
+        queue.enqueue(key, "ACT-0001", {"titre": "a", "fields": ["titre"]})
+        self.assertEqual(queue.pending_count(), 1)
+        queue.enqueue(key, "ACT-0001", {"statut": "b", "fields": ["statut"]})
+        self.assertEqual(queue.pending_count(), 0)
+        rows = writer.call_args.args[3]
+        self.assertEqual(rows[0]["fields"], ["titre", "statut"])
+
+    @override_settings(PA_EXCEL_WRITEBACK_ASYNC=False)
+    def test_apply_update_sync_mode_writes_immediately(self):
+        Action.objects.filter(pk=self.actions[0].pk).update(statut="closed")
+        self.assertEqual(apply_update("ACT-0001"), 1)
+        self.assertEqual(writeback_queue.pending_count(), 0)
+        ws = load_workbook(self.path)["Sheet1"]
+        self.assertEqual(ws["C2"].value, "closed")
+
+    @override_settings(PA_EXCEL_WRITEBACK_ASYNC=False)
+    def test_bulk_transition_saves_each_workbook_once(self):
+        with mock.patch.object(writeback_queue, "writer", wraps=write_rows) as writer:
+            changed = bulk_transition(
+                list(Action.objects.select_related("plan").order_by("id")), "close"
+            )
+        self.assertEqual(len(changed), 2)
+        self.assertEqual(writer.call_count, 1)
+        ws = load_workbook(self.path)["Sheet1"]
+        self.assertEqual(ws["B3"].value, "Action2")
+
+    @override_settings(PA_EXCEL_WRITEBACK_DELAY=0)
+    def test_background_worker_drains_queue(self):
+        Action.objects.filter(pk=self.actions[1].pk).update(titre="renamed")
+        apply_update("ACT-0002")
+        self.assertTrue(writeback_queue.wait(timeout=5))
+        ws = load_workbook(self.path)["Sheet1"]
+        self.assertEqual(ws["B3"].value, "renamed")
+
+
+class WriteBackDiffTests(TestCase):
+    def setUp(self):
+        self.path = "/tmp/plan_diff.xlsx"
+        wb = Workbook()
+        ws = wb.active
+        ws.title = "Sheet1"
+        ws.append(
+            ["act_id", "titre", "statut", "priorite", "budget", "p", "date_fin", "commentaire"]
+        )
+        ws.append(["ACT-0001", "Action1", "open", "high", 1500, "x", date(2025, 3, 1), None])
+        wb.save(self.path)
+        self.plan = Plan.objects.create(
+            nom="Plan1",
+            excel_path=self.path,
+            excel_sheet="Sheet1",
+            header_row_index=1,
+        )
+        self.action = Action.objects.create(
+            act_id="ACT-0001",
+            titre="Action1",
+            statut="open",
+            priorite="high",
+            budget_dzd=Decimal("1500.00"),
+            p=True,
+            date_fin=date(2025, 3, 1),
+            plan=self.plan,
+            excel_fichier=self.path,
+            excel_feuille="Sheet1",
+            excel_row_index=2,
+        )
+
+    def test_unchanged_action_does_not_save_workbook(self):
+        before = os.stat(self.path).st_mtime_ns
+        with mock.patch("pa.services.excel_io.load_workbook", wraps=load_workbook) as load:
+            write_action(self.action)
+        self.assertEqual(os.stat(self.path).st_mtime_ns, before)
+        # Only the read-only parse for the cache, never a writable load.
+        self.assertTrue(all(call.kwargs.get("read_only") for call in load.call_args_list))
+
+    def test_only_changed_cells_are_written(self):
+        self.action.commentaire = "à revoir"
+        self.action.d = True
+        write_action(self.action)
+        ws = load_workbook(self.path)["Sheet1"]
+        self.assertEqual(ws["H2"].value, "à revoir")
+        self.assertEqual(ws["F2"].value, "x")
+        self.assertEqual(ws["E2"].value, 1500)
@@ -1,14 +1,41 @@
-from django.urls import path
+from django.urls import path, re_path
 from rest_framework.routers import DefaultRouter
 
-from .views import PlanViewSet, ActionViewSet, ExcelPreview, ExcelRefresh
+from .views import (
+    PlanViewSet,
+    ActionViewSet,
+    ActionWorkflow,
+    Changes,
+    ChangeStream,
+    ChangeStreamToken,
+    JobViewSet,
+    ExcelPreview,
+    ExcelRefresh,
+    ExcelImport,
+    ExcelSync,
+    Metrics,
+    Stats,
+)
 
 router = DefaultRouter()
 router.register(r"plans", PlanViewSet)
 router.register(r"actions", ActionViewSet, basename="action")
+router.register(r"jobs", JobViewSet)
 
 urlpatterns = [
     *router.urls,
+    # After the router, so that actions/bulk/<operation>/ keeps its route.
+    re_path(
+        r"^actions/(?P<act_id>[^/.]+)/(?P<operation>validate|close|reject|assign)/$",
+        ActionWorkflow.as_view(),
+    ),
     path("excel/preview", ExcelPreview.as_view()),
     path("excel/refresh", ExcelRefresh.as_view()),
+    path("excel/import", ExcelImport.as_view()),
+    path("excel/sync", ExcelSync.as_view()),
+    path("stats/", Stats.as_view()),
+    path("metrics", Metrics.as_view()),
+    path("changes", Changes.as_view()),
+    path("changes/stream", ChangeStream.as_view()),
+    path("changes/stream/token", ChangeStreamToken.as_view()),
 ]
@@ -1,82 +1,457 @@
+import asyncio
+import hmac
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
 
-from .models import Plan, Action
-from .serializers import PlanSerializer, ActionSerializer
-from .permissions import RolePermission
+from .async_views import AsyncAPIView
+from .authentication import StreamToken, StreamTokenAuthentication
+from .caching import ConditionalGetMixin
+from .metrics import render_metrics
+from .models import Plan, Action, Change, Job
+from .pagination import IdCursorPagination
+from .serializers import PlanSerializer, ActionSerializer, JobSerializer, requested_fields
+from .permissions import RolePermission, get_permission_context
 from .filters import ActionFilter
+from .renderers import CSVRenderer, EventStreamRenderer, XLSXRenderer
+from .services.actid import generate_act_id
+from .services.changes import ChangesPruned, changes_since, latest_seq
 from .services.excel_io import read_plan, apply_update
+from .services.excel_pool import ExcelIOTimeout, run_excel_io
+from .services.export import export_rows, iter_csv, iter_xlsx
+from .services.jobs import enqueue_job
+from .services.stats import dashboard_stats
+from .services.workflow import TRANSITIONS, bulk_assign, bulk_transition
+
+User = get_user_model()
 
 
-class PlanViewSet(viewsets.ModelViewSet):
+class PlanViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Plan.objects.all()
     serializer_class = PlanSerializer
     permission_classes = [IsAuthenticated, RolePermission]
 
+    def get_queryset(self):
+        return get_permission_context(self.request).scope(super().get_queryset(), "id")
+
+    def validator_plans(self, request, pk=None, **kwargs):
+        plans = self.get_queryset()
+        return plans if pk is None else plans.filter(pk=pk)
 
-class ActionViewSet(viewsets.ModelViewSet):
+
+class ActionViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Action.objects.all()
     serializer_class = ActionSerializer
     permission_classes = [IsAuthenticated, RolePermission]
     lookup_field = "act_id"
     filterset_class = ActionFilter
+    pagination_class = IdCursorPagination
+    # Columns needed for lookups, permissions and pagination whatever ``fields=`` asks.
+    always_loaded = {"id", "act_id", "plan"}
+
+    def get_queryset(self):
+        queryset = get_permission_context(self.request).scope(super().get_queryset())
+        wanted = requested_fields(self.request)
+        if wanted is None or "responsables" in wanted:
+            queryset = queryset.prefetch_related(
+                Prefetch("responsables", queryset=User.objects.only("id"))
+            )
+        if wanted is not None:
+            deferred = [
+                f.name
+                for f in Action._meta.concrete_fields
+                if f.name not in wanted and f.name not in self.always_loaded
+            ]
+            queryset = queryset.defer(*deferred)
+        return queryset
+
+    def validator_plans(self, request, act_id=None, **kwargs):
+        plans = get_permission_context(request).scope(Plan.objects.all(), "id")
+        if act_id is not None:
+            return plans.filter(actions__act_id=act_id)
+        plan_id = request.query_params.get("plan")
+        return plans.filter(pk=plan_id) if plan_id and plan_id.isdigit() else plans
+
+    def perform_create(self, serializer):
+        serializer.save(act_id=generate_act_id())
 
     def perform_update(self, serializer):
         action_obj = serializer.save()
-        apply_update(action_obj.act_id)
+        apply_update(action_obj.act_id, fields=serializer.validated_data.keys())
 
-    @action(detail=True, methods=["post"])
-    def validate(self, request, act_id=None):
-        action_obj = self.get_object()
-        action_obj.c = True
-        action_obj.save()
-        apply_update(action_obj.act_id)
-        return Response({"status": "validated"})
+    @action(detail=False, methods=["get"], renderer_classes=[XLSXRenderer, CSVRenderer])
+    def export(self, request):
+        """Stream the filtered actions as ``?format=xlsx`` (default) or ``csv``."""
+        queryset = get_permission_context(request).scope(Action.objects.all())
+        rows = export_rows(self.filter_queryset(queryset))
+        renderer = request.accepted_renderer
+        encode = iter_csv if renderer.format == "csv" else iter_xlsx
+        response = StreamingHttpResponse(encode(rows), content_type=renderer.media_type)
+        response["Content-Disposition"] = f'attachment; filename="actions.{renderer.format}"'
+        return response
+
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path=r"bulk/(?P<operation>validate|close|reject|assign)",
+    )
+    def bulk(self, request, operation=None):
+        """Apply a workflow step to the actions listed in ``act_ids`` or matching ``filter``.
+
+        Write permission is checked once per plan; the response reports
+        ``updated``, ``unchanged``, ``forbidden`` or ``not_found`` per act_id.
+        """
+        context = get_permission_context(request)
+        queryset = context.scope(Action.objects.select_related("plan"))
+        act_ids = request.data.get("act_ids")
+        filters = request.data.get("filter")
+        if isinstance(act_ids, list) and all(isinstance(a, str) for a in act_ids):
+            queryset = queryset.filter(act_id__in=act_ids)
+        elif isinstance(filters, dict):
+            filterset = ActionFilter(filters, queryset=queryset)
+            if not filterset.is_valid():
+                return Response(filterset.errors, status=status.HTTP_400_BAD_REQUEST)
+            # An empty filter would match every action in scope.
+            cleaned = filterset.form.cleaned_data
+            if all(cleaned.get(name) in (None, "") for name in filterset.filters):
+                return Response(
+                    {"detail": f"filter must set one of: {', '.join(sorted(filterset.filters))}."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            queryset, act_ids = filterset.qs.distinct(), []
+        else:
+            return Response(
+                {"detail": "Provide act_ids (a list of act_id) or filter (an object)."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if operation == "assign":
+            user_ids = request.data.get("responsables", [])
+            serializer = ActionSerializer(data={"responsables": user_ids}, partial=True)
+            serializer.is_valid(raise_exception=True)
+            user_ids = [user.pk for user in serializer.validated_data["responsables"]]
+
+        actions = list(queryset.order_by("id"))
+        writable = {plan_id: context.can_write(plan_id) for plan_id in {a.plan_id for a in actions}}
+        allowed = [a for a in actions if writable[a.plan_id]]
+        if operation == "assign":
+            changed = bulk_assign(allowed, user_ids)
+        else:
+            changed = bulk_transition(allowed, operation)
+
+        changed_ids = {a.act_id for a in changed}
+        results = {a.act_id: "forbidden" for a in actions if not writable[a.plan_id]}
+        for a in allowed:
+            results[a.act_id] = "updated" if a.act_id in changed_ids else "unchanged"
+        for act_id in act_ids:
+            results.setdefault(act_id, "not_found")
+        return Response(
+            {
+                "operation": operation,
+                "results": [{"act_id": k, "status": v} for k, v in results.items()],
+                "updated": len(changed_ids),
+            }
+        )
+
+
+def _int_param(params, name, default, maximum=None):
+    try:
+        value = max(int(params.get(name, default)), 0)
+    except (TypeError, ValueError):
+        value = default
+    return min(value, maximum) if maximum is not None else value
+
+
+def _plan_for(view, request, plan_id):
+    plan = get_object_or_404(Plan, id=plan_id)
+    view.check_object_permissions(request, plan)
+    return plan
 
-    @action(detail=True, methods=["post"])
-    def close(self, request, act_id=None):
-        action_obj = self.get_object()
-        action_obj.a = True
-        action_obj.save()
-        apply_update(action_obj.act_id)
-        return Response({"status": "closed"})
 
-    @action(detail=True, methods=["post"])
-    def reject(self, request, act_id=None):
-        action_obj = self.get_object()
-        action_obj.statut = "rejected"
+class ExcelPreview(AsyncAPIView):
+    permission_classes = [IsAuthenticated, RolePermission]
+    max_limit = 500
+
+    async def get(self, request):
+        plan = await sync_to_async(_plan_for)(self, request, request.query_params.get("plan"))
+        offset = _int_param(request.query_params, "offset", 0)
+        limit = _int_param(request.query_params, "limit", 50, self.max_limit)
+        # Read one extra row to know whether another page exists.
+        try:
+            data = await run_excel_io(plan.pk, read_plan, plan, limit=limit + 1, offset=offset)
+        except ExcelIOTimeout as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        has_next = len(data) > limit
+        return Response(
+            {
+                "rows": data[:limit],
+                "offset": offset,
+                "limit": limit,
+                "next_offset": offset + limit if has_next else None,
+            }
+        )
+
+
+class ExcelRefresh(AsyncAPIView):
+    permission_classes = [IsAuthenticated, RolePermission]
+
+    async def post(self, request):
+        job = await sync_to_async(self.enqueue)(request)
+        return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+    def enqueue(self, request):
+        plan = _plan_for(self, request, request.data.get("plan"))
+        return enqueue_job("excel.refresh", {"plan_id": plan.id}, request.user, plan)
+
+
+class ActionWorkflow(AsyncAPIView):
+    """``POST /api/actions/<act_id>/<validate|close|reject|assign>/``.
+
+    The database work runs through ``sync_to_async``; the Excel write-back
+    is queued and applied off the request by ``writeback_queue``.
+    """
+
+    permission_classes = [IsAuthenticated, RolePermission]
+    done = {"validate": "validated", "close": "closed", "reject": "rejected", "assign": "assigned"}
+
+    async def post(self, request, act_id, operation):
+        await sync_to_async(self.perform)(request, act_id, operation)
+        return Response({"status": self.done[operation]})
+
+    def perform(self, request, act_id, operation):
+        queryset = get_permission_context(request).scope(Action.objects.all())
+        action_obj = get_object_or_404(queryset, act_id=act_id)
+        self.check_object_permissions(request, action_obj)
+        if operation == "assign":
+            serializer = ActionSerializer(
+                data={"responsables": request.data.get("responsables", [])}, partial=True
+            )
+            serializer.is_valid(raise_exception=True)
+            user_ids = [user.pk for user in serializer.validated_data["responsables"]]
+            # Responsables have no workbook column: nothing to write back.
+            bulk_assign([action_obj], user_ids)
+            return
+        changes = TRANSITIONS[operation]
+        for field, value in changes.items():
+            setattr(action_obj, field, value)
         action_obj.save()
-        apply_update(action_obj.act_id)
-        return Response({"status": "rejected"})
+        apply_update(action_obj.act_id, fields=list(changes))
+
+
+class ExcelImport(APIView):
+    permission_classes = [IsAuthenticated, RolePermission]
+
+    def post(self, request):
+        plan = _plan_for(self, request, request.data.get("plan"))
+        job = enqueue_job("excel.import", {"plan_id": plan.id}, request.user, plan)
+        return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
 
-    @action(detail=True, methods=["post"])
-    def assign(self, request, act_id=None):
-        action_obj = self.get_object()
-        responsables = request.data.get("responsables", [])
-        action_obj.responsables.set(responsables)
-        apply_update(action_obj.act_id)
-        return Response({"status": "assigned"})
+class ExcelSync(APIView):
+    permission_classes = [IsAuthenticated, RolePermission]
+
+    def post(self, request):
+        plan = _plan_for(self, request, request.data.get("plan"))
+        job = enqueue_job("excel.sync", {"plan_id": plan.id}, request.user, plan)
+        return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
 
 
-class ExcelPreview(APIView):
+class Stats(APIView):
     permission_classes = [IsAuthenticated, RolePermission]
 
     def get(self, request):
-        plan_id = request.query_params.get("plan")
-        plan = get_object_or_404(Plan, id=plan_id)
-        data = read_plan(plan)
-        return Response({"rows": data})
+        plans = get_permission_context(request).scope(Plan.objects.order_by("id"), "id")
+        return Response(dashboard_stats(plans))
+
+
+class Metrics(APIView):
+    """Prometheus text exposition of the request and span histograms.
+
+    Scrapers authenticate with ``Authorization: Bearer <PA_METRICS_TOKEN>``;
+    the endpoint is open when no token is configured.
+    """
+
+    authentication_classes = []
+    permission_classes = []
+
+    def get(self, request):
+        token = getattr(settings, "PA_METRICS_TOKEN", None)
+        if token and not hmac.compare_digest(
+            request.headers.get("Authorization", ""), f"Bearer {token}"
+        ):
+            return HttpResponse(status=401, headers={"WWW-Authenticate": "Bearer"})
+        return HttpResponse(render_metrics(), content_type="text/plain; version=0.0.4")
+
+
+def _change_feed(request, since, limit):
+    """Read the visible log after ``since`` and attach the current rows.
+
+    Upserted actions come with their serialized representation, upserted
+    plans likewise; an entry whose row is gone, or has moved to another plan,
+    is reported as a ``delete``.
+    """
+    context = get_permission_context(request)
+    feed = changes_since(context.scope(Change.objects.all()), since, limit)
+    upserts = [entry for entry in feed["changes"] if entry["op"] == Change.Op.UPSERT]
+    act_ids = [entry["act_id"] for entry in upserts if entry["act_id"]]
+    plan_ids = [entry["plan"] for entry in upserts if not entry["act_id"]]
+    actions = {}
+    if act_ids:
+        queryset = context.scope(Action.objects.filter(act_id__in=act_ids)).prefetch_related(
+            Prefetch("responsables", queryset=User.objects.only("id"))
+        )
+        actions = {a.act_id: a for a in queryset}
+    plans = Plan.objects.in_bulk(plan_ids) if plan_ids else {}
+    serializer_context = {"request": request}
+    for entry in upserts:
+        if entry["act_id"]:
+            row = actions.get(entry["act_id"])
+            if row is not None and row.plan_id == entry["plan"]:
+                entry["action"] = ActionSerializer(row, context=serializer_context).data
+                continue
+        elif entry["plan"] in plans:
+            entry["plan_data"] = PlanSerializer(plans[entry["plan"]]).data
+            continue
+        entry["op"] = Change.Op.DELETE
+    return feed
+
+
+def _since_param(value):
+    try:
+        return max(int(value), 0) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
 
+class Changes(APIView):
+    """``GET /api/changes?since=<seq>``: what changed after a log position.
+
+    Without ``since``, returns the current position only: take it before
+    loading the lists, then poll from it. Responds 410 once the log has been
+    pruned past ``since``; the client must then reload everything.
+    """
 
-class ExcelRefresh(APIView):
     permission_classes = [IsAuthenticated, RolePermission]
+    max_limit = 1000
+
+    def get(self, request):
+        raw = request.query_params.get("since")
+        since = _since_param(raw)
+        if raw is not None and since is None:
+            return Response(
+                {"detail": "since must be an integer."}, status=status.HTTP_400_BAD_REQUEST
+            )
+        if since is None:
+            return Response({"changes": [], "last_seq": latest_seq(), "has_more": False})
+        limit = _int_param(request.query_params, "limit", 500, self.max_limit) or 1
+        try:
+            return Response(_change_feed(request, since, limit))
+        except ChangesPruned as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_410_GONE)
+
+
+class ChangeStreamToken(APIView):
+    """``POST /api/changes/stream/token``: a token opening ``/api/changes/stream``.
+
+    It expires after ``PA_CHANGES_STREAM_TOKEN_LIFETIME`` seconds; the stream
+    checks the roles of its user when it opens.
+    """
+
+    permission_classes = [IsAuthenticated]
 
     def post(self, request):
-        plan_id = request.data.get("plan")
-        plan = get_object_or_404(Plan, id=plan_id)
-        data = read_plan(plan)
-        return Response({"rows": data})
+        return Response({"token": str(StreamToken.for_user(request.user))})
+
+
+class ChangeStream(AsyncAPIView):
+    """``GET /api/changes/stream``: the change log as Server-Sent Events (ASGI only).
+
+    Each entry of ``/api/changes`` is sent as a ``change`` event whose id is
+    its seq, so ``EventSource`` resumes with ``Last-Event-ID`` after a
+    reconnection; ``?since=`` sets the start otherwise, or it starts now.
+    The log is polled every ``PA_CHANGES_POLL_INTERVAL`` seconds and the
+    stream ends after ``PA_CHANGES_STREAM_TIMEOUT``, letting the client
+    reconnect with fresh permissions. Under WSGI the stream would hold a
+    worker for that long, so it answers 501 and clients poll ``/api/changes``.
+
+    ``EventSource`` cannot send the ``Authorization`` header: browsers get a
+    token from ``POST /api/changes/stream/token`` before each (re)connection
+    and pass it as ``?token=``.
+    """
+
+    authentication_classes = [
+        *api_settings.DEFAULT_AUTHENTICATION_CLASSES,
+        StreamTokenAuthentication,
+    ]
+    permission_classes = [IsAuthenticated, RolePermission]
+    renderer_classes = [EventStreamRenderer]
+    batch_size = 500
+
+    async def get(self, request):
+        if not isinstance(request._request, ASGIRequest):
+            return Response(
+                {"detail": "The change stream needs an ASGI server, poll /api/changes instead."},
+                status=status.HTTP_501_NOT_IMPLEMENTED,
+            )
+        since = _since_param(request.headers.get("Last-Event-ID"))
+        if since is None:
+            since = _since_param(request.query_params.get("since"))
+        if since is None:
+            since = await sync_to_async(latest_seq)()
+        try:
+            feed = await sync_to_async(_change_feed)(request, since, self.batch_size)
+        except ChangesPruned as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_410_GONE)
+        return StreamingHttpResponse(
+            self.events(request, feed),
+            content_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    async def events(self, request, feed):
+        poll = getattr(settings, "PA_CHANGES_POLL_INTERVAL", 1.0)
+        heartbeat = getattr(settings, "PA_CHANGES_HEARTBEAT", 15)
+        deadline = time.monotonic() + getattr(settings, "PA_CHANGES_STREAM_TIMEOUT", 300)
+        idle_since = time.monotonic()
+        while True:
+            for entry in feed["changes"]:
+                data = json.dumps(entry, cls=DjangoJSONEncoder)
+                yield f"id: {entry['seq']}\nevent: change\ndata: {data}\n\n"
+                idle_since = time.monotonic()
+            if time.monotonic() >= deadline:
+                return
+            if not feed["has_more"]:
+                if time.monotonic() - idle_since >= heartbeat:
+                    yield ": keep-alive\n\n"
+                    idle_since = time.monotonic()
+                await asyncio.sleep(poll)
+            try:
+                feed = await sync_to_async(_change_feed)(request, feed["last_seq"], self.batch_size)
+            except ChangesPruned:
+                yield "event: reset\ndata: {}\n\n"
+                return
+
+
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = Job.objects.all()
+    serializer_class = JobSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if get_permission_context(self.request).sees_all_plans:
+            return queryset
+        return queryset.filter(created_by=self.request.user)